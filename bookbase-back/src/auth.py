@@ -1,9 +1,14 @@
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jose import ExpiredSignatureError, JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
+from metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_WAIT, JWT_FAILURES
+from process_pool import shutdown_process_pool
 
 load_dotenv()
 
@@ -11,7 +16,18 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "32"))
+
+# Hashes com custo diferente de BCRYPT_ROUNDS são marcados para atualização
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+class PasswordHasherBusy(Exception):
+    pass
+
+_password_pool: Optional[ProcessPoolExecutor] = None
+_password_pending = 0
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -19,6 +35,59 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def get_password_pool() -> ProcessPoolExecutor:
+    global _password_pool
+    if _password_pool is None:
+        _password_pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS)
+    return _password_pool
+
+async def warm_password_pool():
+    """Sobe todos os processos do pool antes do primeiro login."""
+    loop = asyncio.get_running_loop()
+    pool = get_password_pool()
+    await asyncio.gather(*(loop.run_in_executor(pool, os.getpid) for _ in range(PASSWORD_WORKERS)))
+
+async def shutdown_password_pool():
+    global _password_pool
+    if _password_pool is not None:
+        pool, _password_pool = _password_pool, None
+        await shutdown_process_pool(pool, "bcrypt")
+
+def _timed(func, *args):
+    # Roda no processo do pool; o tempo volta junto para o worker registrar
+    inicio = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - inicio
+
+async def _run_in_password_pool(operacao: str, func, *args):
+    """Executa o bcrypt num pool de processos próprio, fora do threadpool das
+    rotas. Acima de PASSWORD_QUEUE_LIMIT pedidos em espera, recusa na hora."""
+    global _password_pending
+    if _password_pending >= PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT:
+        raise PasswordHasherBusy()
+
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        enviado = time.perf_counter()
+        result, duracao = await loop.run_in_executor(get_password_pool(), _timed, func, *args)
+        PASSWORD_HASH_DURATION.labels(operacao).observe(duracao)
+        PASSWORD_HASH_WAIT.labels(operacao).observe(max(0.0, time.perf_counter() - enviado - duracao))
+        return result
+    finally:
+        _password_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Retorna (válida, novo_hash). novo_hash vem preenchido quando o hash
+    armazenado usa um custo diferente do configurado."""
+    return await _run_in_password_pool("verify", verify_and_update_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_password_pool("hash", get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -34,5 +103,9 @@ def verify_token(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
+    except ExpiredSignatureError:
+        JWT_FAILURES.labels("expirado").inc()
+        return None
     except JWTError:
+        JWT_FAILURES.labels("invalido").inc()
         return None
\ No newline at end of file
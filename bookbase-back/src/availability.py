@@ -0,0 +1,71 @@
+from sqlalchemy import update, select, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+# Empréstimos que ocupam um exemplar; "atrasado" é marcado por overdue.py
+ACTIVE_STATUSES = ("emprestado", "atrasado")
+
+async def reserve_copy(db: AsyncSession, livro_id: int) -> bool:
+    """Decrementa exemplares_disponiveis só se houver exemplar livre. Um único
+    UPDATE condicional: dois empréstimos simultâneos não passam juntos."""
+    result = await db.execute(
+        update(models.Livro)
+        .where(models.Livro.id == livro_id, models.Livro.exemplares_disponiveis > 0)
+        .values(exemplares_disponiveis=models.Livro.exemplares_disponiveis - 1)
+    )
+    return result.rowcount == 1
+
+async def release_copy(db: AsyncSession, livro_id: int):
+    await db.execute(
+        update(models.Livro)
+        .where(models.Livro.id == livro_id)
+        .values(exemplares_disponiveis=models.Livro.exemplares_disponiveis + 1)
+    )
+
+async def resize_copies(db: AsyncSession, livro_id: int, quantidade: int) -> bool:
+    """Troca a quantidade de exemplares e ajusta os disponíveis pela diferença,
+    no mesmo UPDATE. Não vale se os exemplares emprestados passarem da nova
+    quantidade (disponíveis ficariam negativos)."""
+    disponiveis = models.Livro.exemplares_disponiveis + (quantidade - models.Livro.quantidade_exemplares)
+    result = await db.execute(
+        update(models.Livro)
+        .where(models.Livro.id == livro_id, disponiveis >= 0)
+        .values(quantidade_exemplares=quantidade, exemplares_disponiveis=disponiveis)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+async def reserve_copies(db: AsyncSession, quantidades: dict[int, int]) -> bool:
+    """Versão em lote de reserve_copy: um UPDATE para todos os livros, que só
+    vale se cada um ainda tiver os exemplares pedidos."""
+    delta = case(quantidades, value=models.Livro.id)
+    result = await db.execute(
+        update(models.Livro)
+        .where(models.Livro.id.in_(quantidades), models.Livro.exemplares_disponiveis >= delta)
+        .values(exemplares_disponiveis=models.Livro.exemplares_disponiveis - delta)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == len(quantidades)
+
+async def release_copies(db: AsyncSession, quantidades: dict[int, int]):
+    delta = case(quantidades, value=models.Livro.id)
+    await db.execute(
+        update(models.Livro)
+        .where(models.Livro.id.in_(quantidades))
+        .values(exemplares_disponiveis=models.Livro.exemplares_disponiveis + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+def reconcile_statement():
+    """Recalcula a disponibilidade de todos os livros a partir dos empréstimos ativos."""
+    ativos = (
+        select(func.count(models.Emprestimo.id))
+        .where(
+            models.Emprestimo.livro_id == models.Livro.id,
+            models.Emprestimo.status.in_(ACTIVE_STATUSES)
+        )
+        .scalar_subquery()
+    )
+    return update(models.Livro).values(
+        exemplares_disponiveis=models.Livro.quantidade_exemplares - ativos
+    )
@@ -0,0 +1,164 @@
+"""Gerador de dados sintéticos e reprodutíveis para benchmarks.
+
+Com a mesma semente gera sempre os mesmos N usuários, M livros e K
+empréstimos, com distribuições próximas das de uma biblioteca real:
+
+- os primeiros usuários são bibliotecários (1 a cada 200, no mínimo 1);
+- a procura pelos livros segue uma lei de potência (poucos títulos
+  concentram a maior parte dos empréstimos);
+- os empréstimos se concentram nos meses recentes; os antigos quase todos
+  foram devolvidos, parte com atraso, e os em aberto vencidos ficam como
+  "atrasado", respeitando os exemplares de cada livro.
+
+Todos os usuários têm a senha BENCHMARK_PASSWORD. Rode a partir de src/,
+com DATABASE_URL apontando para um banco descartável:
+
+    python -m benchmarks.dataset --usuarios 2000 --livros 10000 --emprestimos 50000
+"""
+import argparse
+import random
+from itertools import accumulate
+from datetime import datetime, timedelta
+from sqlalchemy import insert, text, select, func
+import models
+from availability import reconcile_statement
+from overdue import OVERDUE_STATUS
+
+BENCHMARK_PASSWORD = "benchmark123"
+LOAN_DAYS = 14
+
+CATEGORIAS = [
+    "Romance", "Ficção Científica", "Fantasia", "Suspense", "Biografia", "História",
+    "Filosofia", "Poesia", "Infantil", "Tecnologia", "Ciências", "Autoajuda",
+]
+PALAVRAS = [
+    "casa", "tempo", "mar", "noite", "cidade", "memória", "sombra", "jardim", "viagem",
+    "silêncio", "estrela", "rio", "caminho", "segredo", "inverno", "fogo", "vento", "ilha",
+]
+
+def librarian_count(usuarios: int) -> int:
+    return max(1, usuarios // 200)
+
+def user_email(i: int) -> str:
+    return f"usuario{i}@bookbase.example"
+
+def _titulo(rng: random.Random) -> str:
+    palavras = rng.sample(PALAVRAS, rng.randint(2, 4))
+    return " ".join(palavras).capitalize()
+
+def seed(conn, usuarios: int, livros: int, emprestimos: int, batch_size: int = 5000,
+         seed_value: int = 42, senha_hash: str = "!"):
+    """Popula um banco vazio. senha_hash é o hash gravado para todos os
+    usuários ("!" impede login; o benchmark de carga passa um hash real)."""
+    rng = random.Random(seed_value)
+    agora = datetime.now().replace(microsecond=0)
+    bibliotecarios = librarian_count(usuarios)
+
+    def insert_batches(table, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.execute(insert(table), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(table), batch)
+
+    insert_batches(models.Usuario.__table__, (
+        {
+            "nome": f"Usuário {i}",
+            "email": user_email(i),
+            "senha": senha_hash,
+            "role": models.UserRole.BIBLIOTECARIO if i <= bibliotecarios else models.UserRole.USUARIO,
+            # Bibliotecários sempre ativos: o benchmark de carga loga com eles
+            "is_active": i <= bibliotecarios or rng.random() > 0.01,
+            "token_version": 0,
+        }
+        for i in range(1, usuarios + 1)
+    ))
+
+    exemplares = [rng.choices([1, 2, 3, 5], weights=[40, 30, 20, 10])[0] for _ in range(livros)]
+    # Popularidade por lei de potência, em ordem aleatória de id
+    pesos = [1 / (posicao ** 0.8) for posicao in range(1, livros + 1)]
+    rng.shuffle(pesos)
+    pesos_acumulados = list(accumulate(pesos))
+    ids_livros = range(1, livros + 1)
+
+    def loan_rows():
+        ativos_por_livro = [0] * livros
+        pares_ativos = set()
+        for _ in range(emprestimos):
+            usuario_id = rng.randint(1, usuarios)
+            livro_id = rng.choices(ids_livros, cum_weights=pesos_acumulados)[0]
+            # Idade do empréstimo em dias, concentrada nos meses recentes
+            idade = min(int(rng.expovariate(1 / 120)), 730)
+            data_emprestimo = agora - timedelta(days=idade, minutes=rng.randint(0, 600))
+            prevista = data_emprestimo + timedelta(days=LOAN_DAYS)
+
+            chance_aberto = 0.9 if idade <= LOAN_DAYS else 0.03
+            aberto = (
+                rng.random() < chance_aberto
+                and ativos_por_livro[livro_id - 1] < exemplares[livro_id - 1]
+                and (usuario_id, livro_id) not in pares_ativos
+            )
+            if aberto:
+                ativos_por_livro[livro_id - 1] += 1
+                pares_ativos.add((usuario_id, livro_id))
+                status = OVERDUE_STATUS if prevista < agora else "emprestado"
+                devolucao = None
+            else:
+                status = "devolvido"
+                atraso = rng.choices([0, rng.randint(1, 20)], weights=[85, 15])[0]
+                devolucao = min(data_emprestimo + timedelta(days=rng.randint(1, LOAN_DAYS) + atraso), agora)
+
+            yield {
+                "usuario_id": usuario_id,
+                "livro_id": livro_id,
+                "data_emprestimo": data_emprestimo,
+                "data_devolucao_prevista": prevista,
+                "data_devolucao_real": devolucao,
+                "status": status,
+            }
+
+    insert_batches(models.Livro.__table__, (
+        {
+            "titulo": _titulo(rng),
+            "autor": f"Autor {rng.randint(1, max(1, livros // 8))}",
+            "isbn": f"978{i:010d}",
+            "ano": int(2024 - rng.expovariate(1 / 25)),
+            "quantidade_exemplares": exemplares[i - 1],
+            "exemplares_disponiveis": exemplares[i - 1],
+            "categoria": rng.choice(CATEGORIAS),
+            "paginas": rng.randint(80, 900),
+            "descricao": " ".join(rng.choices(PALAVRAS, k=rng.randint(20, 80))),
+        }
+        for i in range(1, livros + 1)
+    ))
+    insert_batches(models.Emprestimo.__table__, loan_rows())
+    conn.execute(reconcile_statement())
+    conn.execute(text("ANALYZE"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Popula o banco de DATABASE_URL com dados sintéticos")
+    parser.add_argument("--usuarios", type=int, default=2_000)
+    parser.add_argument("--livros", type=int, default=10_000)
+    parser.add_argument("--emprestimos", type=int, default=50_000)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    from database import engine
+    from migrate import run_migrations
+    from auth import get_password_hash
+
+    run_migrations()
+    with engine.begin() as conn:
+        if conn.scalar(select(func.count()).select_from(models.Livro)):
+            raise SystemExit("O banco já tem livros; use um banco vazio para resultados comparáveis")
+        seed(conn, args.usuarios, args.livros, args.emprestimos,
+             seed_value=args.semente, senha_hash=get_password_hash(BENCHMARK_PASSWORD))
+
+    print(f"{args.usuarios} usuários ({librarian_count(args.usuarios)} bibliotecários), "
+          f"{args.livros} livros e {args.emprestimos} empréstimos gerados")
+
+if __name__ == "__main__":
+    main()
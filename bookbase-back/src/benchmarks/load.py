@@ -0,0 +1,267 @@
+"""Gerador de carga HTTP com asyncio.
+
+Roda cenários de uso contra a API e grava vazão e latência (p50/p95/p99)
+por endpoint num JSON, para comparar entre commits. Popule o banco antes
+com benchmarks.dataset, usando os mesmos --usuarios e --livros. Precisa do
+httpx (pip install -r benchmarks/requirements.txt). Rode a partir de src/:
+
+    # contra um servidor já no ar (SQLite ou Postgres, conforme DATABASE_URL dele)
+    python -m benchmarks.load --base-url http://localhost:8000 --saida antes.json
+
+    # ou dentro do processo, com o app de main.py e o DATABASE_URL local
+    python -m benchmarks.load --duracao 30 --concorrencia 20 --saida depois.json --comparar antes.json
+
+Cenários: catalogo (listagem paginada, busca e detalhe), login (rajadas de
+login, dominadas pelo bcrypt), balcao (empréstimo seguido de devolução) e
+atrasados (relatório paginado de atrasados).
+
+Todo o tráfego sai de um IP só: suba o servidor com RATE_LIMIT_ENABLED=0
+(no modo em processo isso já é feito) para o cenário de login medir o
+bcrypt e não o limitador.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import httpx
+from benchmarks.dataset import BENCHMARK_PASSWORD, PALAVRAS, librarian_count, user_email
+
+CENARIOS = ("catalogo", "login", "balcao", "atrasados")
+# Peso de cada cenário na mistura padrão
+PESOS = {"catalogo": 70, "login": 10, "balcao": 15, "atrasados": 5}
+
+class Recorder:
+    def __init__(self):
+        self.latencias: dict[str, list[float]] = {}
+        self.status: dict[str, dict[str, int]] = {}
+        self.erros: dict[str, int] = {}
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        """Faz a requisição e registra a latência sob o nome do endpoint
+        (a rota com parâmetros, ex.: "GET /livros/{livro_id}"). Respostas 5xx
+        e falhas de conexão contam como erro."""
+        inicio = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            codigo = type(e).__name__
+            response = None
+        else:
+            codigo = str(response.status_code)
+        decorrido = time.perf_counter() - inicio
+
+        self.latencias.setdefault(endpoint, []).append(decorrido)
+        contagem = self.status.setdefault(endpoint, {})
+        contagem[codigo] = contagem.get(codigo, 0) + 1
+        if response is None or response.status_code >= 500:
+            self.erros[endpoint] = self.erros.get(endpoint, 0) + 1
+        return response
+
+def percentile(ordenadas: list[float], p: float) -> float:
+    """Percentil pelo método do posto mais próximo (lista já ordenada)."""
+    indice = max(0, min(len(ordenadas) - 1, int(round(p / 100 * len(ordenadas) + 0.5)) - 1))
+    return ordenadas[indice]
+
+def summarize(latencias: list[float], erros: int, duracao: float) -> dict:
+    ordenadas = sorted(latencias)
+    return {
+        "requisicoes": len(ordenadas),
+        "erros": erros,
+        "rps": round(len(ordenadas) / duracao, 2),
+        "media_ms": round(sum(ordenadas) / len(ordenadas) * 1000, 2),
+        "p50_ms": round(percentile(ordenadas, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordenadas, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordenadas, 99) * 1000, 2),
+        "max_ms": round(ordenadas[-1] * 1000, 2),
+    }
+
+class Scenarios:
+    def __init__(self, recorder: Recorder, rng: random.Random, usuarios: int, livros: int, tokens: list[str]):
+        self.rec = recorder
+        self.rng = rng
+        self.usuarios = usuarios
+        self.livros = livros
+        self.tokens = tokens
+
+    def _auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.rng.choice(self.tokens)}"}
+
+    def _livro_id(self) -> int:
+        # Metade das visitas cai nos 5% de livros mais baixos: o cache esquenta como em produção
+        if self.rng.random() < 0.5:
+            return self.rng.randint(1, max(1, self.livros // 20))
+        return self.rng.randint(1, self.livros)
+
+    async def catalogo(self, client: httpx.AsyncClient):
+        response = await self.rec.request(client, "GET /livros/", "GET", "/livros/", params={"limit": 20})
+        for _ in range(self.rng.randint(0, 3)):
+            cursor = response.json().get("next_cursor") if response is not None and response.status_code == 200 else None
+            if not cursor:
+                break
+            response = await self.rec.request(
+                client, "GET /livros/?after", "GET", "/livros/", params={"limit": 20, "after": cursor}
+            )
+
+        if self.rng.random() < 0.5:
+            await self.rec.request(client, "GET /livros/search", "GET", "/livros/search",
+                                   params={"q": self.rng.choice(PALAVRAS)})
+        for _ in range(self.rng.randint(1, 3)):
+            await self.rec.request(client, "GET /livros/{livro_id}", "GET", f"/livros/{self._livro_id()}")
+
+    async def login(self, client: httpx.AsyncClient):
+        # Rajada: vários logins de uma vez, como na abertura da biblioteca
+        await asyncio.gather(*(
+            self.rec.request(client, "POST /auth/login-json", "POST", "/auth/login-json", json={
+                "email": user_email(self.rng.randint(1, self.usuarios)),
+                "password": BENCHMARK_PASSWORD,
+            })
+            for _ in range(self.rng.randint(1, 5))
+        ))
+
+    async def balcao(self, client: httpx.AsyncClient):
+        headers = self._auth()
+        prevista = (datetime.now(timezone.utc) + timedelta(days=14)).isoformat()
+        response = await self.rec.request(client, "POST /emprestimos/", "POST", "/emprestimos/", headers=headers, json={
+            "usuario_id": self.rng.randint(1, self.usuarios),
+            "livro_id": self._livro_id(),
+            "data_devolucao_prevista": prevista,
+        })
+        # 400/404 (sem exemplares, empréstimo repetido) fazem parte do balcão
+        if response is not None and response.status_code == 200:
+            emprestimo_id = response.json()["id"]
+            await self.rec.request(client, "PUT /emprestimos/{emprestimo_id}/devolver", "PUT",
+                                   f"/emprestimos/{emprestimo_id}/devolver", headers=headers)
+
+    async def atrasados(self, client: httpx.AsyncClient):
+        headers = self._auth()
+        params = {"limit": 50}
+        for _ in range(self.rng.randint(1, 5)):
+            response = await self.rec.request(client, "GET /emprestimos/atrasados/", "GET", "/emprestimos/atrasados/",
+                                              headers=headers, params=params)
+            cursor = response.headers.get("X-Next-Cursor") if response is not None else None
+            if not cursor:
+                break
+            params = {"limit": 50, "after": cursor}
+
+async def login_librarians(client: httpx.AsyncClient, usuarios: int) -> list[str]:
+    tokens = []
+    for i in range(1, min(librarian_count(usuarios), 5) + 1):
+        response = await client.post("/auth/login-json", json={"email": user_email(i), "password": BENCHMARK_PASSWORD})
+        if response.status_code != 200:
+            raise SystemExit(f"Falha no login de {user_email(i)} ({response.status_code}): o banco foi populado com benchmarks.dataset?")
+        tokens.append(response.json()["access_token"])
+    return tokens
+
+async def run(client: httpx.AsyncClient, cenarios: list[str], duracao: float, concorrencia: int,
+              usuarios: int, livros: int, semente: int) -> dict:
+    recorder = Recorder()
+    tokens = await login_librarians(client, usuarios)
+    pesos = [PESOS[nome] for nome in cenarios]
+    fim = time.perf_counter() + duracao
+
+    async def worker(numero: int):
+        rng = random.Random(semente + numero)
+        scenarios = Scenarios(recorder, rng, usuarios, livros, tokens)
+        while time.perf_counter() < fim:
+            nome = rng.choices(cenarios, weights=pesos)[0]
+            await getattr(scenarios, nome)(client)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(worker(numero) for numero in range(concorrencia)))
+    decorrido = time.perf_counter() - inicio
+
+    todas = [latencia for latencias in recorder.latencias.values() for latencia in latencias]
+    return {
+        "duracao_s": round(decorrido, 2),
+        "total": summarize(todas, sum(recorder.erros.values()), decorrido) if todas else None,
+        "endpoints": {
+            endpoint: {
+                **summarize(latencias, recorder.erros.get(endpoint, 0), decorrido),
+                "status": recorder.status[endpoint],
+            }
+            for endpoint, latencias in sorted(recorder.latencias.items())
+        },
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(atual: dict, anterior: dict):
+    """Imprime a variação de rps e p95 por endpoint em relação a outro resultado."""
+    print(f"\ncomparado com {anterior.get('commit') or 'resultado anterior'}:")
+    for endpoint, stats in atual["endpoints"].items():
+        base = anterior.get("endpoints", {}).get(endpoint)
+        if not base:
+            print(f"  {endpoint:45} (novo)")
+            continue
+        rps = (stats["rps"] / base["rps"] - 1) * 100 if base["rps"] else 0
+        p95 = (stats["p95_ms"] / base["p95_ms"] - 1) * 100 if base["p95_ms"] else 0
+        print(f"  {endpoint:45} rps {rps:+7.1f}%   p95 {p95:+7.1f}%")
+
+async def _main(args) -> dict:
+    cenarios = [nome.strip() for nome in args.cenarios.split(",") if nome.strip()]
+    invalidos = set(cenarios) - set(CENARIOS)
+    if invalidos or not cenarios:
+        raise SystemExit(f"Cenários válidos: {', '.join(CENARIOS)}")
+
+    limits = httpx.Limits(max_connections=args.concorrencia * 5)
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+            resultado = await run(client, cenarios, args.duracao, args.concorrencia, args.usuarios, args.livros, args.semente)
+    else:
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+        from main import app
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            await app.state.startup
+            async with httpx.AsyncClient(transport=transport, base_url="http://bookbase", timeout=30) as client:
+                resultado = await run(client, cenarios, args.duracao, args.concorrencia, args.usuarios, args.livros, args.semente)
+
+    return {
+        "commit": git_commit(),
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "alvo": args.base_url or "em processo",
+        "cenarios": cenarios,
+        "concorrencia": args.concorrencia,
+        **resultado,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="URL da API; sem ela o app roda dentro do processo")
+    parser.add_argument("--cenarios", default=",".join(CENARIOS))
+    parser.add_argument("--duracao", type=float, default=30, help="segundos")
+    parser.add_argument("--concorrencia", type=int, default=20, help="usuários virtuais simultâneos")
+    parser.add_argument("--usuarios", type=int, default=2_000, help="mesmo valor usado no benchmarks.dataset")
+    parser.add_argument("--livros", type=int, default=10_000, help="mesmo valor usado no benchmarks.dataset")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="arquivo JSON com o resultado")
+    parser.add_argument("--comparar", help="resultado anterior (JSON) para comparar")
+    args = parser.parse_args()
+
+    # Uma linha de log por requisição distorce a medição
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    resultado = asyncio.run(_main(args))
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            compare(resultado, json.load(f))
+
+if __name__ == "__main__":
+    main()
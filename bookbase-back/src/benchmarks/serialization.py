@@ -0,0 +1,99 @@
+"""Micro-benchmark da serialização de uma página de livros e de empréstimos.
+
+Compara o caminho padrão (validado pelo response_model e codificado como o
+FastAPI faz) com o caminho rápido (tuplas do banco -> dicts -> orjson). Rode
+a partir de src/:
+
+    python -m benchmarks.serialization --itens 100 --repeticoes 2000
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from pydantic import TypeAdapter
+from schemas import Livro, LivrosPaginados, EmprestimoResumo
+from serialization import dumps, rows_as_dicts, output_names
+
+AGORA = datetime(2026, 10, 18, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+def make_rows(count: int) -> list[tuple]:
+    return [
+        (
+            f"Livro {i}", f"Autor {i % 50}", f"978{i:010d}", 1950 + i % 75, 3,
+            f"Categoria {i % 12}", 100 + i, "Descrição do livro " * 8,
+            i, 2, f"capa_{i}.jpg" if i % 2 else None, AGORA, None if i % 3 else AGORA,
+        )
+        for i in range(1, count + 1)
+    ]
+
+def make_emprestimo_rows(count: int) -> list[tuple]:
+    return [
+        (
+            i, i % 40 + 1, i % 300 + 1, AGORA, AGORA + timedelta(days=14),
+            None if i % 3 else AGORA + timedelta(days=10), "ativo" if i % 3 else "devolvido",
+            f"Usuário {i % 40}", f"Livro {i % 300}",
+        )
+        for i in range(1, count + 1)
+    ]
+
+def _encode(conteudo) -> bytes:
+    return json.dumps(conteudo, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+def livros(itens: int):
+    names = output_names(Livro)
+    rows = make_rows(itens)
+    orm_objects = [SimpleNamespace(**dict(zip(names, row))) for row in rows]
+    adapter = TypeAdapter(LivrosPaginados)
+
+    def pagina(livros):
+        return {"livros": livros, "total": 1000, "skip": 0, "limit": itens, "next_cursor": None}
+
+    def padrao():
+        # O que o FastAPI faz com response_model: valida, gera JSON e json.dumps
+        validado = LivrosPaginados.model_validate(pagina(orm_objects), from_attributes=True)
+        return _encode(adapter.dump_python(validado, mode="json"))
+
+    def rapido():
+        return dumps(pagina(rows_as_dicts(rows, names)))
+
+    return padrao, rapido
+
+def emprestimos(itens: int):
+    names = output_names(EmprestimoResumo)
+    rows = make_emprestimo_rows(itens)
+    adapter = TypeAdapter(list[EmprestimoResumo])
+
+    def padrao():
+        # list_emprestimos devolve dicts das linhas, validados pelo response_model
+        validado = adapter.validate_python(rows_as_dicts(rows, names))
+        return _encode(adapter.dump_python(validado, mode="json"))
+
+    def rapido():
+        return dumps(rows_as_dicts(rows, names))
+
+    return padrao, rapido
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--itens", type=int, default=100)
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    args = parser.parse_args()
+
+    for recurso, caminhos in (("livros", livros), ("emprestimos", emprestimos)):
+        padrao, rapido = caminhos(args.itens)
+        # Byte a byte: as datas devem sair iguais nos dois caminhos
+        if padrao() != rapido():
+            raise SystemExit(f"Os dois caminhos produziram JSON diferente para {recurso}")
+
+        print(recurso)
+        resultados = {}
+        for nome, funcao in (("padrao", padrao), ("rapido", rapido)):
+            tempo = min(timeit.repeat(funcao, number=args.repeticoes, repeat=3))
+            resultados[nome] = tempo / args.repeticoes * 1_000_000
+            print(f"  {nome:7} {resultados[nome]:10.1f} µs por página de {args.itens} itens")
+
+        print(f"  ganho   {resultados['padrao'] / resultados['rapido']:10.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+class RequestTooLarge(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=413, detail="Requisição muito grande")
+
+class BodySizeLimitMiddleware:
+    """Limita o corpo de requisições multipart antes de o Starlette gravá-lo
+    em disco. Recusa pelo Content-Length e, sem ele (chunked), interrompe a
+    leitura ao passar do limite."""
+
+    def __init__(self, app: ASGIApp, default_limit: int, limits: dict[str, int] = None):
+        self.app = app
+        self.default_limit = default_limit
+        self.limits = limits or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits.get(scope["path"], self.default_limit)
+        content_length = headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            error = RequestTooLarge()
+            response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # HTTPException passa intacta pelo parse do corpo do FastAPI
+                    raise RequestTooLarge()
+            return message
+
+        await self.app(scope, limited_receive, send)
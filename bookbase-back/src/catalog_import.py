@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+from typing import Iterable, Iterator, Optional, TextIO
+from pydantic import ValidationError
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from schemas import LivroCreate
+import models
+
+IMPORT_FORMATS = ("csv", "jsonl")
+IMPORT_BATCH_SIZE = 1000
+
+LIVRO_COLUMNS = [
+    "titulo", "autor", "isbn", "ano", "quantidade_exemplares",
+    "exemplares_disponiveis", "categoria", "paginas", "descricao",
+]
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    extension = filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else ""
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    if extension == "csv":
+        return "csv"
+    return None
+
+def iter_records(stream: TextIO, formato: str) -> Iterator[tuple[int, Optional[dict], Optional[str]]]:
+    """Lê o arquivo linha a linha, devolvendo (linha, registro, erro)."""
+    if formato == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            # Células vazias ficam de fora para valerem os padrões do schema
+            record = {
+                key.strip(): value for key, value in record.items()
+                if key and value not in (None, "")
+            }
+            yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, None, f"JSON inválido: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield line_number, record, None
+
+def _batches(records: Iterable, size: int):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _copy_rows(conn, rows: list[dict]):
+    """COPY ... FROM STDIN, o caminho mais rápido de carga no Postgres."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column] for column in LIVRO_COLUMNS])
+    buffer.seek(0)
+
+    statement = f"COPY livros ({', '.join(LIVRO_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(statement, buffer)
+    except conn.dialect.dbapi.IntegrityError as e:
+        # O cursor cru não passa pelo SQLAlchemy: desfaz a transação abortada
+        # e converte o erro para o fallback linha a linha de import_catalog
+        conn.connection.rollback()
+        raise IntegrityError(statement, None, e) from e
+    finally:
+        cursor.close()
+
+def _insert_rows(conn, rows: list[dict]):
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        _copy_rows(conn, rows)
+    else:
+        conn.execute(insert(models.Livro.__table__), rows)
+
+def import_catalog(engine, stream: TextIO, formato: str, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """Importa livros em lotes: valida cada linha com LivroCreate, confere os
+    ISBNs do lote numa única consulta e grava o lote de uma vez. Linhas com
+    erro entram no relatório sem interromper a importação."""
+    total = 0
+    importados = 0
+    erros = []
+    isbns_vistos = set()
+
+    for batch in _batches(iter_records(stream, formato), batch_size):
+        candidatos = []
+        for line_number, record, error in batch:
+            total += 1
+            if error:
+                erros.append({"linha": line_number, "isbn": None, "erros": [error]})
+                continue
+            try:
+                livro = LivroCreate.model_validate(record)
+            except ValidationError as e:
+                erros.append({
+                    "linha": line_number,
+                    "isbn": record.get("isbn"),
+                    "erros": [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()],
+                })
+                continue
+            if livro.isbn in isbns_vistos:
+                erros.append({"linha": line_number, "isbn": livro.isbn, "erros": ["ISBN repetido no arquivo"]})
+                continue
+            isbns_vistos.add(livro.isbn)
+            candidatos.append((line_number, livro))
+
+        if not candidatos:
+            continue
+
+        with engine.begin() as conn:
+            existentes = set(conn.scalars(
+                select(models.Livro.isbn).where(models.Livro.isbn.in_([livro.isbn for _, livro in candidatos]))
+            ))
+
+        rows = []
+        linhas = []
+        for line_number, livro in candidatos:
+            if livro.isbn in existentes:
+                erros.append({"linha": line_number, "isbn": livro.isbn, "erros": ["ISBN já cadastrado"]})
+                continue
+            row = livro.model_dump(include=set(LIVRO_COLUMNS))
+            row["exemplares_disponiveis"] = livro.quantidade_exemplares
+            rows.append(row)
+            linhas.append(line_number)
+
+        if not rows:
+            continue
+
+        try:
+            with engine.begin() as conn:
+                _insert_rows(conn, rows)
+            importados += len(rows)
+        except IntegrityError:
+            # Conflito concorrente no lote: grava linha a linha para isolar o erro
+            for line_number, row in zip(linhas, rows):
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(insert(models.Livro.__table__), [row])
+                    importados += 1
+                except IntegrityError:
+                    erros.append({"linha": line_number, "isbn": row["isbn"], "erros": ["ISBN já cadastrado"]})
+
+    erros.sort(key=lambda erro: erro["linha"])
+    return {"total": total, "importados": importados, "erros": erros}
@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import json
+import sys
+from database import SessionLocal, engine
+from availability import reconcile_statement
+from migrate import run_migrations
+from overdue import sweep_overdue
+from response_cache import response_cache
+from catalog_import import import_catalog, detect_format, IMPORT_FORMATS, IMPORT_BATCH_SIZE
+
+def reconciliar_disponibilidade(args):
+    with SessionLocal() as db:
+        result = db.execute(reconcile_statement())
+        db.commit()
+    asyncio.run(response_cache.invalidate_catalog())
+    print(f"Disponibilidade recalculada para {result.rowcount} livros")
+
+def marcar_atrasados(args):
+    total = asyncio.run(sweep_overdue())
+    print(f"{total} empréstimos marcados como atrasados")
+
+def migrar(args):
+    run_migrations()
+
+def importar_livros(args):
+    formato = args.formato or detect_format(args.arquivo)
+    if formato not in IMPORT_FORMATS:
+        sys.exit("Formato não suportado. Use --formato csv ou jsonl")
+
+    with open(args.arquivo, encoding="utf-8-sig", newline="") as stream:
+        relatorio = import_catalog(engine, stream, formato, args.lote)
+    asyncio.run(response_cache.invalidate_catalog())
+
+    for erro in relatorio["erros"]:
+        print(json.dumps(erro, ensure_ascii=False), file=sys.stderr)
+    print(
+        f"{relatorio['importados']} de {relatorio['total']} livros importados, "
+        f"{len(relatorio['erros'])} linhas com erro"
+    )
+    sys.exit(1 if relatorio["erros"] else 0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Comandos administrativos do Bookbase")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reconciliar = subparsers.add_parser(
+        "reconciliar-disponibilidade",
+        help="Recalcula exemplares_disponiveis a partir dos empréstimos ativos"
+    )
+    reconciliar.set_defaults(func=reconciliar_disponibilidade)
+
+    atrasados = subparsers.add_parser(
+        "marcar-atrasados",
+        help="Marca agora os empréstimos vencidos como atrasados (a API faz isso periodicamente)"
+    )
+    atrasados.set_defaults(func=marcar_atrasados)
+
+    migrar_parser = subparsers.add_parser("migrar", help="Aplica as migrações pendentes do banco")
+    migrar_parser.set_defaults(func=migrar)
+
+    importar = subparsers.add_parser(
+        "importar-livros",
+        help="Importa o catálogo de um arquivo CSV ou JSONL; erros vão para stderr em JSONL"
+    )
+    importar.add_argument("arquivo")
+    importar.add_argument("--formato", choices=IMPORT_FORMATS, help="Padrão: pela extensão do arquivo")
+    importar.add_argument("--lote", type=int, default=IMPORT_BATCH_SIZE)
+    importar.set_defaults(func=importar_livros)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
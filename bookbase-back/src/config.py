@@ -4,11 +4,42 @@ from pathlib import Path
 UPLOAD_DIR = Path("uploads/capas")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "gif"}
+DERIVATIVES_DIR = UPLOAD_DIR / "derivadas"
+DERIVATIVES_DIR.mkdir(parents=True, exist_ok=True)
+
+# Assinaturas (magic bytes) dos formatos aceitos -> extensão gravada
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "jpg",
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"GIF87a": "gif",
+    b"GIF89a": "gif",
+}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Corpo multipart inteiro (capa + campos do formulário), checado antes do parse
+MAX_UPLOAD_REQUEST_SIZE = MAX_FILE_SIZE + 256 * 1024
+# Arquivos de importação do catálogo são maiores que uma capa
+MAX_IMPORT_REQUEST_SIZE = int(os.getenv("MAX_IMPORT_REQUEST_SIZE", str(200 * 1024 * 1024)))
+
+# Tamanhos pré-renderizados das capas (largura, altura máximas)
+COVER_SIZES = {
+    "thumb": (160, 240),
+    "card": (320, 480),
+    "full": (800, 1200),
+}
+COVER_FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+COVER_QUALITY = 82
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
 
 def get_upload_path(filename: str) -> str:
     return str(UPLOAD_DIR / filename)
 
-def allowed_file(filename: str) -> bool:
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
\ No newline at end of file
+def get_derivative_path(filename: str, size: str, extension: str) -> Path:
+    stem = filename.rsplit(".", 1)[0]
+    return DERIVATIVES_DIR / f"{stem}_{size}.{extension}"
+
+def detect_image_type(header: bytes) -> str | None:
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return extension
+    return None
\ No newline at end of file
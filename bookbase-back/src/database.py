@@ -1,9 +1,18 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi import Request
+from contextlib import asynccontextmanager, AsyncExitStack
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 import os
 import time
+import asyncio
+import hashlib
+import itertools
 import logging
 from dotenv import load_dotenv
+from cache import TTLCache
+from redis_client import RedisClient
 
 load_dotenv()
 
@@ -12,32 +21,206 @@ logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-def wait_for_db():
-    max_retries = 30
-    retry_count = 0
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-    while retry_count < max_retries:
+def get_async_url(url: str) -> str:
+    """Converte a URL síncrona (psycopg2) para o driver assíncrono do dialeto."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"Dialeto sem driver assíncrono configurado: {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or get_async_url(DATABASE_URL)
+
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+# Depois de gravar, o cliente lê do primário por este tempo (atraso de replicação)
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+# Onde fica a marca de quem gravou: redis://host:porta/db vale para todos os
+# workers; qualquer outro valor guarda só no processo
+REPLICA_STICKY_URL = os.getenv("REPLICA_STICKY_URL") or os.getenv("CACHE_URL", "memory://")
+
+# Tempo máximo que a aplicação espera o banco subir antes de desistir
+DB_STARTUP_TIMEOUT = float(os.getenv("DB_STARTUP_TIMEOUT", "60"))
+# Conexões abertas por worker antes de ficar pronto
+DB_WARM_CONNECTIONS = int(os.getenv("DB_WARM_CONNECTIONS", "5"))
+
+# Criar os engines não abre conexão: a primeira é feita no lifespan da API
+# (wait_for_database) ou no primeiro uso pelos scripts
+engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class MemoryWriterMarks:
+    """Clientes que gravaram há pouco, só neste processo."""
+
+    def __init__(self, ttl: float):
+        self.local = TTLCache(maxsize=100_000, ttl=ttl)
+
+    async def mark(self, key: str):
+        self.local.set(key, True)
+
+    async def is_marked(self, key: str) -> bool:
+        return bool(self.local.get(key))
+
+    def clear(self):
+        self.local.clear()
+
+class RedisWriterMarks(MemoryWriterMarks):
+    """Marca no Redis, vista por todos os workers. Guarda também no processo:
+    se o Redis falhar, quem gravou aqui continua lendo do primário, e na
+    dúvida a leitura vai para o primário."""
+
+    def __init__(self, url: str, ttl: float):
+        super().__init__(ttl)
+        self.client = RedisClient(url)
+        self.ttl = ttl
+
+    async def mark(self, key: str):
+        await super().mark(key)
         try:
-            engine = create_engine(DATABASE_URL)
-            connection = engine.connect()
-            connection.close()
-            logger.info("Banco de dados conectado com sucesso!")
-            return engine
+            await self.client.execute("SET", f"bookbase:escrita:{key}", "1", "PX", int(self.ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Falha ao registrar escrita recente no Redis: {type(e).__name__}")
+
+    async def is_marked(self, key: str) -> bool:
+        if await super().is_marked(key):
+            return True
+        try:
+            return await self.client.execute("GET", f"bookbase:escrita:{key}") is not None
         except Exception as e:
-            retry_count += 1
-            logger.info(f"Tentativa {retry_count}/{max_retries} - Aguardando banco de dados... ({e})")
-            time.sleep(2)
+            logger.warning(f"Falha ao consultar escrita recente no Redis: {type(e).__name__}")
+            return True
 
-    raise Exception("Não foi possível conectar ao banco de dados após várias tentativas")
+def create_writer_marks(url: str = REPLICA_STICKY_URL, ttl: float = REPLICA_STICKY_SECONDS):
+    if url.startswith(("redis://", "rediss://")):
+        return RedisWriterMarks(url, ttl)
+    return MemoryWriterMarks(ttl)
 
-engine = wait_for_db()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Clientes que gravaram há menos de REPLICA_STICKY_SECONDS
+recent_writers = create_writer_marks()
+
+class PrimarySession(Session):
+    pass
+
+class PrimaryAsyncSession(AsyncSession):
+    async def commit(self):
+        await super().commit()
+        # Marcado depois do commit e antes da resposta: a próxima leitura
+        # do cliente, em qualquer worker, já encontra a marca
+        key = self.info.get("client_key")
+        if self.info.pop("committed_write", False) and key is not None:
+            await recent_writers.mark(key)
+
+# Engine assíncrono usado pelas rotas; o síncrono fica para DDL e scripts
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=PrimaryAsyncSession, autoflush=False, expire_on_commit=False,
+    sync_session_class=PrimarySession
+)
+
+replica_engines = [create_async_engine(get_async_url(url)) for url in DATABASE_REPLICA_URLS]
+_replica_cycle = itertools.cycle(replica_engines)
+ReplicaSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def wait_for_database(timeout: float = DB_STARTUP_TIMEOUT):
+    """Espera o banco aceitar conexões, com backoff exponencial sem bloquear
+    o event loop."""
+    deadline = time.monotonic() + timeout
+    delay = 0.25
+    attempt = 0
+
+    while True:
+        attempt += 1
+        try:
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            logger.info("Banco de dados conectado com sucesso!")
+            return
+        except Exception as e:
+            if time.monotonic() + delay > deadline:
+                raise RuntimeError("Não foi possível conectar ao banco de dados") from e
+            logger.info(f"Tentativa {attempt} - Aguardando banco de dados... ({e})")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5)
+
+async def warm_pool(connections: int = DB_WARM_CONNECTIONS):
+    """Abre conexões do pool de uma vez, para o primeiro pico de requisições
+    não pagar o handshake com o banco."""
+    if hasattr(async_engine.pool, "size"):
+        connections = min(connections, async_engine.pool.size())
+
+    async with AsyncExitStack() as stack:
+        for _ in range(connections):
+            conn = await stack.enter_async_context(async_engine.connect())
+            await conn.execute(text("SELECT 1"))
+
+def pool_status(target) -> dict:
+    pool = target.pool
+    status = {"tipo": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        max_overflow = getattr(pool, "_max_overflow", -1)
+        status.update(
+            tamanho=pool.size(),
+            em_uso=pool.checkedout(),
+            livres=pool.checkedin(),
+            overflow=pool.overflow(),
+            esgotado=max_overflow >= 0 and pool.checkedout() >= pool.size() + max_overflow
+        )
+    return status
+
+async def dispose_engines():
+    await async_engine.dispose()
+    for replica in replica_engines:
+        await replica.dispose()
+    engine.dispose()
+
+def client_key(request: Request) -> str:
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return "token:" + hashlib.sha256(authorization.encode()).hexdigest()
+    return "ip:" + (request.client.host if request.client else "")
+
+@event.listens_for(PrimarySession, "after_flush")
+def _flag_flush(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(PrimarySession, "do_orm_execute")
+def _flag_statement(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(PrimarySession, "after_commit")
+def _flag_committed_write(session):
+    # O evento é síncrono; PrimaryAsyncSession.commit grava a marca
+    if session.info.pop("wrote", False):
+        session.info["committed_write"] = True
+
+async def get_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        db.info["client_key"] = client_key(request)
+        yield db
+
+@asynccontextmanager
+async def read_session(key: str):
+    """Sessão de leitura: usa uma réplica quando configurada, exceto para
+    clientes que gravaram recentemente no primário."""
+    if not replica_engines or await recent_writers.is_marked(key):
+        async with AsyncSessionLocal() as db:
+            db.info["client_key"] = key
+            yield db
+        return
+
+    async with ReplicaSessionLocal(bind=next(_replica_cycle)) as db:
+        yield db
+
+async def get_read_db(request: Request):
+    """Sessão para rotas somente leitura (ver read_session)."""
+    async with read_session(client_key(request)) as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
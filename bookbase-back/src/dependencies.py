@@ -1,17 +1,44 @@
+import os
+import hmac
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, AsyncSessionLocal
 from auth import verify_token
+from cache import TTLCache
+from metrics import JWT_FAILURES
 import models
-from schemas import UserRole
+from schemas import UserRole, CurrentUser
 
 security = HTTPBearer()
 
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+# Estado ativo dos usuários (papel, ativo, versão do token) por email
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+async def _load_user_state(email: str):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(models.Usuario).where(models.Usuario.email == email))
+        user = result.scalar_one_or_none()
+        if user is None:
+            return None
+        return CurrentUser.model_validate(user)
+
+def invalidate_user_cache(email: str):
+    user_cache.delete(email)
+
+def revoke_user_tokens(user: models.Usuario):
+    """Invalida todos os tokens já emitidos para o usuário. Chame
+    invalidate_user_cache depois do commit."""
+    user.token_version = (user.token_version or 0) + 1
+
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
@@ -28,8 +55,15 @@ async def get_current_user(
     if email is None:
         raise credentials_exception
 
-    user = db.query(models.Usuario).filter(models.Usuario.email == email).first()
+    user = user_cache.get(email)
     if user is None:
+        user = await _load_user_state(email)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(email, user)
+
+    if payload.get("ver", 0) != user.token_version:
+        JWT_FAILURES.labels("revogado").inc()
         raise credentials_exception
 
     if not user.is_active:
@@ -40,11 +74,24 @@ async def get_current_user(
 
     return user
 
-async def get_current_active_user(current_user: models.Usuario = Depends(get_current_user)):
+async def get_current_active_user(current_user: CurrentUser = Depends(get_current_user)):
     return current_user
 
+async def get_current_user_record(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> models.Usuario:
+    user = await db.get(models.Usuario, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Não foi possível validar as credenciais",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
 def require_role(required_roles: list[UserRole]):
-    def role_checker(current_user: models.Usuario = Depends(get_current_user)):
+    async def role_checker(current_user: CurrentUser = Depends(get_current_user)):
         if current_user.role not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -53,6 +100,21 @@ def require_role(required_roles: list[UserRole]):
         return current_user
     return role_checker
 
+# Token estático para o scraper do Prometheus (bearer_token na configuração
+# do job). Vazio, o /metrics fica aberto: publique-o só na rede interna
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+metrics_security = HTTPBearer(auto_error=False)
+
+def require_metrics_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(metrics_security)):
+    if not METRICS_TOKEN:
+        return
+    if credentials is None or not hmac.compare_digest(credentials.credentials.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de métricas inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
 require_admin = require_role([UserRole.ADMIN])
 require_bibliotecario = require_role([UserRole.ADMIN, UserRole.BIBLIOTECARIO])
-require_any_user = require_role([UserRole.ADMIN, UserRole.BIBLIOTECARIO, UserRole.USUARIO])
\ No newline at end of file
+require_any_user = require_role([UserRole.ADMIN, UserRole.BIBLIOTECARIO, UserRole.USUARIO])
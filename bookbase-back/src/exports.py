@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Integer, Boolean, DateTime
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+async def _partitions(session, stmt, batch_size: int):
+    """Lê o resultado por um cursor no servidor, um lote de linhas por vez.
+    A sessão é aberta aqui para durar enquanto a resposta é enviada."""
+    async with session as db:
+        result = await db.stream(stmt.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield rows
+
+async def _csv_chunks(columns, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in partitions:
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+async def _jsonl_chunks(columns, partitions):
+    async for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+def _arrow_schema(stmt):
+    import pyarrow as pa
+
+    fields = []
+    for column in stmt.selected_columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+class _ChunkSink(io.RawIOBase):
+    """Destino do ParquetWriter que guarda os bytes até serem enviados."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+async def _parquet_chunks(stmt, partitions):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(stmt)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    # Um row group por lote: a memória fica limitada ao tamanho do lote
+    async for rows in partitions:
+        columns = list(zip(*rows)) or [[] for _ in schema]
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array([v.value if isinstance(v, Enum) else v for v in values], type=field.type)
+             for values, field in zip(columns, schema)],
+            schema=schema
+        ))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def export_response(session, stmt, formato: str, filename: str, batch_size: int = EXPORT_BATCH_SIZE):
+    """StreamingResponse que exporta o resultado de stmt em CSV, JSONL ou Parquet.
+    session é o gerenciador de contexto da sessão, aberto só quando o envio começa."""
+    if formato not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Formato não suportado. Use csv, jsonl ou parquet")
+
+    if formato == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Exportação em Parquet requer o pacote pyarrow")
+
+    columns = [column.name for column in stmt.selected_columns]
+    partitions = _partitions(session, stmt, batch_size)
+
+    if formato == "csv":
+        body = _csv_chunks(columns, partitions)
+    elif formato == "jsonl":
+        body = _jsonl_chunks(columns, partitions)
+    else:
+        body = _parquet_chunks(stmt, partitions)
+
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{formato}"'}
+    )
@@ -1,25 +1,118 @@
 import os
+import time
 import uuid
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from fastapi import UploadFile
-from config import UPLOAD_DIR, MAX_FILE_SIZE, allowed_file
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, ImageOps
+from config import (
+    UPLOAD_DIR, MAX_FILE_SIZE, UPLOAD_CHUNK_SIZE, COVER_SIZES, COVER_FORMATS,
+    COVER_QUALITY, IMAGE_WORKERS, detect_image_type, get_derivative_path
+)
+from metrics import UPLOADS, UPLOAD_BYTES, UPLOAD_DURATION
+from process_pool import shutdown_process_pool
 
-async def save_upload_file(upload_file: UploadFile) -> str:
+_image_pool: ProcessPoolExecutor | None = None
 
-    if not allowed_file(upload_file.filename):
-        raise ValueError(f"Tipo de arquivo não permitido: {upload_file.filename}")
+def get_image_pool() -> ProcessPoolExecutor:
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _image_pool
+
+async def warm_image_pool():
+    loop = asyncio.get_running_loop()
+    pool = get_image_pool()
+    await asyncio.gather(*(loop.run_in_executor(pool, os.getpid) for _ in range(IMAGE_WORKERS)))
+
+async def shutdown_image_pool():
+    global _image_pool
+    if _image_pool is not None:
+        pool, _image_pool = _image_pool, None
+        await shutdown_process_pool(pool, "imagens")
+
+def render_cover_derivatives(filename: str) -> list[str]:
+    """Decodifica a capa uma única vez e gera as versões reduzidas em WebP e
+    JPEG, do maior para o menor tamanho. Os metadados EXIF são descartados."""
+    generated = []
+
+    with Image.open(UPLOAD_DIR / filename) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        for size, dimensions in sorted(COVER_SIZES.items(), key=lambda item: -item[1][0]):
+            image.thumbnail(dimensions, Image.LANCZOS)
+            for extension, image_format in COVER_FORMATS.items():
+                path = get_derivative_path(filename, size, extension)
+                image.save(path, image_format, quality=COVER_QUALITY, optimize=True)
+                generated.append(path.name)
+
+    return generated
+
+async def save_upload_file(upload_file: UploadFile) -> str:
+    inicio = time.perf_counter()
+    try:
+        filename = await _save_upload_file(upload_file)
+    except ValueError:
+        UPLOADS.labels("rejeitado").inc()
+        raise
+    UPLOADS.labels("ok").inc()
+    UPLOAD_DURATION.observe(time.perf_counter() - inicio)
+    return filename
 
-    content = await upload_file.read()
+async def _save_upload_file(upload_file: UploadFile) -> str:
+    """Copia o upload em blocos para a pasta de capas, validando o tipo pelos
+    primeiros bytes e o tamanho do arquivo. Quando a rota roda, o Starlette
+    já gravou o corpo multipart num arquivo temporário: o limite que evita
+    receber um corpo enorme é o BodySizeLimitMiddleware; aqui só se evita a
+    segunda cópia. O arquivo só aparece com o nome final após um rename
+    atômico."""
 
-    if len(content) > MAX_FILE_SIZE:
+    if upload_file.size is not None and upload_file.size > MAX_FILE_SIZE:
         raise ValueError(f"Arquivo muito grande. Máximo: 5MB")
 
-    file_extension = upload_file.filename.rsplit(".", 1)[1].lower()
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
+    first_chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+    file_extension = detect_image_type(first_chunk)
+    if file_extension is None:
+        raise ValueError(f"Tipo de arquivo não permitido: {upload_file.filename}")
 
+    unique_filename = f"{uuid.uuid4()}.{file_extension}"
     file_path = UPLOAD_DIR / unique_filename
-    with open(file_path, "wb") as f:
-        f.write(content)
+    temp_path = UPLOAD_DIR / f".{unique_filename}.tmp"
+
+    temp_file = await run_in_threadpool(open, temp_path, "wb")
+    try:
+        total_size = 0
+        chunk = first_chunk
+        while chunk:
+            total_size += len(chunk)
+            UPLOAD_BYTES.inc(len(chunk))
+            if total_size > MAX_FILE_SIZE:
+                raise ValueError(f"Arquivo muito grande. Máximo: 5MB")
+            await run_in_threadpool(temp_file.write, chunk)
+            chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+
+        await run_in_threadpool(temp_file.close)
+        await run_in_threadpool(os.replace, temp_path, file_path)
+    except BaseException:
+        temp_file.close()
+        temp_path.unlink(missing_ok=True)
+        raise
+
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(get_image_pool(), render_cover_derivatives, unique_filename)
+    except Exception:
+        delete_upload_file(unique_filename)
+        raise ValueError("Imagem inválida ou corrompida")
 
     return unique_filename
 
@@ -29,10 +122,14 @@ def delete_upload_file(filename: str) -> bool:
 
     file_path = UPLOAD_DIR / filename
     try:
+        for size in COVER_SIZES:
+            for extension in COVER_FORMATS:
+                get_derivative_path(filename, size, extension).unlink(missing_ok=True)
+
         if file_path.exists():
             file_path.unlink()
             return True
     except Exception as e:
         print(f"Erro ao deletar arquivo: {e}")
 
-    return False
\ No newline at end of file
+    return False
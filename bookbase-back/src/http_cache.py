@@ -0,0 +1,158 @@
+import os
+import stat
+import hashlib
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+import anyio
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
+
+# Capas são gravadas com nomes UUID e nunca sobrescritas
+COVER_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Registros do catálogo podem mudar: o cliente guarda, mas revalida
+RECORD_CACHE_CONTROL = "no-cache"
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return formatdate(value.timestamp(), usegmt=True)
+
+def is_not_modified(request_headers, etag: str, last_modified: Optional[str]) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+def record_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": RECORD_CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+async def stat_file(path) -> Optional[os.stat_result]:
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        return None
+    if not stat.S_ISREG(stat_result.st_mode):
+        return None
+    return stat_result
+
+def parse_range(range_header: str, size: int):
+    """Interpreta um único intervalo `bytes=`. Retorna (início, fim), None
+    quando o cabeçalho deve ser ignorado ou False se for insatisfazível."""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start, _, end = spec.strip().partition("-")
+    try:
+        if start == "":
+            length = int(end)
+            if length <= 0:
+                return False
+            return max(size - length, 0), size - 1
+        first = int(start)
+        last = int(end) if end else size - 1
+    except ValueError:
+        return None
+
+    if first >= size or last < first:
+        return False
+    return first, min(last, size - 1)
+
+class CoverFileResponse(FileResponse):
+    def __init__(self, path, stat_result: os.stat_result, byte_range=None, **kwargs):
+        super().__init__(path, stat_result=stat_result, **kwargs)
+        self.byte_range = byte_range
+        if byte_range is not None:
+            start, end = byte_range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+            self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self.byte_range is None:
+            await super().__call__(scope, receive, send)
+            return
+
+        start, end = self.byte_range
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+def cover_file_response(path, stat_result: os.stat_result, request_headers, method: str = "GET", headers: Optional[dict] = None) -> Response:
+    """Resposta de capa com ETag forte, cache imutável, 304 e Range."""
+    etag = make_etag(os.path.basename(path), stat_result.st_size, stat_result.st_mtime_ns)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    response_headers = {
+        "etag": etag,
+        "last-modified": last_modified,
+        "cache-control": COVER_CACHE_CONTROL,
+        "accept-ranges": "bytes",
+        **(headers or {}),
+    }
+
+    if is_not_modified(request_headers, etag, last_modified):
+        return NotModifiedResponse(Headers(response_headers))
+
+    byte_range = None
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if range_header and (if_range is None or if_range in (etag, last_modified)):
+        byte_range = parse_range(range_header, stat_result.st_size)
+        if byte_range is False:
+            return Response(
+                status_code=416,
+                headers={"content-range": f"bytes */{stat_result.st_size}", "accept-ranges": "bytes"},
+            )
+
+    return CoverFileResponse(
+        path, stat_result, byte_range=byte_range, method=method, headers=response_headers
+    )
+
+class CoverStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        return cover_file_response(full_path, stat_result, Headers(scope=scope), scope["method"])
@@ -1,40 +1,188 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Depends, Query
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import uvicorn
-from database import engine, Base
-import models
+import os
+import asyncio
+import logging
+from sqlalchemy import text
 from routers import auth_router, books_router, loans_router
-from config import UPLOAD_DIR
+from config import UPLOAD_DIR, MAX_UPLOAD_REQUEST_SIZE, MAX_IMPORT_REQUEST_SIZE
+from migrate import run_migrations
+from database import (
+    engine, async_engine, replica_engines, wait_for_database, warm_pool, pool_status, dispose_engines
+)
+from file_handler import warm_image_pool, shutdown_image_pool
+from http_cache import CoverStaticFiles
+from compression import CompressionMiddleware
+from body_limit import BodySizeLimitMiddleware
+from startup_gate import StartupGateMiddleware
+from auth import PasswordHasherBusy, warm_password_pool, shutdown_password_pool
+from overdue import start_overdue_sweeper
+from serialization import FAST_JSON, FastJSONResponse
+from metrics import PrometheusMiddleware, instrument_engine, render_metrics, mark_process_dead
+import sql_timing
+from sql_timing import SQLTimingMiddleware, statement_stats
+from dependencies import require_admin, require_metrics_token
+from schemas import CurrentUser
+
+logger = logging.getLogger(__name__)
+
+RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "1") == "1"
+READY_CHECK_TIMEOUT = float(os.getenv("READY_CHECK_TIMEOUT", "2"))
+
+STARTUP_ATTEMPTS = int(os.getenv("STARTUP_ATTEMPTS", "5"))
+STARTUP_RETRY_DELAY = float(os.getenv("STARTUP_RETRY_DELAY", "2"))
+
+async def _prepare_once(app: FastAPI):
+    await wait_for_database()
+    if RUN_MIGRATIONS:
+        await asyncio.to_thread(run_migrations)
+    await asyncio.gather(warm_pool(), warm_password_pool(), warm_image_pool())
+    app.state.overdue_sweeper = start_overdue_sweeper()
 
-Base.metadata.create_all(bind=engine)
+async def prepare(app: FastAPI):
+    """Preparação em segundo plano: o worker já responde /api/health enquanto
+    espera o banco, e /api/ready só fica verde ao final. Falhas são repetidas
+    com espera exponencial; esgotadas as tentativas, /api/health passa a
+    responder 503 para o orquestrador reiniciar o processo."""
+    for tentativa in range(1, STARTUP_ATTEMPTS + 1):
+        try:
+            await _prepare_once(app)
+            logger.info("API pronta para receber requisições")
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if tentativa >= STARTUP_ATTEMPTS:
+                logger.exception("Falha na inicialização da API após %d tentativas", tentativa)
+                raise
+            espera = STARTUP_RETRY_DELAY * 2 ** (tentativa - 1)
+            logger.warning(
+                "Falha na inicialização da API (tentativa %d de %d), repetindo em %.1fs",
+                tentativa, STARTUP_ATTEMPTS, espera, exc_info=True
+            )
+            await asyncio.sleep(espera)
 
-app = FastAPI(title="Bookbase API", version="1.0.0")
+def startup_failed(app: FastAPI) -> bool:
+    startup = app.state.startup
+    return startup.done() and not startup.cancelled() and startup.exception() is not None
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.overdue_sweeper = None
+    app.state.startup = asyncio.create_task(prepare(app))
+    yield
+    app.state.startup.cancel()
+    if app.state.overdue_sweeper:
+        app.state.overdue_sweeper.cancel()
+    # Em paralelo: cada um pode esperar até POOL_SHUTDOWN_TIMEOUT
+    await asyncio.gather(shutdown_image_pool(), shutdown_password_pool())
+    await dispose_engines()
+    mark_process_dead()
+
+app = FastAPI(
+    title="Bookbase API",
+    version="1.0.0",
+    default_response_class=FastJSONResponse if FAST_JSON else JSONResponse,
+    lifespan=lifespan,
+)
+
+# Dentro do CORS, para o 503 e o 413 também levarem os cabeçalhos de CORS
+app.add_middleware(StartupGateMiddleware, exempt=("/api/health", "/api/ready", "/metrics"))
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    default_limit=MAX_UPLOAD_REQUEST_SIZE,
+    limits={"/livros/import": MAX_IMPORT_REQUEST_SIZE},
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Atrasados-Atualizado-Em"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(SQLTimingMiddleware)
+app.add_middleware(PrometheusMiddleware)
+
+instrument_engine(async_engine, "primario")
+instrument_engine(engine, "primario_sync")
+for numero, replica in enumerate(replica_engines, start=1):
+    instrument_engine(replica, f"replica{numero}")
+for db_engine in (async_engine, engine, *replica_engines):
+    sql_timing.instrument_engine(db_engine)
 
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+app.mount("/uploads", CoverStaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
 
 # Rotas
 app.include_router(auth_router)
 app.include_router(books_router)
 app.include_router(loans_router)
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Servidor ocupado, tente novamente em instantes"},
+        headers={"Retry-After": "1"},
+    )
+
 @app.get("/")
 def read_root():
     return {"message": "essa bomba ta funcionando"}
 
 @app.get("/api/health")
 def health_check():
+    """Liveness: o processo está de pé e atendendo, sem consultar nada. Só
+    falha quando a inicialização desistiu de vez, e aí reiniciar é o remédio"""
+    if startup_failed(app):
+        return JSONResponse(status_code=503, content={"status": "erro", "detail": "Falha na inicialização"})
     return {"status": "ok"}
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness: inicialização concluída, banco respondendo e pool com folga"""
+    startup = app.state.startup
+    if not startup.done():
+        return JSONResponse(status_code=503, content={"status": "iniciando"})
+    if startup.cancelled() or startup.exception():
+        return JSONResponse(status_code=503, content={"status": "erro", "detail": "Falha na inicialização"})
+
+    pool = pool_status(async_engine)
+    if pool.get("esgotado"):
+        return JSONResponse(status_code=503, content={"status": "ocupado", "pool": pool})
+
+    try:
+        async with async_engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), READY_CHECK_TIMEOUT)
+    except Exception as e:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "indisponivel", "database": f"erro: {type(e).__name__}", "pool": pool}
+        )
+
+    return {"status": "pronto", "database": "ok", "pool": pool_status(async_engine)}
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+def metrics():
+    """Métricas no formato do Prometheus (somadas entre os workers). Pede o
+    METRICS_TOKEN quando configurado; sem ele, fica restrito à rede interna"""
+    content, content_type = render_metrics()
+    return Response(content, headers={"Content-Type": content_type})
+
+@app.get("/debug/sql", include_in_schema=False)
+def debug_sql(limit: int = Query(20, ge=1, le=200), current_user: CurrentUser = Depends(require_admin)):
+    """Comandos SQL com maior tempo acumulado neste worker (apenas admin)"""
+    return {
+        "pid": os.getpid(),
+        "consulta_lenta_ms": sql_timing.SLOW_QUERY_MS,
+        "comandos": statement_stats.top(limit),
+    }
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8002)
\ No newline at end of file
+    from serve import main
+    main()
\ No newline at end of file
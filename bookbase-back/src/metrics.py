@@ -0,0 +1,147 @@
+import os
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Com vários workers (serve.py), cada processo grava suas métricas em arquivos
+# neste diretório e o /metrics soma todos. Sem ele, as métricas ficam na memória
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+HTTP_REQUESTS = Counter(
+    "bookbase_http_requests_total", "Requisições HTTP por rota e status", ["method", "rota", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "bookbase_http_request_duration_seconds", "Latência das requisições HTTP por rota", ["method", "rota"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_IN_PROGRESS = Gauge(
+    "bookbase_http_requests_in_progress", "Requisições HTTP em andamento", ["method"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_CHECKOUTS = Counter("bookbase_db_pool_checkouts_total", "Conexões retiradas do pool", ["engine"])
+DB_POOL_CONNECTIONS = Counter("bookbase_db_pool_connections_total", "Conexões novas abertas com o banco", ["engine"])
+DB_POOL_CHECKED_OUT = Gauge(
+    "bookbase_db_pool_checked_out", "Conexões do pool em uso", ["engine"], multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "bookbase_db_pool_overflow", "Conexões acima do tamanho do pool", ["engine"], multiprocess_mode="livesum"
+)
+DB_POOL_WAIT = Histogram(
+    "bookbase_db_pool_wait_seconds", "Tempo para obter uma conexão do pool", ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+PASSWORD_HASH_DURATION = Histogram(
+    "bookbase_password_hash_seconds", "Duração do bcrypt no pool de processos", ["operacao"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2, 5),
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "bookbase_password_queue_seconds", "Espera na fila do pool de bcrypt", ["operacao"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+JWT_FAILURES = Counter("bookbase_jwt_failures_total", "Tokens JWT recusados", ["motivo"])
+RATE_LIMIT_REJECTIONS = Counter(
+    "bookbase_rate_limit_rejections_total", "Requisições recusadas pelo limitador (429)", ["limite"]
+)
+RATE_LIMIT_BACKEND_ERRORS = Counter(
+    "bookbase_rate_limit_backend_errors_total", "Falhas do backend do limitador", ["limite"]
+)
+
+UPLOADS = Counter("bookbase_uploads_total", "Uploads de capa", ["resultado"])
+UPLOAD_BYTES = Counter("bookbase_upload_bytes_total", "Bytes recebidos em uploads de capa")
+UPLOAD_DURATION = Histogram(
+    "bookbase_upload_duration_seconds", "Duração do upload de capa (gravação e miniaturas)",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+def route_label(scope: Scope) -> str:
+    # Rota com parâmetros ("/livros/{livro_id}") para não criar uma série por id
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Arquivos estáticos montados (ex.: /uploads) só ajustam o root_path
+    return scope.get("root_path") or "<sem rota>"
+
+class PrometheusMiddleware:
+    """Latência, contagem e requisições em andamento por rota."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            decorrido = time.perf_counter() - inicio
+            in_progress.dec()
+            rota = route_label(scope)
+            HTTP_LATENCY.labels(method, rota).observe(decorrido)
+            HTTP_REQUESTS.labels(method, rota, str(status)).inc()
+
+def instrument_engine(engine, nome: str):
+    """Registra eventos do pool de um engine (síncrono ou AsyncEngine)."""
+    engine = getattr(engine, "sync_engine", engine)
+    pool = engine.pool
+
+    def update_overflow():
+        if hasattr(pool, "overflow"):
+            DB_POOL_OVERFLOW.labels(nome).set(max(0, pool.overflow()))
+
+    @event.listens_for(pool, "connect")
+    def _connect(dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS.labels(nome).inc()
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.labels(nome).inc()
+        DB_POOL_CHECKED_OUT.labels(nome).inc()
+        update_overflow()
+
+    @event.listens_for(pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.labels(nome).dec()
+        update_overflow()
+
+    # O pool não tem evento antes da espera: mede a chamada que entrega a conexão
+    do_get = pool._do_get
+
+    def timed_do_get():
+        inicio = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            DB_POOL_WAIT.labels(nome).observe(time.perf_counter() - inicio)
+
+    pool._do_get = timed_do_get
+
+def render_metrics() -> tuple[bytes, str]:
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+def mark_process_dead():
+    """No encerramento do worker: tira os gauges dele da soma."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,33 @@
+import logging
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+# Revisão equivalente ao esquema que o create_all gerava antes das migrações
+BASELINE_REVISION = "0001"
+
+def get_alembic_config(connection=None) -> Config:
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BASE_DIR / "migrations"))
+    config.attributes["configure_logger"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+def run_migrations(bind=None):
+    """Aplica as migrações pendentes. Bancos criados pelo antigo create_all
+    (tabelas sem alembic_version) são marcados na revisão base antes."""
+    bind = bind or engine
+
+    with bind.begin() as connection:
+        config = get_alembic_config(connection)
+        inspector = inspect(connection)
+        if inspector.has_table("livros") and not inspector.has_table("alembic_version"):
+            logger.info(f"Banco existente sem versionamento; marcando revisão {BASELINE_REVISION}")
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
@@ -0,0 +1,67 @@
+"""esquema inicial
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "usuarios",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String(100), nullable=False),
+        sa.Column("email", sa.String(100), nullable=False),
+        sa.Column("senha", sa.String(255), nullable=False),
+        sa.Column("role", sa.Enum("ADMIN", "BIBLIOTECARIO", "USUARIO", name="userrole"), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_usuarios_id", "usuarios", ["id"])
+    op.create_index("ix_usuarios_email", "usuarios", ["email"], unique=True)
+
+    op.create_table(
+        "livros",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("titulo", sa.String(255), nullable=False),
+        sa.Column("autor", sa.String(255), nullable=False),
+        sa.Column("isbn", sa.String(20), nullable=False),
+        sa.Column("ano", sa.Integer(), nullable=False),
+        sa.Column("quantidade_exemplares", sa.Integer(), nullable=False),
+        sa.Column("categoria", sa.String(100), nullable=False),
+        sa.Column("paginas", sa.Integer(), nullable=False),
+        sa.Column("descricao", sa.Text(), nullable=False),
+        sa.Column("capa", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_livros_id", "livros", ["id"])
+    op.create_index("ix_livros_titulo", "livros", ["titulo"])
+    op.create_index("ix_livros_isbn", "livros", ["isbn"], unique=True)
+
+    op.create_table(
+        "emprestimos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("usuario_id", sa.Integer(), sa.ForeignKey("usuarios.id"), nullable=False),
+        sa.Column("livro_id", sa.Integer(), sa.ForeignKey("livros.id"), nullable=False),
+        sa.Column("data_emprestimo", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("data_devolucao_prevista", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("data_devolucao_real", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("status", sa.String(20), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_emprestimos_id", "emprestimos", ["id"])
+
+def downgrade():
+    op.drop_table("emprestimos")
+    op.drop_table("livros")
+    op.drop_table("usuarios")
+    sa.Enum(name="userrole").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,39 @@
+"""versão do token e exemplares disponíveis
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def _columns(table):
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+def upgrade():
+    # Bancos criados com create_all antes das migrações podem já ter as colunas
+    if "token_version" not in _columns("usuarios"):
+        with op.batch_alter_table("usuarios") as batch:
+            batch.add_column(sa.Column("token_version", sa.Integer(), server_default="0", nullable=False))
+
+    if "exemplares_disponiveis" not in _columns("livros"):
+        with op.batch_alter_table("livros") as batch:
+            batch.add_column(sa.Column("exemplares_disponiveis", sa.Integer(), server_default="0", nullable=False))
+
+        op.execute("""
+            UPDATE livros SET exemplares_disponiveis = quantidade_exemplares - (
+                SELECT count(*) FROM emprestimos
+                WHERE emprestimos.livro_id = livros.id AND emprestimos.status = 'emprestado'
+            )
+        """)
+
+def downgrade():
+    with op.batch_alter_table("livros") as batch:
+        batch.drop_column("exemplares_disponiveis")
+    with op.batch_alter_table("usuarios") as batch:
+        batch.drop_column("token_version")
@@ -0,0 +1,22 @@
+"""índices compostos de empréstimos
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_emprestimos_livro_status", "emprestimos", ["livro_id", "status"])
+    op.create_index("ix_emprestimos_usuario_status", "emprestimos", ["usuario_id", "status"])
+    op.create_index("ix_emprestimos_status_prevista", "emprestimos", ["status", "data_devolucao_prevista"])
+
+def downgrade():
+    op.drop_index("ix_emprestimos_status_prevista", table_name="emprestimos")
+    op.drop_index("ix_emprestimos_usuario_status", table_name="emprestimos")
+    op.drop_index("ix_emprestimos_livro_status", table_name="emprestimos")
@@ -0,0 +1,19 @@
+"""busca textual do catálogo
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+from search import setup_search, drop_search
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    setup_search(op.get_bind())
+
+def downgrade():
+    drop_search(op.get_bind())
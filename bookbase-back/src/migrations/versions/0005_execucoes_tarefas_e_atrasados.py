@@ -0,0 +1,27 @@
+"""execuções de tarefas periódicas e índice de atrasados
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "execucoes_tarefas",
+        sa.Column("nome", sa.String(length=50), nullable=False),
+        sa.Column("executado_em", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("registros", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("nome"),
+    )
+    op.create_index("ix_emprestimos_status_id", "emprestimos", ["status", "id"])
+
+def downgrade():
+    op.drop_index("ix_emprestimos_status_id", table_name="emprestimos")
+    op.drop_table("execucoes_tarefas")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -18,6 +18,7 @@ class Usuario(Base):
     senha = Column(String(255), nullable=False)
     role = Column(Enum(UserRole), default=UserRole.USUARIO, nullable=False)
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -32,6 +33,12 @@ class Livro(Base):
     isbn = Column(String(20), unique=True, index=True, nullable=False)
     ano = Column(Integer, nullable=False)
     quantidade_exemplares = Column(Integer, default=1, nullable=False)
+    # Mantido pelas rotas de empréstimo com UPDATEs condicionais
+    exemplares_disponiveis = Column(
+        Integer,
+        default=lambda context: context.get_current_parameters()["quantidade_exemplares"],
+        nullable=False
+    )
     categoria = Column(String(100), nullable=False)
     paginas = Column(Integer, nullable=False)
     descricao = Column(Text, nullable=False)
@@ -43,6 +50,13 @@ class Livro(Base):
 
 class Emprestimo(Base):
     __tablename__ = "emprestimos"
+    __table_args__ = (
+        Index("ix_emprestimos_livro_status", "livro_id", "status"),
+        Index("ix_emprestimos_usuario_status", "usuario_id", "status"),
+        Index("ix_emprestimos_status_prevista", "status", "data_devolucao_prevista"),
+        # Paginação por id dentro de um status (lista de atrasados)
+        Index("ix_emprestimos_status_id", "status", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
@@ -54,5 +68,14 @@ class Emprestimo(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    usuario = relationship("Usuario", back_populates="emprestimos")
-    livro = relationship("Livro", back_populates="emprestimos")
+    # Sem carga preguiçosa: quem serializa o empréstimo carrega usuario e livro
+    usuario = relationship("Usuario", back_populates="emprestimos", lazy="raise_on_sql")
+    livro = relationship("Livro", back_populates="emprestimos", lazy="raise_on_sql")
+
+class ExecucaoTarefa(Base):
+    """Última execução de cada tarefa periódica (ex.: marcação de atrasados)."""
+    __tablename__ = "execucoes_tarefas"
+
+    nome = Column(String(50), primary_key=True)
+    executado_em = Column(DateTime(timezone=True), nullable=False)
+    registros = Column(Integer, default=0, nullable=False)
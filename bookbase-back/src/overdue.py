@@ -0,0 +1,100 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, date, time, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+import models
+
+logger = logging.getLogger(__name__)
+
+OVERDUE_STATUS = "atrasado"
+OVERDUE_TASK = "marcar_atrasados"
+# Intervalo entre varreduras em segundos; 0 desliga a tarefa em segundo plano
+OVERDUE_SWEEP_INTERVAL = float(os.getenv("OVERDUE_SWEEP_INTERVAL", "300"))
+OVERDUE_BATCH_SIZE = int(os.getenv("OVERDUE_BATCH_SIZE", "1000"))
+
+def overdue_cutoff() -> datetime:
+    """Vence antes de hoje: mesma regra que a rota de atrasados usava."""
+    return datetime.combine(date.today(), time.min)
+
+def active_status(data_devolucao_prevista: datetime) -> str:
+    """Status de um empréstimo em aberto com esta data prevista."""
+    if data_devolucao_prevista.tzinfo is not None:
+        data_devolucao_prevista = data_devolucao_prevista.astimezone().replace(tzinfo=None)
+    return OVERDUE_STATUS if data_devolucao_prevista < overdue_cutoff() else "emprestado"
+
+async def last_sweep(db: AsyncSession) -> Optional[datetime]:
+    """Momento da última varredura, em UTC."""
+    executado_em = await db.scalar(
+        select(models.ExecucaoTarefa.executado_em).where(models.ExecucaoTarefa.nome == OVERDUE_TASK)
+    )
+    # O SQLite devolve a data sem fuso; ela foi gravada em UTC
+    if executado_em is not None and executado_em.tzinfo is None:
+        executado_em = executado_em.replace(tzinfo=timezone.utc)
+    return executado_em
+
+def due_loans_statement(cutoff: datetime, batch_size: int):
+    return select(models.Emprestimo.id).where(
+        models.Emprestimo.status == "emprestado",
+        models.Emprestimo.data_devolucao_prevista < cutoff
+    ).limit(batch_size)
+
+async def sweep_overdue(batch_size: int = OVERDUE_BATCH_SIZE) -> int:
+    """Passa para 'atrasado' os empréstimos vencidos, em lotes de UPDATE com
+    commit próprio, e registra a execução. Devolve quantos foram marcados."""
+    cutoff = overdue_cutoff()
+    total = 0
+
+    async with AsyncSessionLocal() as db:
+        while True:
+            ids = (await db.scalars(due_loans_statement(cutoff, batch_size))).all()
+            if not ids:
+                break
+
+            # O status é conferido de novo: uma devolução concorrente vence
+            result = await db.execute(
+                update(models.Emprestimo)
+                .where(models.Emprestimo.id.in_(ids), models.Emprestimo.status == "emprestado")
+                .values(status=OVERDUE_STATUS)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            total += result.rowcount
+
+            if len(ids) < batch_size:
+                break
+
+        execucao = await db.get(models.ExecucaoTarefa, OVERDUE_TASK)
+        if execucao is None:
+            execucao = models.ExecucaoTarefa(nome=OVERDUE_TASK)
+            db.add(execucao)
+        execucao.executado_em = datetime.now(timezone.utc)
+        execucao.registros = total
+        await db.commit()
+
+    if total:
+        logger.info(f"{total} empréstimos marcados como atrasados")
+    return total
+
+async def run_overdue_sweeper(interval: float = OVERDUE_SWEEP_INTERVAL):
+    """Laço da tarefa periódica. Com vários workers, quem encontrar uma
+    execução recente registrada no banco pula a vez."""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                ultima = await last_sweep(db)
+            if ultima is None or datetime.now(timezone.utc) - ultima >= timedelta(seconds=interval * 0.9):
+                await sweep_overdue()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Falha ao marcar empréstimos atrasados")
+        await asyncio.sleep(interval)
+
+def start_overdue_sweeper() -> Optional[asyncio.Task]:
+    if OVERDUE_SWEEP_INTERVAL <= 0:
+        return None
+    return asyncio.create_task(run_overdue_sweeper())
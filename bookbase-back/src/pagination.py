@@ -0,0 +1,48 @@
+import base64
+import json
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Maior página aceita pelas rotas paginadas (cada limit é uma chave de cache)
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        last_id = int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return last_id
+
+def page_statement(stmt: Select, id_column, skip: int, after: Optional[str], limit: int) -> Select:
+    """Ordena por id e limita a limit + 1 linhas, para saber se existe próxima
+    página. Com `after` usa paginação por chave (keyset), sem OFFSET."""
+    if after:
+        stmt = stmt.where(id_column > decode_cursor(after))
+
+    stmt = stmt.order_by(id_column)
+    if skip and not after:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit + 1)
+
+async def paginate(db: AsyncSession, stmt: Select, id_column, skip: int, after: Optional[str], limit: int):
+    stmt = page_statement(stmt, id_column, skip, after, limit)
+    result = await db.execute(stmt)
+    single_entity = len(stmt.column_descriptions) == 1 and isinstance(stmt.column_descriptions[0]["expr"], type)
+    rows = result.scalars().all() if single_entity else result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:max(limit, 0)]
+        # Página vazia (limit <= 0) não tem de onde continuar
+        if rows:
+            next_cursor = encode_cursor(rows[-1].id)
+
+    return rows, next_cursor
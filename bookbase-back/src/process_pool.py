@@ -0,0 +1,32 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Segundos que o encerramento do worker espera os processos de um pool
+POOL_SHUTDOWN_TIMEOUT = float(os.getenv("POOL_SHUTDOWN_TIMEOUT", "10"))
+
+async def shutdown_process_pool(pool: ProcessPoolExecutor, nome: str, timeout: float = POOL_SHUTDOWN_TIMEOUT):
+    """Cancela as tarefas na fila e espera (wait=True) as em andamento por
+    até timeout segundos. Passado o prazo, termina os processos filhos para
+    o worker não ficar preso no encerramento nem deixar órfãos."""
+    # Referência antes do shutdown, que limpa o dicionário do executor
+    processes = list((pool._processes or {}).values())
+    shutdown = asyncio.create_task(asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True))
+
+    done, _ = await asyncio.wait({shutdown}, timeout=timeout)
+    if done:
+        return
+
+    logger.warning(f"Pool {nome} não encerrou em {timeout:.0f}s; terminando {len(processes)} processos")
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    # Com os filhos mortos o executor marca o pool como quebrado e o shutdown retorna
+    done, _ = await asyncio.wait({shutdown}, timeout=5)
+    if not done:
+        for process in processes:
+            if process.is_alive():
+                process.kill()
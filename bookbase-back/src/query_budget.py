@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+@contextmanager
+def count_queries(engine):
+    """Registra os comandos SQL executados no engine (síncrono ou assíncrono)
+    enquanto o bloco roda."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    counter = QueryCounter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+@contextmanager
+def query_budget(engine, max_queries: int):
+    """Falha se o bloco executar mais de max_queries comandos SQL. Uso típico,
+    em torno de uma chamada ao TestClient:
+
+        with query_budget(async_engine, 2):
+            client.get("/emprestimos/atrasados/", headers=headers)
+    """
+    with count_queries(engine) as counter:
+        yield counter
+
+    if counter.count > max_queries:
+        statements = "\n".join(f"  {statement}" for statement in counter.statements)
+        raise QueryBudgetExceeded(
+            f"{counter.count} consultas executadas, orçamento de {max_queries}:\n{statements}"
+        )
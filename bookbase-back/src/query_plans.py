@@ -0,0 +1,34 @@
+import json
+
+def _explain(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if conn.dialect.name == "postgresql":
+        result = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+        plan = result if isinstance(result, list) else json.loads(result)
+        return plan[0]["Plan"]
+    return conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+
+def sequential_scans(conn, stmt) -> list[str]:
+    """Tabelas lidas por varredura sequencial no plano da consulta."""
+    plan = _explain(conn, stmt)
+
+    if conn.dialect.name == "postgresql":
+        scans = []
+        nodes = [plan]
+        while nodes:
+            node = nodes.pop()
+            if node.get("Node Type") == "Seq Scan":
+                scans.append(node.get("Relation Name"))
+            nodes.extend(node.get("Plans", []))
+        return scans
+
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        if detail.startswith("SCAN ") and " USING " not in detail:
+            scans.append(detail.split()[1])
+    return scans
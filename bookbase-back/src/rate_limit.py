@@ -0,0 +1,145 @@
+import os
+import math
+import time
+import hashlib
+import logging
+from typing import Optional
+from fastapi import HTTPException, Request
+from cache import TTLCache
+from redis_client import RedisClient
+from metrics import RATE_LIMIT_REJECTIONS, RATE_LIMIT_BACKEND_ERRORS
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# memory:// (por processo) ou redis://host:porta/db (compartilhado entre workers)
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL") or os.getenv("CACHE_URL", "memory://")
+RATE_LIMIT_MEMORY_SIZE = int(os.getenv("RATE_LIMIT_MEMORY_SIZE", "100000"))
+# Com o backend fora do ar: 1 libera as requisições, 0 responde 503
+RATE_LIMIT_FAIL_OPEN = os.getenv("RATE_LIMIT_FAIL_OPEN", "1") == "1"
+
+class TokenBucket:
+    """Limite no formato "N/S": até N tentativas de uma vez, repostas
+    continuamente ao longo de S segundos."""
+
+    def __init__(self, nome: str, env: str, padrao: str):
+        capacidade, segundos = os.getenv(env, padrao).split("/")
+        self.nome = nome
+        self.capacidade = float(capacidade)
+        self.segundos = float(segundos)
+        self.por_segundo = self.capacidade / self.segundos
+
+    @property
+    def ttl(self) -> float:
+        # Depois disso o balde está cheio de novo e o estado pode sumir
+        return self.capacidade / self.por_segundo
+
+# Cada operação tem um balde por IP (força bruta com vários emails) e um por
+# email (ataque distribuído a uma conta)
+LIMITS = {
+    "login": (
+        TokenBucket("login_ip", "LOGIN_LIMIT_IP", "30/60"),
+        TokenBucket("login_email", "LOGIN_LIMIT_EMAIL", "5/60"),
+    ),
+    "register": (
+        TokenBucket("register_ip", "REGISTER_LIMIT_IP", "5/300"),
+        TokenBucket("register_email", "REGISTER_LIMIT_EMAIL", "3/300"),
+    ),
+    "change_password": (
+        TokenBucket("change_password_ip", "CHANGE_PASSWORD_LIMIT_IP", "10/60"),
+        TokenBucket("change_password_email", "CHANGE_PASSWORD_LIMIT_EMAIL", "5/300"),
+    ),
+}
+
+class MemoryBackend:
+    def __init__(self, maxsize: int):
+        self.buckets = TTLCache(maxsize=maxsize, ttl=3600)
+
+    async def take(self, key: str, bucket: TokenBucket) -> float:
+        agora = time.monotonic()
+        tokens, atualizado = self.buckets.get(key) or (bucket.capacidade, agora)
+        tokens = min(bucket.capacidade, tokens + (agora - atualizado) * bucket.por_segundo)
+
+        espera = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            espera = (1 - tokens) / bucket.por_segundo
+        self.buckets.set(key, (tokens, agora), ttl=bucket.ttl)
+        return espera
+
+class RedisBackend:
+    """Janela fixa no Redis: até N tentativas a cada S segundos, contadas com
+    INCR numa chave por janela. Só INCR e PEXPIRE, que qualquer servidor
+    compatível aceita (sem scripts Lua). Perto da virada da janela passam
+    até 2N tentativas seguidas, o que basta contra força bruta."""
+
+    def __init__(self, url: str):
+        self.client = RedisClient(url)
+
+    async def take(self, key: str, bucket: TokenBucket) -> float:
+        agora = time.time()
+        janela = int(agora // bucket.segundos)
+        fim = (janela + 1) * bucket.segundos
+
+        tentativas = await self.client.execute("INCR", f"{key}:{janela}")
+        if tentativas == 1:
+            # A chave leva o número da janela: se o PEXPIRE falhar, ela só ocupa memória
+            await self.client.execute("PEXPIRE", f"{key}:{janela}", math.ceil((fim - agora) * 1000) + 1000)
+        if tentativas > bucket.capacidade:
+            return fim - agora
+        return 0.0
+
+def create_backend(url: str = RATE_LIMIT_URL):
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    return MemoryBackend(RATE_LIMIT_MEMORY_SIZE)
+
+def _client_ip(request: Request) -> str:
+    # Atrás de proxy, o uvicorn (proxy_headers) já troca pelo X-Forwarded-For
+    return request.client.host if request.client else "desconhecido"
+
+def _email_key(email: str) -> str:
+    # Sem o email em claro no Redis
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+
+class RateLimiter:
+    """Limita tentativas das rotas que rodam bcrypt. Chame antes de consultar o
+    banco ou calcular hash: a recusa é um 429 sem custo de CPU. Falhas do
+    backend, inclusive um Redis que não responde em REDIS_TIMEOUT, são
+    contadas e, com fail_open, liberam a requisição (o pool de bcrypt ainda
+    tem sua fila); sem ele, viram 503."""
+
+    def __init__(self, backend, enabled: bool = RATE_LIMIT_ENABLED, fail_open: bool = RATE_LIMIT_FAIL_OPEN):
+        self.backend = backend
+        self.enabled = enabled
+        self.fail_open = fail_open
+
+    async def check(self, operacao: str, request: Request, email: Optional[str]):
+        if not self.enabled:
+            return
+
+        ip_bucket, email_bucket = LIMITS[operacao]
+        chaves = [(ip_bucket, f"bookbase:limite:{ip_bucket.nome}:{_client_ip(request)}")]
+        if email:
+            chaves.append((email_bucket, f"bookbase:limite:{email_bucket.nome}:{_email_key(email)}"))
+
+        for bucket, key in chaves:
+            try:
+                espera = await self.backend.take(key, bucket)
+            except Exception:
+                RATE_LIMIT_BACKEND_ERRORS.labels(bucket.nome).inc()
+                if self.fail_open:
+                    logger.warning("Limitador indisponível, liberando a requisição", exc_info=True)
+                    return
+                logger.error("Limitador indisponível, recusando a requisição", exc_info=True)
+                raise HTTPException(status_code=503, detail="Serviço temporariamente indisponível")
+            if espera > 0:
+                RATE_LIMIT_REJECTIONS.labels(bucket.nome).inc()
+                raise HTTPException(
+                    status_code=429,
+                    detail="Muitas tentativas. Tente novamente em instantes",
+                    headers={"Retry-After": str(math.ceil(espera))},
+                )
+
+rate_limiter = RateLimiter(create_backend())
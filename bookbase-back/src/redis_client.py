@@ -0,0 +1,111 @@
+import os
+import asyncio
+from typing import Optional
+from urllib.parse import urlparse, unquote
+
+# Segundos para conectar e para cada comando: um Redis travado não pode
+# segurar as rotas, que caem para o banco (cache) ou liberam (limitador)
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "0.3"))
+
+class RedisError(Exception):
+    pass
+
+def _encode(*args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        else:
+            data = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+async def _read_reply(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Conexão com o Redis encerrada")
+    kind, payload = line[:1], line[1:-2]
+
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        raise RedisError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length == -1:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(payload)
+        if length == -1:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Resposta inesperada do Redis: {line!r}")
+
+class RedisClient:
+    """Cliente mínimo do protocolo do Redis (RESP) sobre asyncio, com um pool
+    pequeno de conexões. Serve qualquer servidor compatível (Redis, Valkey,
+    KeyDB ou um substituto local em testes). Conexão e comandos que passam
+    de timeout levantam asyncio.TimeoutError e a conexão é descartada."""
+
+    def __init__(self, url: str, max_connections: int = 10, timeout: float = REDIS_TIMEOUT):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._idle = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self.max_connections = max_connections
+        self.timeout = timeout
+
+    async def _connect(self):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        connection = (reader, writer)
+        try:
+            if self.password:
+                await asyncio.wait_for(self._send(connection, "AUTH", self.password), self.timeout)
+            if self.db:
+                await asyncio.wait_for(self._send(connection, "SELECT", self.db), self.timeout)
+        except BaseException:
+            writer.close()
+            raise
+        return connection
+
+    async def _send(self, connection, *args):
+        reader, writer = connection
+        writer.write(_encode(*args))
+        await writer.drain()
+        return await _read_reply(reader)
+
+    def _bind_loop(self):
+        # Conexões pertencem ao event loop que as abriu
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._idle = []
+            self._slots = asyncio.Semaphore(self.max_connections)
+
+    async def execute(self, *args):
+        self._bind_loop()
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            try:
+                reply = await asyncio.wait_for(self._send(connection, *args), self.timeout)
+            except RedisError:
+                self._idle.append(connection)
+                raise
+            except BaseException:
+                connection[1].close()
+                raise
+            self._idle.append(connection)
+            return reply
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
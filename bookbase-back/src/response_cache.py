@@ -0,0 +1,138 @@
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+from cache import TTLCache
+from redis_client import RedisClient
+
+logger = logging.getLogger(__name__)
+
+# memory:// (padrão, por processo), redis://host:porta/db (compartilhado) ou
+# none:// (sem cache; serve.py usa com vários workers e sem Redis)
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))
+
+CATALOG_VERSION_KEY = "bookbase:catalogo:versao"
+
+class MemoryBackend:
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.counters = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self.entries.set(key, value, ttl=ttl)
+
+    async def get_counter(self, key: str) -> int:
+        return self.counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+class RedisBackend:
+    def __init__(self, url: str):
+        self.client = RedisClient(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.execute("SET", key, value, "PX", int(ttl * 1000))
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self.client.execute("GET", key) or 0)
+
+    async def incr(self, key: str) -> int:
+        return await self.client.execute("INCR", key)
+
+def is_shared(url: str) -> bool:
+    return url.startswith(("redis://", "rediss://"))
+
+def create_backend(url: str = CACHE_URL):
+    if is_shared(url):
+        return RedisBackend(url)
+    if url.startswith("none://"):
+        return None
+    return MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+class ResponseCache:
+    """Cache de respostas serializadas. As chaves do catálogo levam a versão
+    atual do catálogo, então uma escrita invalida tudo com um único INCR.
+    Falhas do backend não derrubam a rota: a resposta vem do banco. Sem
+    backend (none://) tudo vem do banco."""
+
+    def __init__(self, backend, ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def catalog_key(self, *parts) -> Optional[str]:
+        if self.backend is None:
+            return None
+        try:
+            versao = await self.backend.get_counter(CATALOG_VERSION_KEY)
+        except Exception:
+            logger.warning("Cache indisponível, lendo do banco", exc_info=True)
+            return None
+        return ":".join(["bookbase", "catalogo", f"v{versao}", *map(str, parts)])
+
+    async def invalidate_catalog(self):
+        """Chame depois do commit de qualquer escrita que mude livros."""
+        if self.backend is None:
+            return
+        try:
+            await self.backend.incr(CATALOG_VERSION_KEY)
+        except Exception:
+            logger.warning("Não foi possível invalidar o cache do catálogo", exc_info=True)
+
+    async def get_or_load(self, key: Optional[str], loader: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Devolve o valor em cache ou chama loader. Chamadas simultâneas com a
+        mesma chave esperam o mesmo loader: uma expiração gera uma consulta só.
+        Exceções do loader (ex.: 404) chegam a todos e nada é guardado."""
+        if key is None:
+            return await loader()
+
+        try:
+            cached = await self.backend.get(key)
+        except Exception:
+            logger.warning("Cache indisponível, lendo do banco", exc_info=True)
+            return await loader()
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # A requisição que carregava foi cancelada, não esta
+                if not inflight.cancelled():
+                    raise
+                return await loader()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+            try:
+                await self.backend.set(key, value, self.ttl)
+            except Exception:
+                logger.warning("Não foi possível gravar no cache", exc_info=True)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita o aviso de exceção nunca lida quando ninguém esperava
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+response_cache = ResponseCache(create_backend())
@@ -1,25 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from database import get_db
-from auth import verify_password, get_password_hash, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from dependencies import get_current_user
+from typing import Optional
+from database import get_db, get_read_db
+from auth import verify_password_async, get_password_hash_async, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from dependencies import (
+    get_current_user, get_current_user_record, require_admin,
+    revoke_user_tokens, invalidate_user_cache
+)
+from pagination import paginate, MAX_PAGE_SIZE
+from rate_limit import rate_limiter
 from schemas import *
 import models
 
 router = APIRouter(prefix="/auth", tags=["Autenticação"])
 
+async def _get_user_by_email(db: AsyncSession, email: str) -> Optional[models.Usuario]:
+    result = await db.execute(select(models.Usuario).where(models.Usuario.email == email))
+    return result.scalar_one_or_none()
+
+async def _save(db: AsyncSession, instance):
+    db.add(instance)
+    await db.commit()
+    await db.refresh(instance)
+    return instance
+
+def _issue_token(user: models.Usuario) -> dict:
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.email, "role": user.role.value, "ver": user.token_version},
+        expires_delta=access_token_expires
+    )
+
+    return {"access_token": access_token, "token_type": "bearer"}
+
+async def _authenticate(db: AsyncSession, email: str, password: str) -> Optional[models.Usuario]:
+    user = await _get_user_by_email(db, email)
+    if not user:
+        return None
+
+    valid, new_hash = await verify_password_async(password, user.senha)
+    if not valid:
+        return None
+
+    # Custo do bcrypt mudou desde o cadastro: regrava o hash com o atual
+    if new_hash:
+        user.senha = new_hash
+        await _save(db, user)
+
+    return user
+
 @router.post("/register", response_model=Usuario)
-def register(user: UsuarioCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.Usuario).filter(models.Usuario.email == user.email).first()
+async def register(user: UsuarioCreate, request: Request, db: AsyncSession = Depends(get_db)):
+    await rate_limiter.check("register", request, user.email)
+    db_user = await _get_user_by_email(db, user.email)
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Email já cadastrado"
         )
 
-    hashed_password = get_password_hash(user.senha)
+    hashed_password = await get_password_hash_async(user.senha)
     db_user = models.Usuario(
         nome=user.nome,
         email=user.email,
@@ -28,17 +71,14 @@ def register(user: UsuarioCreate, db: Session = Depends(get_db)):
         is_active=user.is_active
     )
 
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-
-    return db_user
+    return await _save(db, db_user)
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.Usuario).filter(models.Usuario.email == form_data.username).first()
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    await rate_limiter.check("login", request, form_data.username)
+    user = await _authenticate(db, form_data.username, form_data.password)
 
-    if not user or not verify_password(form_data.password, user.senha):
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos",
@@ -51,19 +91,14 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             detail="Usuário inativo"
         )
 
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email, "role": user.role.value},
-        expires_delta=access_token_expires
-    )
-
-    return {"access_token": access_token, "token_type": "bearer"}
+    return _issue_token(user)
 
 @router.post("/login-json", response_model=Token)
-def login_json(login_data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(models.Usuario).filter(models.Usuario.email == login_data.email).first()
+async def login_json(login_data: LoginRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    await rate_limiter.check("login", request, login_data.email)
+    user = await _authenticate(db, login_data.email, login_data.password)
 
-    if not user or not verify_password(login_data.password, user.senha):
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos"
@@ -75,42 +110,87 @@ def login_json(login_data: LoginRequest, db: Session = Depends(get_db)):
             detail="Usuário inativo"
         )
 
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email, "role": user.role.value},
-        expires_delta=access_token_expires
-    )
-
-    return {"access_token": access_token, "token_type": "bearer"}
+    return _issue_token(user)
 
 @router.get("/me", response_model=Usuario)
-def get_me(current_user: models.Usuario = Depends(get_current_user)):
+async def get_me(current_user: models.Usuario = Depends(get_current_user_record)):
     return current_user
 
-@router.put("/change-password")
-def change_password(
+async def _change_password_limit(request: Request, current_user: CurrentUser = Depends(get_current_user)):
+    # Antes de get_current_user_record: a recusa não lê o usuário do banco
+    await rate_limiter.check("change_password", request, current_user.email)
+
+@router.put("/change-password", dependencies=[Depends(_change_password_limit)])
+async def change_password(
     password_data: ChangePasswordRequest,
-    current_user: models.Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.Usuario = Depends(get_current_user_record),
+    db: AsyncSession = Depends(get_db)
 ):
-    if not verify_password(password_data.current_password, current_user.senha):
+    valid, _ = await verify_password_async(password_data.current_password, current_user.senha)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Senha atual incorreta"
         )
 
-    current_user.senha = get_password_hash(password_data.new_password)
-    db.commit()
+    current_user.senha = await get_password_hash_async(password_data.new_password)
+    revoke_user_tokens(current_user)
+    await _save(db, current_user)
+    invalidate_user_cache(current_user.email)
 
-    return {"message": "Senha alterada com sucesso"}
+    return {
+        "message": "Senha alterada com sucesso",
+        **_issue_token(current_user)
+    }
 
 @router.get("/users", response_model=list[UsuarioPublic])
-def get_users(
-    skip: int = 0,
-    limit: int = 10,
-    current_user: models.Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_users(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    usuarios, next_cursor = await paginate(db, select(models.Usuario), models.Usuario.id, skip, after, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return usuarios
+
+@router.put("/users/{usuario_id}", response_model=Usuario)
+async def update_user(
+    usuario_id: int,
+    user_update: UsuarioUpdate,
+    current_user: CurrentUser = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
 ):
-    usuarios = db.query(models.Usuario).offset(skip).limit(limit).all()
+    db_user = await db.get(models.Usuario, usuario_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+    previous_email = db_user.email
+
+    if user_update.email and user_update.email != db_user.email:
+        if await _get_user_by_email(db, user_update.email):
+            raise HTTPException(status_code=400, detail="Email já cadastrado")
+        db_user.email = user_update.email
+    if user_update.nome:
+        db_user.nome = user_update.nome
+    if user_update.role is not None:
+        db_user.role = user_update.role
+    if user_update.is_active is not None:
+        db_user.is_active = user_update.is_active
+
+    # Mudança de papel, email ou desativação invalida os tokens emitidos
+    if (
+        db_user.email != previous_email
+        or user_update.role is not None
+        or user_update.is_active is False
+    ):
+        revoke_user_tokens(db_user)
+
+    await _save(db, db_user)
+    invalidate_user_cache(previous_email)
 
-    return usuarios
\ No newline at end of file
+    return db_user
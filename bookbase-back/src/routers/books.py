@@ -1,13 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from database import get_db, get_read_db, read_session, client_key, engine
 from dependencies import get_current_user, require_bibliotecario
 from file_handler import save_upload_file, delete_upload_file
-from schemas import Livro, LivroCreate, LivroUpdate, LivrosPaginados
-from config import UPLOAD_DIR
+from schemas import Livro, LivroCreate, LivroUpdate, LivrosPaginados, ImportacaoLivros, CurrentUser
+from config import UPLOAD_DIR, COVER_SIZES, get_derivative_path
+from pagination import paginate, MAX_PAGE_SIZE
+from availability import resize_copies
+from response_cache import response_cache
+from serialization import FAST_JSON, dumps, rows_as_dicts, output_names, parse_fields
+from search import search_livros
+from exports import export_response
+from catalog_import import import_catalog, detect_format, IMPORT_FORMATS, IMPORT_BATCH_SIZE
+from http_cache import make_etag, record_headers, is_not_modified, not_modified, stat_file, cover_file_response
 import models
 import json
+import io
 
 router = APIRouter(prefix="/livros", tags=["Livros"])
 
@@ -22,17 +34,20 @@ async def create_livro(
     paginas: int = Form(...),
     descricao: str = Form(...),
     capa: UploadFile = File(None),
-    current_user: models.Usuario = Depends(require_bibliotecario),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(require_bibliotecario),
+    db: AsyncSession = Depends(get_db)
 ):
 
-    db_livro = db.query(models.Livro).filter(models.Livro.isbn == isbn).first()
-    if db_livro:
+    result = await db.execute(select(models.Livro.id).where(models.Livro.isbn == isbn))
+    if result.first():
         raise HTTPException(status_code=400, detail="ISBN já cadastrado")
 
     capa_filename = None
     if capa:
-        capa_filename = await save_upload_file(capa)
+        try:
+            capa_filename = await save_upload_file(capa)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     db_livro = models.Livro(
         titulo=titulo,
@@ -47,50 +62,174 @@ async def create_livro(
     )
 
     db.add(db_livro)
-    db.commit()
-    db.refresh(db_livro)
+    await db.commit()
+    await response_cache.invalidate_catalog()
+    await db.refresh(db_livro)
 
     return db_livro
 
+@router.post("/import", response_model=ImportacaoLivros)
+async def import_livros(
+    arquivo: UploadFile = File(...),
+    formato: Optional[str] = Form(None),
+    tamanho_lote: int = Form(IMPORT_BATCH_SIZE, ge=1, le=10_000),
+    current_user: CurrentUser = Depends(require_bibliotecario)
+):
+    """Importação em lote do catálogo a partir de CSV ou JSONL (apenas bibliotecário)"""
+    formato = formato or detect_format(arquivo.filename)
+    if formato not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato não suportado. Use csv ou jsonl")
+
+    # O arquivo é lido em fluxo direto do upload; a carga roda numa thread
+    # com o engine síncrono para não travar o event loop
+    stream = io.TextIOWrapper(arquivo.file, encoding="utf-8-sig", newline="")
+    try:
+        return await run_in_threadpool(import_catalog, engine, stream, formato, tamanho_lote)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="O arquivo deve estar em UTF-8")
+    finally:
+        stream.detach()
+        await response_cache.invalidate_catalog()
+
+def _select_livros(nomes: Optional[list[str]]):
+    if nomes:
+        return select(*(getattr(models.Livro, nome) for nome in nomes))
+    return select(models.Livro)
+
 @router.get("/", response_model=LivrosPaginados)
-def list_livros(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db)
+async def list_livros(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    incluir_total: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula, ex.: titulo,autor,capa"),
+    # Primário: o que o loader lê vai para o cache sob a versão atual do
+    # catálogo e seria servido a todos, até a quem acabou de gravar
+    db: AsyncSession = Depends(get_db)
+):
+    if incluir_total is None:
+        incluir_total = after is None
+    campos = parse_fields(Livro, fields)
+
+    async def load():
+        # Com fields= ou FAST_JSON, seleciona só as colunas e monta o JSON das tuplas
+        nomes = campos or (output_names(Livro) if FAST_JSON else None)
+        livros, next_cursor = await paginate(db, _select_livros(nomes), models.Livro.id, skip, after, limit)
+
+        total = None
+        if incluir_total:
+            total = await db.scalar(select(func.count()).select_from(models.Livro))
+
+        payload = {
+            "livros": livros,
+            "total": total,
+            "skip": 0 if after else skip,
+            "limit": limit,
+            "next_cursor": next_cursor
+        }
+        if nomes:
+            payload["livros"] = rows_as_dicts(livros, nomes)
+            return dumps(payload)
+        return LivrosPaginados.model_validate(payload, from_attributes=True).model_dump_json().encode()
+
+    key = await response_cache.catalog_key("lista", skip, limit, after, incluir_total, ",".join(campos or []))
+    return Response(await response_cache.get_or_load(key, load), media_type="application/json")
+
+@router.get("/export")
+async def export_livros(
+    request: Request,
+    formato: str = "csv",
+    current_user: CurrentUser = Depends(require_bibliotecario)
+):
+    """Exporta o catálogo em CSV, JSONL ou Parquet (apenas bibliotecário)"""
+    query = select(*models.Livro.__table__.columns).order_by(models.Livro.id)
+    return export_response(read_session(client_key(request)), query, formato, "livros")
+
+@router.get("/search", response_model=LivrosPaginados)
+async def search(
+    q: str = Query(..., min_length=1),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    livros = db.query(models.Livro).offset(skip).limit(limit).all()
-    total = db.query(models.Livro).count()
+    livros = await search_livros(db, q, skip, limit)
 
     return {
         "livros": livros,
-        "total": total,
         "skip": skip,
         "limit": limit
     }
 
+def _livro_headers(livro_id: int, last_modified, exemplares_disponiveis: int, campos: Optional[list[str]]):
+    # A representação parcial tem ETag própria
+    variante = ",".join(campos) if campos else None
+    return record_headers(
+        make_etag("livro", livro_id, last_modified, exemplares_disponiveis, *filter(None, [variante])),
+        last_modified
+    )
+
 @router.get("/{livro_id}", response_model=Livro)
-def get_livro(
+async def get_livro(
     livro_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula, ex.: titulo,autor,capa"),
+    # Primário, como em list_livros: a resposta vai para o cache
+    db: AsyncSession = Depends(get_db)
 ):
-    livro = db.query(models.Livro).filter(models.Livro.id == livro_id).first()
-    if not livro:
-        raise HTTPException(status_code=404, detail="Livro não encontrado")
-    return livro
+    campos = parse_fields(Livro, fields)
+
+    async def load():
+        if campos is None:
+            livro = await db.get(models.Livro, livro_id)
+            if not livro:
+                raise HTTPException(status_code=404, detail="Livro não encontrado")
+            headers = _livro_headers(
+                livro.id, livro.updated_at or livro.created_at, livro.exemplares_disponiveis, campos
+            )
+            body = Livro.model_validate(livro).model_dump_json().encode()
+        else:
+            # Colunas pedidas mais as que a ETag precisa
+            nomes = list(dict.fromkeys([*campos, "created_at", "updated_at", "exemplares_disponiveis"]))
+            row = (await db.execute(
+                select(*(getattr(models.Livro, nome) for nome in nomes)).where(models.Livro.id == livro_id)
+            )).first()
+            if row is None:
+                raise HTTPException(status_code=404, detail="Livro não encontrado")
+            dados = dict(zip(nomes, row))
+            headers = _livro_headers(
+                livro_id, dados["updated_at"] or dados["created_at"], dados["exemplares_disponiveis"], campos
+            )
+            body = dumps({nome: dados[nome] for nome in campos})
+
+        # Cabeçalhos em JSON na primeira linha, corpo da resposta em seguida
+        return json.dumps(headers).encode() + b"\n" + body
+
+    key = await response_cache.catalog_key("livro", livro_id, ",".join(campos or []))
+    cached_headers, body = (await response_cache.get_or_load(key, load)).split(b"\n", 1)
+    headers = json.loads(cached_headers)
+
+    if is_not_modified(request.headers, headers["ETag"], headers.get("Last-Modified")):
+        return not_modified(headers)
+
+    return Response(body, media_type="application/json", headers=headers)
 
 @router.put("/{livro_id}", response_model=Livro)
 async def update_livro(
     livro_id: int,
     livro_update: LivroUpdate,
     capa: UploadFile = File(None),
-    current_user: models.Usuario = Depends(require_bibliotecario),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(require_bibliotecario),
+    db: AsyncSession = Depends(get_db)
 ):
     """Atualizar livro (apenas bibliotecário)"""
-    db_livro = db.query(models.Livro).filter(models.Livro.id == livro_id).first()
+    db_livro = await db.get(models.Livro, livro_id)
     if not db_livro:
         raise HTTPException(status_code=404, detail="Livro não encontrado")
 
+    if livro_update.quantidade_exemplares:
+        if not await resize_copies(db, livro_id, livro_update.quantidade_exemplares):
+            raise HTTPException(status_code=409, detail="Há mais exemplares emprestados do que a nova quantidade")
+
     try:
         if capa:
             if db_livro.capa:
@@ -107,39 +246,55 @@ async def update_livro(
             db_livro.descricao = livro_update.descricao
         if livro_update.paginas:
             db_livro.paginas = livro_update.paginas
-        if livro_update.quantidade_exemplares:
-            db_livro.quantidade_exemplares = livro_update.quantidade_exemplares
 
-        db.commit()
-        db.refresh(db_livro)
+        await db.commit()
+        await response_cache.invalidate_catalog()
+        await db.refresh(db_livro)
         return db_livro
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/{livro_id}")
-def delete_livro(
+async def delete_livro(
     livro_id: int,
-    current_user: models.Usuario = Depends(require_bibliotecario),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(require_bibliotecario),
+    db: AsyncSession = Depends(get_db)
 ):
-    db_livro = db.query(models.Livro).filter(models.Livro.id == livro_id).first()
+    db_livro = await db.get(models.Livro, livro_id)
     if not db_livro:
         raise HTTPException(status_code=404, detail="Livro não encontrado")
 
     if db_livro.capa:
         delete_upload_file(db_livro.capa)
 
-    db.delete(db_livro)
-    db.commit()
+    await db.execute(delete(models.Livro).where(models.Livro.id == livro_id))
+    await db.commit()
+    await response_cache.invalidate_catalog()
 
     return {"message": "Livro deletado com sucesso"}
 
 @router.get("/capas/{filename}")
-async def get_capa(filename: str):
+async def get_capa(filename: str, request: Request, size: Optional[str] = None):
     file_path = UPLOAD_DIR / filename
+    stat_result = None
+
+    if size:
+        if size not in COVER_SIZES:
+            raise HTTPException(status_code=400, detail=f"Tamanho inválido. Opções: {', '.join(COVER_SIZES)}")
+
+        extension = "webp" if "image/webp" in request.headers.get("accept", "") else "jpg"
+        derivative_path = get_derivative_path(filename, size, extension)
+        stat_result = await stat_file(derivative_path)
+        if stat_result is not None:
+            file_path = derivative_path
 
-    if not file_path.exists():
+    if stat_result is None:
+        stat_result = await stat_file(file_path)
+    if stat_result is None:
         raise HTTPException(status_code=404, detail="Imagem não encontrada")
 
-    return FileResponse(file_path)
\ No newline at end of file
+    return cover_file_response(
+        file_path, stat_result, request.headers, request.method,
+        headers={"vary": "Accept"} if size else None
+    )
\ No newline at end of file
@@ -1,46 +1,98 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, update, delete, insert, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
+from collections import Counter
 from typing import Optional
-from database import get_db
+from database import get_db, get_read_db, read_session, client_key
 from dependencies import get_current_user, require_bibliotecario
-from schemas import Emprestimo, EmprestimoCreate, EmprestimoUpdate, EmprestimoSimple
+from schemas import (
+    Emprestimo, EmprestimoCreate, EmprestimoUpdate, EmprestimoSimple, EmprestimoResumo, CurrentUser,
+    EmprestimoLoteCreate, DevolucaoLote, ResultadoLote
+)
+from pagination import paginate, MAX_PAGE_SIZE
+from response_cache import response_cache
+from serialization import FAST_JSON, FastJSONResponse, rows_as_dicts, output_names
+from exports import export_response
+from availability import ACTIVE_STATUSES, reserve_copy, release_copy, reserve_copies, release_copies
+from overdue import OVERDUE_STATUS, active_status, last_sweep
+from http_cache import http_date
 import models
 
 router = APIRouter(prefix="/emprestimos", tags=["Empréstimos"])
 
-@router.post("/", response_model=Emprestimo)
-def create_emprestimo(
-    emprestimo: EmprestimoCreate,
-    current_user: models.Usuario = Depends(require_bibliotecario),
-    db: Session = Depends(get_db)
-):
+# Empréstimo completo: a resposta aninha usuario e livro, que vêm no mesmo
+# SELECT por JOIN (muitos-para-um, chaves obrigatórias) antes da serialização
+def _select_emprestimo():
+    return select(models.Emprestimo).options(
+        joinedload(models.Emprestimo.usuario, innerjoin=True),
+        joinedload(models.Emprestimo.livro, innerjoin=True)
+    )
 
-    livro = db.query(models.Livro).filter(models.Livro.id == emprestimo.livro_id).first()
-    if not livro:
-        raise HTTPException(status_code=404, detail="Livro não encontrado")
+async def _get_emprestimo(db: AsyncSession, emprestimo_id: int):
+    result = await db.execute(
+        _select_emprestimo()
+        .where(models.Emprestimo.id == emprestimo_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
 
-    emprestimos_ativos = db.query(models.Emprestimo).filter(
-        models.Emprestimo.livro_id == emprestimo.livro_id,
-        models.Emprestimo.status == "emprestado"
-    ).count()
+# Projeção plana usada na listagem e na exportação, sem carregar objetos ORM
+def _select_emprestimos_resumo():
+    return select(
+        models.Emprestimo.id,
+        models.Emprestimo.usuario_id,
+        models.Emprestimo.livro_id,
+        models.Emprestimo.data_emprestimo,
+        models.Emprestimo.data_devolucao_prevista,
+        models.Emprestimo.data_devolucao_real,
+        models.Emprestimo.status,
+        models.Usuario.nome.label("usuario_nome"),
+        models.Livro.titulo.label("livro_titulo")
+    ).join(models.Usuario).join(models.Livro)
 
-    if emprestimos_ativos >= livro.quantidade_exemplares:
-        raise HTTPException(status_code=400, detail="Não há exemplares disponíveis")
+def _select_emprestimos_lista(current_user: CurrentUser, usuario_id: Optional[int], status: Optional[str]):
+    query = _select_emprestimos_resumo()
 
-    usuario = db.query(models.Usuario).filter(models.Usuario.id == emprestimo.usuario_id).first()
+    if current_user.role != "bibliotecario":
+        query = query.where(models.Emprestimo.usuario_id == current_user.id)
+    else:
+        if usuario_id:
+            query = query.where(models.Emprestimo.usuario_id == usuario_id)
+
+    if status:
+        query = query.where(models.Emprestimo.status == status)
+    return query
+
+def _select_atrasados():
+    return _select_emprestimo().where(models.Emprestimo.status == OVERDUE_STATUS)
+
+@router.post("/", response_model=Emprestimo)
+async def create_emprestimo(
+    emprestimo: EmprestimoCreate,
+    current_user: CurrentUser = Depends(require_bibliotecario),
+    db: AsyncSession = Depends(get_db)
+):
+
+    usuario = await db.get(models.Usuario, emprestimo.usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
-    emprestimo_existente = db.query(models.Emprestimo).filter(
+    emprestimo_existente = await db.scalar(select(models.Emprestimo.id).where(
         models.Emprestimo.usuario_id == emprestimo.usuario_id,
         models.Emprestimo.livro_id == emprestimo.livro_id,
-        models.Emprestimo.status == "emprestado"
-    ).first()
+        models.Emprestimo.status.in_(ACTIVE_STATUSES)
+    ))
 
     if emprestimo_existente:
         raise HTTPException(status_code=400, detail="Usuário já possui este livro emprestado")
 
+    if not await reserve_copy(db, emprestimo.livro_id):
+        if await db.get(models.Livro, emprestimo.livro_id) is None:
+            raise HTTPException(status_code=404, detail="Livro não encontrado")
+        raise HTTPException(status_code=400, detail="Não há exemplares disponíveis")
+
     db_emprestimo = models.Emprestimo(
         usuario_id=emprestimo.usuario_id,
         livro_id=emprestimo.livro_id,
@@ -50,68 +102,195 @@ def create_emprestimo(
     )
 
     db.add(db_emprestimo)
-    db.commit()
-    db.refresh(db_emprestimo)
+    await db.commit()
+    await response_cache.invalidate_catalog()
+
+    return await _get_emprestimo(db, db_emprestimo.id)
 
-    return db_emprestimo
+def _resultado_lote(itens):
+    sucesso = sum(1 for item in itens if item["sucesso"])
+    return {"sucesso": sucesso, "falhas": len(itens) - sucesso, "itens": itens}
 
-@router.get("/")
-def list_emprestimos(
-    skip: int = 0,
-    limit: int = 10,
+@router.post("/batch", response_model=ResultadoLote)
+async def create_emprestimos_lote(
+    lote: EmprestimoLoteCreate,
+    current_user: CurrentUser = Depends(require_bibliotecario),
+    db: AsyncSession = Depends(get_db)
+):
+    """Vários empréstimos numa transação, com as verificações feitas em
+    conjunto; cada item informa se foi criado ou por que falhou"""
+    itens = lote.itens
+    usuario_ids = {item.usuario_id for item in itens}
+    livro_ids = {item.livro_id for item in itens}
+
+    usuarios = set((await db.scalars(
+        select(models.Usuario.id).where(models.Usuario.id.in_(usuario_ids))
+    )).all())
+    # FOR UPDATE segura a disponibilidade lida até o commit (ignorado no SQLite)
+    disponiveis = dict((await db.execute(
+        select(models.Livro.id, models.Livro.exemplares_disponiveis)
+        .where(models.Livro.id.in_(livro_ids))
+        .with_for_update()
+    )).all())
+    ja_emprestados = set((await db.execute(
+        select(models.Emprestimo.usuario_id, models.Emprestimo.livro_id).where(
+            tuple_(models.Emprestimo.usuario_id, models.Emprestimo.livro_id).in_(
+                {(item.usuario_id, item.livro_id) for item in itens}
+            ),
+            models.Emprestimo.status.in_(ACTIVE_STATUSES)
+        )
+    )).all())
+
+    resultados = []
+    aceitos = []
+    reservas = Counter()
+    for indice, item in enumerate(itens):
+        par = (item.usuario_id, item.livro_id)
+        erro = None
+        if item.usuario_id not in usuarios:
+            erro = "Usuário não encontrado"
+        elif item.livro_id not in disponiveis:
+            erro = "Livro não encontrado"
+        elif par in ja_emprestados:
+            erro = "Usuário já possui este livro emprestado"
+        elif reservas[item.livro_id] >= disponiveis[item.livro_id]:
+            erro = "Não há exemplares disponíveis"
+
+        if erro:
+            resultados.append({"indice": indice, "sucesso": False, "erro": erro})
+            continue
+
+        ja_emprestados.add(par)
+        reservas[item.livro_id] += 1
+        aceitos.append((indice, item))
+        resultados.append({"indice": indice, "sucesso": True})
+
+    if aceitos:
+        if not await reserve_copies(db, dict(reservas)):
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Disponibilidade alterada por outra operação, tente novamente")
+
+        agora = datetime.now()
+        # Os pares (usuario, livro) aceitos são únicos: identificam cada id
+        # devolvido sem exigir RETURNING ordenado, que desfaz o lote no SQLite
+        criados = (await db.execute(
+            insert(models.Emprestimo).returning(
+                models.Emprestimo.usuario_id, models.Emprestimo.livro_id, models.Emprestimo.id
+            ),
+            [
+                {
+                    "usuario_id": item.usuario_id,
+                    "livro_id": item.livro_id,
+                    "data_emprestimo": agora,
+                    "data_devolucao_prevista": item.data_devolucao_prevista,
+                    "status": "emprestado",
+                }
+                for _, item in aceitos
+            ]
+        )).all()
+        await db.commit()
+        await response_cache.invalidate_catalog()
+
+        ids = {(usuario_id, livro_id): emprestimo_id for usuario_id, livro_id, emprestimo_id in criados}
+        for indice, item in aceitos:
+            resultados[indice]["emprestimo_id"] = ids[(item.usuario_id, item.livro_id)]
+
+    return _resultado_lote(resultados)
+
+@router.post("/devolver-batch", response_model=ResultadoLote)
+async def devolver_lote(
+    lote: DevolucaoLote,
+    current_user: CurrentUser = Depends(require_bibliotecario),
+    db: AsyncSession = Depends(get_db)
+):
+    """Devolução de vários empréstimos numa transação"""
+    existentes = dict((await db.execute(
+        select(models.Emprestimo.id, models.Emprestimo.livro_id)
+        .where(models.Emprestimo.id.in_(set(lote.emprestimo_ids)))
+    )).all())
+
+    # UPDATE condicional único; o RETURNING diz quais estavam ativos de fato
+    devolvidos = dict((await db.execute(
+        update(models.Emprestimo)
+        .where(
+            models.Emprestimo.id.in_(set(lote.emprestimo_ids)),
+            models.Emprestimo.status.in_(ACTIVE_STATUSES)
+        )
+        .values(data_devolucao_real=datetime.now(), status="devolvido")
+        .returning(models.Emprestimo.id, models.Emprestimo.livro_id)
+        .execution_options(synchronize_session=False)
+    )).all())
+
+    if devolvidos:
+        await release_copies(db, dict(Counter(devolvidos.values())))
+    await db.commit()
+    await response_cache.invalidate_catalog()
+
+    resultados = []
+    vistos = set()
+    for indice, emprestimo_id in enumerate(lote.emprestimo_ids):
+        if emprestimo_id not in existentes:
+            resultados.append({"indice": indice, "sucesso": False, "emprestimo_id": emprestimo_id, "erro": "Empréstimo não encontrado"})
+        elif emprestimo_id in devolvidos and emprestimo_id not in vistos:
+            resultados.append({"indice": indice, "sucesso": True, "emprestimo_id": emprestimo_id})
+        else:
+            resultados.append({"indice": indice, "sucesso": False, "emprestimo_id": emprestimo_id, "erro": "Este livro já foi devolvido"})
+        vistos.add(emprestimo_id)
+
+    return _resultado_lote(resultados)
+
+# Com response_model as datas saem no formato do pydantic ("Z" para UTC),
+# o mesmo que FastJSONResponse escreve no caminho rápido
+@router.get("/", response_model=list[EmprestimoResumo])
+async def list_emprestimos(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
     status: Optional[str] = None,
     usuario_id: Optional[int] = None,
-    current_user: models.Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
 
-    query = db.query(
-        models.Emprestimo.id,
-        models.Emprestimo.usuario_id,
-        models.Emprestimo.livro_id,
-        models.Emprestimo.data_emprestimo,
-        models.Emprestimo.data_devolucao_prevista,
-        models.Emprestimo.data_devolucao_real,
-        models.Emprestimo.status,
-        models.Usuario.nome.label("usuario_nome"),
-        models.Livro.titulo.label("livro_titulo")
-    ).join(models.Usuario).join(models.Livro)
+    query = _select_emprestimos_lista(current_user, usuario_id, status)
+    result, next_cursor = await paginate(db, query, models.Emprestimo.id, skip, after, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    if current_user.role != "bibliotecario":
-        query = query.filter(models.Emprestimo.usuario_id == current_user.id)
-    else:
-        if usuario_id:
-            query = query.filter(models.Emprestimo.usuario_id == usuario_id)
+    emprestimos = [row._asdict() for row in result]
+    if FAST_JSON:
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return FastJSONResponse(emprestimos, headers=headers)
+
+    return emprestimos
+
+@router.get("/export")
+async def export_emprestimos(
+    request: Request,
+    formato: str = "csv",
+    status: Optional[str] = None,
+    usuario_id: Optional[int] = None,
+    current_user: CurrentUser = Depends(require_bibliotecario)
+):
+    """Exporta os empréstimos em CSV, JSONL ou Parquet (apenas bibliotecário)"""
+    query = _select_emprestimos_resumo().order_by(models.Emprestimo.id)
 
+    if usuario_id:
+        query = query.where(models.Emprestimo.usuario_id == usuario_id)
     if status:
-        query = query.filter(models.Emprestimo.status == status)
-
-    result = query.offset(skip).limit(limit).all()
-
-    emprestimos = []
-    for row in result:
-        emprestimos.append({
-            "id": row.id,
-            "usuario_id": row.usuario_id,
-            "livro_id": row.livro_id,
-            "data_emprestimo": row.data_emprestimo,
-            "data_devolucao_prevista": row.data_devolucao_prevista,
-            "data_devolucao_real": row.data_devolucao_real,
-            "status": row.status,
-            "usuario_nome": row.usuario_nome,
-            "livro_titulo": row.livro_titulo
-        })
+        query = query.where(models.Emprestimo.status == status)
 
-    return emprestimos
+    return export_response(read_session(client_key(request)), query, formato, "emprestimos")
 
 @router.get("/{emprestimo_id}", response_model=Emprestimo)
-def get_emprestimo(
+async def get_emprestimo(
     emprestimo_id: int,
-    current_user: models.Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
 
-    emprestimo = db.query(models.Emprestimo).filter(models.Emprestimo.id == emprestimo_id).first()
+    emprestimo = await _get_emprestimo(db, emprestimo_id)
     if not emprestimo:
         raise HTTPException(status_code=404, detail="Empréstimo não encontrado")
 
@@ -121,96 +300,134 @@ def get_emprestimo(
     return emprestimo
 
 @router.put("/{emprestimo_id}/devolver", response_model=Emprestimo)
-def devolver_livro(
+async def devolver_livro(
     emprestimo_id: int,
-    current_user: models.Usuario = Depends(require_bibliotecario),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(require_bibliotecario),
+    db: AsyncSession = Depends(get_db)
 ):
 
-    emprestimo = db.query(models.Emprestimo).filter(models.Emprestimo.id == emprestimo_id).first()
+    emprestimo = await db.get(models.Emprestimo, emprestimo_id)
     if not emprestimo:
         raise HTTPException(status_code=404, detail="Empréstimo não encontrado")
 
-    if emprestimo.status != "emprestado":
+    result = await db.execute(
+        update(models.Emprestimo)
+        .where(models.Emprestimo.id == emprestimo_id, models.Emprestimo.status.in_(ACTIVE_STATUSES))
+        .values(data_devolucao_real=datetime.now(), status="devolvido")
+    )
+    if result.rowcount == 0:
         raise HTTPException(status_code=400, detail="Este livro já foi devolvido")
 
-    emprestimo.data_devolucao_real = datetime.now()
-    emprestimo.status = "devolvido"
-
-    db.commit()
-    db.refresh(emprestimo)
+    await release_copy(db, emprestimo.livro_id)
+    await db.commit()
+    await response_cache.invalidate_catalog()
 
-    return emprestimo
+    return await _get_emprestimo(db, emprestimo_id)
 
 @router.put("/{emprestimo_id}", response_model=Emprestimo)
-def update_emprestimo(
+async def update_emprestimo(
     emprestimo_id: int,
     emprestimo_update: EmprestimoUpdate,
-    current_user: models.Usuario = Depends(require_bibliotecario),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(require_bibliotecario),
+    db: AsyncSession = Depends(get_db)
 ):
 
-    emprestimo = db.query(models.Emprestimo).filter(models.Emprestimo.id == emprestimo_id).first()
+    emprestimo = await db.get(models.Emprestimo, emprestimo_id)
     if not emprestimo:
         raise HTTPException(status_code=404, detail="Empréstimo não encontrado")
 
+    novo_status = emprestimo_update.status
+
     if emprestimo_update.data_devolucao_prevista:
         emprestimo.data_devolucao_prevista = emprestimo_update.data_devolucao_prevista
+        # Prazo prorrogado tira o empréstimo de "atrasado"; prazo vencido o coloca
+        if not novo_status and emprestimo.status in ACTIVE_STATUSES:
+            novo_status = active_status(emprestimo_update.data_devolucao_prevista)
 
     if emprestimo_update.data_devolucao_real:
         emprestimo.data_devolucao_real = emprestimo_update.data_devolucao_real
 
-    if emprestimo_update.status:
-        emprestimo.status = emprestimo_update.status
+    if novo_status and novo_status != emprestimo.status:
+        was_active = emprestimo.status in ACTIVE_STATUSES
+        now_active = novo_status in ACTIVE_STATUSES
 
-    db.commit()
-    db.refresh(emprestimo)
+        result = await db.execute(
+            update(models.Emprestimo)
+            .where(models.Emprestimo.id == emprestimo_id, models.Emprestimo.status == emprestimo.status)
+            .values(status=novo_status)
+        )
+        if result.rowcount == 0:
+            raise HTTPException(status_code=409, detail="Empréstimo alterado por outra operação")
 
-    return emprestimo
+        if was_active and not now_active:
+            await release_copy(db, emprestimo.livro_id)
+        elif now_active and not was_active:
+            if not await reserve_copy(db, emprestimo.livro_id):
+                raise HTTPException(status_code=400, detail="Não há exemplares disponíveis")
+
+    await db.commit()
+    await response_cache.invalidate_catalog()
+
+    return await _get_emprestimo(db, emprestimo_id)
 
 @router.delete("/{emprestimo_id}")
-def delete_emprestimo(
+async def delete_emprestimo(
     emprestimo_id: int,
-    current_user: models.Usuario = Depends(require_bibliotecario),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(require_bibliotecario),
+    db: AsyncSession = Depends(get_db)
 ):
 
-    emprestimo = db.query(models.Emprestimo).filter(models.Emprestimo.id == emprestimo_id).first()
+    emprestimo = await db.get(models.Emprestimo, emprestimo_id)
     if not emprestimo:
         raise HTTPException(status_code=404, detail="Empréstimo não encontrado")
 
-    db.delete(emprestimo)
-    db.commit()
+    result = await db.execute(
+        delete(models.Emprestimo)
+        .where(models.Emprestimo.id == emprestimo_id, models.Emprestimo.status == emprestimo.status)
+    )
+    if result.rowcount and emprestimo.status in ACTIVE_STATUSES:
+        await release_copy(db, emprestimo.livro_id)
+    await db.commit()
+    await response_cache.invalidate_catalog()
 
     return {"message": "Empréstimo deletado com sucesso"}
 
 @router.get("/usuario/{usuario_id}", response_model=list[EmprestimoSimple])
-def get_emprestimos_usuario(
+async def get_emprestimos_usuario(
     usuario_id: int,
-    current_user: models.Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
 
     if current_user.role != "bibliotecario" and current_user.id != usuario_id:
         raise HTTPException(status_code=403, detail="Sem permissão para ver empréstimos deste usuário")
 
-    emprestimos = db.query(models.Emprestimo).filter(
+    result = await db.execute(_select_emprestimos_resumo().where(
         models.Emprestimo.usuario_id == usuario_id
-    ).all()
+    ))
 
-    return emprestimos
+    if FAST_JSON:
+        return FastJSONResponse(rows_as_dicts(result, output_names(EmprestimoSimple)))
+    return [row._asdict() for row in result]
 
 @router.get("/atrasados/", response_model=list[Emprestimo])
-def get_emprestimos_atrasados(
-    current_user: models.Usuario = Depends(require_bibliotecario),
-    db: Session = Depends(get_db)
+async def get_emprestimos_atrasados(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: CurrentUser = Depends(require_bibliotecario),
+    db: AsyncSession = Depends(get_read_db)
 ):
+    """Empréstimos já marcados como atrasados pela tarefa periódica"""
+    emprestimos, next_cursor = await paginate(
+        db, _select_atrasados(), models.Emprestimo.id, skip, after, limit
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    hoje = datetime.now().date()
-
-    emprestimos_atrasados = db.query(models.Emprestimo).filter(
-        models.Emprestimo.status == "emprestado",
-        models.Emprestimo.data_devolucao_prevista < hoje
-    ).all()
+    ultima = await last_sweep(db)
+    if ultima:
+        response.headers["X-Atrasados-Atualizado-Em"] = http_date(ultima)
 
-    return emprestimos_atrasados
\ No newline at end of file
+    return emprestimos
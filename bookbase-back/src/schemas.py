@@ -65,6 +65,15 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
 
+class CurrentUser(BaseModel):
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    id: int
+    email: str
+    role: UserRole
+    is_active: bool
+    token_version: int = 0
+
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
@@ -93,9 +102,10 @@ class LivroBase(BaseModel):
 
 class LivrosPaginados(BaseModel):
     livros: List["Livro"]
-    total: int
+    total: Optional[int] = None
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
 
 class LivroCreate(LivroBase):
     titulo: str
@@ -118,10 +128,21 @@ class Livro(LivroBase):
     model_config = ConfigDict(from_attributes=True)
 
     id: int
+    exemplares_disponiveis: int
     capa: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+class ErroImportacao(BaseModel):
+    linha: int
+    isbn: Optional[str] = None
+    erros: List[str]
+
+class ImportacaoLivros(BaseModel):
+    total: int
+    importados: int
+    erros: List[ErroImportacao]
+
 class EmprestimoBase(BaseModel):
     usuario_id: int
     livro_id: int
@@ -130,6 +151,23 @@ class EmprestimoBase(BaseModel):
 class EmprestimoCreate(EmprestimoBase):
     pass
 
+class EmprestimoLoteCreate(BaseModel):
+    itens: List[EmprestimoCreate] = Field(..., min_length=1, max_length=200)
+
+class DevolucaoLote(BaseModel):
+    emprestimo_ids: List[int] = Field(..., min_length=1, max_length=200)
+
+class ResultadoItemLote(BaseModel):
+    indice: int
+    sucesso: bool
+    emprestimo_id: Optional[int] = None
+    erro: Optional[str] = None
+
+class ResultadoLote(BaseModel):
+    sucesso: int
+    falhas: int
+    itens: List[ResultadoItemLote]
+
 class EmprestimoUpdate(BaseModel):
     data_devolucao_prevista: Optional[datetime] = None
     data_devolucao_real: Optional[datetime] = None
@@ -149,7 +187,7 @@ class Emprestimo(EmprestimoBase):
     livro: Livro
 
 class EmprestimoSimple(BaseModel):
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
     id: int
     usuario_id: int
@@ -162,4 +200,16 @@ class EmprestimoSimple(BaseModel):
     usuario_nome: str = Field(..., alias="usuario.nome")
     livro_titulo: str = Field(..., alias="livro.titulo")
 
-    LivrosPaginados.model_rebuild()
\ No newline at end of file
+    LivrosPaginados.model_rebuild()
+
+# Linha da listagem de empréstimos (projeção plana de _select_emprestimos_resumo)
+class EmprestimoResumo(BaseModel):
+    id: int
+    usuario_id: int
+    livro_id: int
+    data_emprestimo: datetime
+    data_devolucao_prevista: datetime
+    data_devolucao_real: Optional[datetime] = None
+    status: str
+    usuario_nome: str
+    livro_titulo: str
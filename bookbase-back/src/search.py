@@ -0,0 +1,124 @@
+import re
+import logging
+from sqlalchemy import text, func, or_, select, literal_column, table, column
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+logger = logging.getLogger(__name__)
+
+TS_CONFIG = "portuguese"
+
+POSTGRES_DDL = [
+    f"""
+    ALTER TABLE livros ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(titulo, '')), 'A') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(autor, '')), 'A') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(categoria, '')), 'B') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(descricao, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_livros_search_vector ON livros USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE livros_fts USING fts5(
+        titulo, autor, categoria, descricao,
+        content='livros', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS livros_fts_ai AFTER INSERT ON livros BEGIN
+        INSERT INTO livros_fts(rowid, titulo, autor, categoria, descricao)
+        VALUES (new.id, new.titulo, new.autor, new.categoria, new.descricao);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS livros_fts_ad AFTER DELETE ON livros BEGIN
+        INSERT INTO livros_fts(livros_fts, rowid, titulo, autor, categoria, descricao)
+        VALUES ('delete', old.id, old.titulo, old.autor, old.categoria, old.descricao);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS livros_fts_au AFTER UPDATE ON livros BEGIN
+        INSERT INTO livros_fts(livros_fts, rowid, titulo, autor, categoria, descricao)
+        VALUES ('delete', old.id, old.titulo, old.autor, old.categoria, old.descricao);
+        INSERT INTO livros_fts(rowid, titulo, autor, categoria, descricao)
+        VALUES (new.id, new.titulo, new.autor, new.categoria, new.descricao);
+    END
+    """,
+    "INSERT INTO livros_fts(livros_fts) VALUES ('rebuild')",
+]
+
+def setup_search(conn):
+    """Cria a estrutura de busca textual do catálogo (idempotente)."""
+    dialect = conn.dialect.name
+
+    if dialect == "postgresql":
+        for statement in POSTGRES_DDL:
+            conn.execute(text(statement))
+    elif dialect == "sqlite":
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'livros_fts'")
+        ).first()
+        if not exists:
+            for statement in SQLITE_DDL:
+                conn.execute(text(statement))
+    else:
+        logger.info(f"Busca textual sem índice para o dialeto {dialect}")
+
+def drop_search(conn):
+    dialect = conn.dialect.name
+
+    if dialect == "postgresql":
+        conn.execute(text("DROP INDEX IF EXISTS ix_livros_search_vector"))
+        conn.execute(text("ALTER TABLE livros DROP COLUMN IF EXISTS search_vector"))
+    elif dialect == "sqlite":
+        for trigger in ("livros_fts_ai", "livros_fts_ad", "livros_fts_au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        conn.execute(text("DROP TABLE IF EXISTS livros_fts"))
+
+def _fts5_query(q: str) -> str:
+    tokens = re.findall(r"\w+", q)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+def search_statement(dialect: str, q: str):
+    """Consulta de busca para o dialeto; None se q não tiver termos buscáveis."""
+    stmt = select(models.Livro)
+
+    if dialect == "postgresql":
+        ts_query = func.websearch_to_tsquery(TS_CONFIG, q)
+        vector = literal_column("livros.search_vector")
+        stmt = stmt.where(vector.op("@@")(ts_query)).order_by(
+            func.ts_rank(vector, ts_query).desc(), models.Livro.id
+        )
+    elif dialect == "sqlite":
+        match = _fts5_query(q)
+        if not match:
+            return None
+        fts = table("livros_fts", column("rowid"))
+        fts_ref = literal_column("livros_fts")
+        stmt = stmt.join(fts, fts.c.rowid == models.Livro.id).where(
+            fts_ref.op("MATCH")(match)
+        ).order_by(
+            func.bm25(fts_ref, 10.0, 10.0, 4.0, 1.0), models.Livro.id
+        )
+    else:
+        pattern = f"%{q}%"
+        stmt = stmt.where(or_(
+            models.Livro.titulo.ilike(pattern),
+            models.Livro.autor.ilike(pattern),
+            models.Livro.categoria.ilike(pattern),
+            models.Livro.descricao.ilike(pattern),
+        )).order_by(models.Livro.id)
+    return stmt
+
+async def search_livros(db: AsyncSession, q: str, skip: int, limit: int):
+    stmt = search_statement(db.bind.dialect.name, q)
+    if stmt is None:
+        return []
+
+    result = await db.execute(stmt.offset(skip).limit(limit))
+    return result.scalars().all()
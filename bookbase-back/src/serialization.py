@@ -0,0 +1,42 @@
+import os
+from typing import Any, Iterable, Optional, Sequence
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+# Caminho rápido opcional: FAST_JSON=1 troca a classe de resposta padrão por
+# orjson e monta as listas direto das tuplas do banco, sem validar item a item
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+# OPT_UTC_Z escreve UTC como "Z", igual ao pydantic
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+def output_names(schema: type[BaseModel]) -> list[str]:
+    """Chaves do JSON do schema (o alias, quando houver, como o FastAPI faz)."""
+    return [field.alias or name for name, field in schema.model_fields.items()]
+
+def rows_as_dicts(rows: Iterable[Sequence], names: Sequence[str]) -> list[dict]:
+    return [dict(zip(names, row)) for row in rows]
+
+def parse_fields(schema: type[BaseModel], fields: Optional[str], required: Sequence[str] = ("id",)) -> Optional[list[str]]:
+    """Interpreta o parâmetro fields= (campos separados por vírgula). Devolve
+    os campos pedidos mais os obrigatórios, na ordem do schema, ou None para
+    a resposta completa."""
+    if not fields:
+        return None
+
+    pedidos = {field.strip() for field in fields.split(",") if field.strip()}
+    invalidos = pedidos - set(schema.model_fields)
+    if invalidos:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(sorted(invalidos))}")
+
+    pedidos.update(required)
+    return [field for field in schema.model_fields if field in pedidos]
@@ -0,0 +1,112 @@
+import os
+import shutil
+import asyncio
+import tempfile
+import argparse
+import logging
+import importlib.util
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+def _default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+
+def _prepare_database():
+    """Roda uma vez, no processo principal, antes de subir os workers."""
+    from database import wait_for_database, dispose_engines
+    from migrate import run_migrations
+
+    async def prepare():
+        try:
+            await wait_for_database()
+        finally:
+            await dispose_engines()
+
+    asyncio.run(prepare())
+    run_migrations()
+
+def _prepare_cache(workers: int):
+    """O cache em memória é de cada processo: com vários workers, a
+    invalidação feita num deles não chega aos outros, que serviriam o
+    catálogo antigo até o TTL. Sem Redis, o catálogo fica sem cache."""
+    from response_cache import is_shared
+
+    url = os.getenv("CACHE_URL", "memory://")
+    if workers > 1 and not is_shared(url) and not url.startswith("none://"):
+        logger.warning(f"CACHE_URL={url} não é compartilhado entre {workers} workers; cache de respostas desligado")
+        os.environ["CACHE_URL"] = "none://"
+
+def _check_replica_stickiness(workers: int):
+    """Com réplicas e vários workers, a marca de escrita recente precisa ser
+    compartilhada: guardada só no processo, a leitura seguinte pode cair em
+    outro worker e ir para uma réplica atrasada."""
+    from database import DATABASE_REPLICA_URLS, REPLICA_STICKY_URL
+
+    if workers > 1 and DATABASE_REPLICA_URLS and not REPLICA_STICKY_URL.startswith(("redis://", "rediss://")):
+        logger.warning(
+            f"REPLICA_STICKY_URL={REPLICA_STICKY_URL} não é compartilhado entre {workers} workers; "
+            "uma leitura logo após a escrita pode não vê-la"
+        )
+
+def _prepare_process_pools(workers: int):
+    """Cada worker abre os seus pools de bcrypt e de imagens: sem ajuste,
+    são workers × (PASSWORD_WORKERS + IMAGE_WORKERS) processos disputando
+    as CPUs. Divide metade das CPUs entre os workers, salvo configuração
+    explícita."""
+    por_worker = max(1, (os.cpu_count() or 1) // (2 * workers))
+    padroes = {"PASSWORD_WORKERS": por_worker, "IMAGE_WORKERS": min(2, por_worker)}
+    for nome, valor in padroes.items():
+        if not os.getenv(nome):
+            os.environ[nome] = str(valor)
+    logger.info(
+        f"{workers} workers com {os.environ['PASSWORD_WORKERS']} processos de bcrypt "
+        f"e {os.environ['IMAGE_WORKERS']} de imagens cada"
+    )
+
+def _prepare_metrics_dir():
+    """Diretório compartilhado das métricas dos workers, limpo a cada subida
+    para não somar valores de uma execução anterior."""
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+    else:
+        path = tempfile.mkdtemp(prefix="bookbase-metrics-")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de produção da API do Bookbase")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8002")))
+    parser.add_argument("--workers", type=int, default=_default_workers(),
+                        help="Processos de trabalho (padrão: WEB_CONCURRENCY ou número de CPUs)")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+                        help="Segundos para concluir as requisições em andamento após SIGTERM")
+    parser.add_argument("--skip-migrations", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_migrations:
+        _prepare_database()
+    # Os workers são processos novos (spawn) e herdam o ambiente: nenhum
+    # deles aplica migrações de novo
+    os.environ["RUN_MIGRATIONS"] = "0"
+    _check_replica_stickiness(args.workers)
+    _prepare_cache(args.workers)
+    _prepare_process_pools(args.workers)
+    _prepare_metrics_dir()
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "auto",
+        http="httptools" if importlib.util.find_spec("httptools") else "auto",
+        # Em SIGTERM o uvicorn para de aceitar conexões e espera as em andamento
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import os
+import time
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from metrics import route_label
+
+logger = logging.getLogger(__name__)
+
+# Comandos acima deste tempo vão para o log com a rota
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Os parâmetros trazem emails, hashes de senha e tokens: só entram no log
+# com SLOW_QUERY_LOG_PARAMS=1 (depuração local)
+SLOW_QUERY_LOG_PARAMS = os.getenv("SLOW_QUERY_LOG_PARAMS", "0") == "1"
+# Comandos distintos guardados para o /debug/sql (por processo)
+SQL_STATS_SIZE = int(os.getenv("SQL_STATS_SIZE", "500"))
+# Tamanho máximo dos parâmetros no log de lentidão
+SLOW_QUERY_PARAMS_CHARS = 500
+
+class RequestQueries:
+    """Comandos SQL executados durante uma requisição."""
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} consultas"'
+
+class StatementStats:
+    """Totais por comando SQL desde a subida do processo."""
+
+    def __init__(self, maxsize: int = SQL_STATS_SIZE):
+        self.maxsize = maxsize
+        self.entries: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        with self._lock:
+            entry = self.entries.get(statement)
+            if entry is None:
+                if len(self.entries) >= self.maxsize:
+                    # Cheio: descarta o comando de menor tempo acumulado
+                    menor = min(self.entries, key=lambda key: self.entries[key][1])
+                    del self.entries[menor]
+                entry = self.entries[statement] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def top(self, limit: int) -> list[dict]:
+        with self._lock:
+            entries = sorted(self.entries.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {
+                "sql": statement,
+                "execucoes": count,
+                "total_ms": round(total * 1000, 2),
+                "media_ms": round(total / count * 1000, 3),
+                "max_ms": round(maximo * 1000, 2),
+            }
+            for statement, (count, total, maximo) in entries
+        ]
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+statement_stats = StatementStats()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_start"].pop()
+    statement_stats.record(statement, seconds)
+
+    request = _current.get()
+    if request is not None:
+        request.count += 1
+        request.seconds += seconds
+
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        rota = route_label(request.scope) if request else "<fora de requisição>"
+        if SLOW_QUERY_LOG_PARAMS:
+            logger.warning(
+                "Consulta lenta (%.1f ms) em %s: %s | parâmetros: %.*s",
+                seconds * 1000, rota, statement, SLOW_QUERY_PARAMS_CHARS, repr(parameters)
+            )
+        else:
+            logger.warning("Consulta lenta (%.1f ms) em %s: %s", seconds * 1000, rota, statement)
+
+def _handle_error(exception_context):
+    # Comando que falhou não passa pelo after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+def instrument_engine(engine):
+    """Mede os comandos SQL de um engine (síncrono ou AsyncEngine)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+class SQLTimingMiddleware:
+    """Conta e cronometra os comandos SQL de cada requisição e devolve o total
+    no cabeçalho Server-Timing (visível na aba de rede do navegador)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope)
+        token = _current.set(queries)
+
+        async def send_with_timing(message: Message) -> None:
+            # Respostas em streaming só contam o que rodou antes dos cabeçalhos
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", queries.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
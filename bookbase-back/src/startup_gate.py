@@ -0,0 +1,41 @@
+import os
+import asyncio
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+STARTUP_GATE_TIMEOUT = float(os.getenv("STARTUP_GATE_TIMEOUT", "10"))
+
+class StartupGateMiddleware:
+    """Segura as requisições que chegam antes de prepare() terminar: o
+    worker já aceita conexões logo que sobe, mas só atende depois de
+    aquecer os pools. Passado o prazo, ou se a inicialização falhou,
+    responde 503. Os caminhos em exempt (sondas e métricas) não esperam."""
+
+    def __init__(self, app: ASGIApp, exempt: tuple[str, ...] = (), timeout: float = STARTUP_GATE_TIMEOUT):
+        self.app = app
+        self.exempt = exempt
+        self.timeout = timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        startup = getattr(scope["app"].state, "startup", None)
+        if startup is not None:
+            if not startup.done():
+                # asyncio.wait não propaga o erro nem o cancelamento da tarefa
+                await asyncio.wait({startup}, timeout=self.timeout)
+            if not startup.done():
+                response = JSONResponse(
+                    status_code=503, content={"detail": "Servidor iniciando, tente novamente em instantes"},
+                    headers={"Retry-After": "1"},
+                )
+                await response(scope, receive, send)
+                return
+            if startup.cancelled() or startup.exception():
+                response = JSONResponse(status_code=503, content={"detail": "Falha na inicialização"})
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,206 @@
+import os
+import asyncio
+import tempfile
+import threading
+import time
+
+# Configuração antes de importar a aplicação: os módulos leem o ambiente na importação
+TMP_DIR = tempfile.mkdtemp(prefix="bookbase-testes-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{TMP_DIR}/teste.db",
+    "SECRET_KEY": "chave-de-teste",
+    "BCRYPT_ROUNDS": "4",
+    "PASSWORD_WORKERS": "1",
+    "IMAGE_WORKERS": "1",
+    "DB_WARM_CONNECTIONS": "1",
+    "OVERDUE_SWEEP_INTERVAL": "0",
+    "CACHE_URL": "memory://",
+    "LOGIN_LIMIT_IP": "10000/60",
+    "LOGIN_LIMIT_EMAIL": "10000/60",
+    "REGISTER_LIMIT_IP": "10000/60",
+    "REGISTER_LIMIT_EMAIL": "10000/60",
+    "CHANGE_PASSWORD_LIMIT_IP": "10000/60",
+    "CHANGE_PASSWORD_LIMIT_EMAIL": "10000/60",
+})
+# As capas vão para uploads/capas relativo ao diretório atual
+os.chdir(TMP_DIR)
+
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+PASSWORD = "senha123"
+
+@pytest.fixture(scope="session")
+def client():
+    from main import app
+
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 30
+        while client.get("/api/ready").status_code != 200:
+            assert time.monotonic() < deadline, "API não ficou pronta"
+            time.sleep(0.05)
+        yield client
+
+@pytest.fixture
+def api(client):
+    """Cliente com banco e caches vazios."""
+    import models
+    from database import engine, recent_writers
+    from dependencies import user_cache
+    from response_cache import response_cache, MemoryBackend
+
+    with engine.begin() as conn:
+        for table in (models.Emprestimo, models.Livro, models.Usuario, models.ExecucaoTarefa):
+            conn.execute(delete(table))
+    response_cache.backend = MemoryBackend(1000, response_cache.ttl)
+    user_cache.clear()
+    recent_writers.clear()
+    return client
+
+@pytest.fixture
+def make_user():
+    import models
+    from database import SessionLocal
+    from auth import get_password_hash
+
+    def make_user(email: str, role=models.UserRole.USUARIO, password: str = PASSWORD, **fields) -> int:
+        with SessionLocal() as db:
+            user = models.Usuario(
+                nome=fields.pop("nome", email.split("@")[0]), email=email,
+                senha=get_password_hash(password), role=role, **fields
+            )
+            db.add(user)
+            db.commit()
+            return user.id
+    return make_user
+
+@pytest.fixture
+def make_book():
+    import models
+    from database import SessionLocal
+
+    def make_book(isbn: str, quantidade: int = 1, **fields) -> int:
+        with SessionLocal() as db:
+            livro = models.Livro(
+                titulo=fields.pop("titulo", f"Livro {isbn}"), autor=fields.pop("autor", "Autor"),
+                isbn=isbn, ano=2000, quantidade_exemplares=quantidade, categoria="Romance",
+                paginas=100, descricao="Descrição", **fields
+            )
+            db.add(livro)
+            db.commit()
+            return livro.id
+    return make_book
+
+@pytest.fixture
+def login(api):
+    def login(email: str, password: str = PASSWORD) -> dict:
+        response = api.post("/auth/login-json", json={"email": email, "password": password})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return login
+
+@pytest.fixture
+def librarian(make_user, login):
+    import models
+    make_user("bibliotecaria@bookbase.com", models.UserRole.BIBLIOTECARIO)
+    return login("bibliotecaria@bookbase.com")
+
+def due_date(days: int = 14) -> str:
+    return (datetime.now() + timedelta(days=days)).isoformat()
+
+@pytest.fixture
+def replica(api, tmp_path, monkeypatch):
+    """Réplica falsa: outro SQLite, que não recebe as escritas do primário
+    (como uma réplica muito atrasada). Devolve o engine síncrono dela."""
+    import itertools
+    import database
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+    from migrate import run_migrations
+
+    url = f"sqlite:///{tmp_path}/replica.db"
+    sync_engine = create_engine(url)
+    run_migrations(sync_engine)
+    replica_engine = create_async_engine(database.get_async_url(url), poolclass=NullPool)
+    monkeypatch.setattr(database, "replica_engines", [replica_engine])
+    monkeypatch.setattr(database, "_replica_cycle", itertools.cycle([replica_engine]))
+    yield sync_engine
+    sync_engine.dispose()
+
+class RespServer:
+    """Servidor RESP mínimo com GET, SET, INCR e PEXPIRE; qualquer outro
+    comando (EVAL incluso) é recusado, como em substitutos do Redis. Com
+    stalled=True aceita conexões e comandos mas nunca responde."""
+
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.data = {}
+        self.ttls = {}
+        self.commands = []
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(self.handle, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2].decode())
+                if self.stalled:
+                    self.commands.append(args[0].upper())
+                    continue
+                writer.write(self.execute(args[0].upper(), *args[1:]))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def execute(self, command, *args) -> bytes:
+        self.commands.append(command)
+        if command == "INCR":
+            self.data[args[0]] = int(self.data.get(args[0], 0)) + 1
+            return b":%d\r\n" % self.data[args[0]]
+        if command == "PEXPIRE":
+            self.ttls[args[0]] = int(args[1])
+            return b":1\r\n"
+        if command == "GET":
+            value = self.data.get(args[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(str(value)), str(value).encode())
+        if command == "SET":
+            self.data[args[0]] = args[1]
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command.encode()
+
+    async def _shutdown(self):
+        self.server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+@pytest.fixture
+def resp_server():
+    server = RespServer()
+    yield server
+    server.close()
+
+@pytest.fixture
+def stalled_resp_server():
+    server = RespServer(stalled=True)
+    yield server
+    server.close()
@@ -0,0 +1,46 @@
+import models
+from conftest import PASSWORD
+
+def test_change_password_revokes_old_tokens(api, make_user, login):
+    make_user("leitor@bookbase.com")
+    antigo = login("leitor@bookbase.com")
+    assert api.get("/auth/me", headers=antigo).status_code == 200
+
+    response = api.put("/auth/change-password", headers=antigo, json={
+        "current_password": PASSWORD, "new_password": "nova-senha-1"
+    })
+    assert response.status_code == 200
+    novo = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    assert api.get("/auth/me", headers=antigo).status_code == 401
+    assert api.get("/auth/me", headers=novo).status_code == 200
+    assert api.post("/auth/login-json", json={"email": "leitor@bookbase.com", "password": PASSWORD}).status_code == 401
+
+def test_role_change_by_admin_revokes_tokens(api, make_user, login):
+    make_user("admin@bookbase.com", models.UserRole.ADMIN)
+    usuario_id = make_user("leitor@bookbase.com")
+    admin = login("admin@bookbase.com")
+    leitor = login("leitor@bookbase.com")
+
+    response = api.put(f"/auth/users/{usuario_id}", headers=admin, json={"role": "bibliotecario"})
+    assert response.status_code == 200
+
+    assert api.get("/auth/me", headers=leitor).status_code == 401
+    assert login("leitor@bookbase.com")
+
+def test_deactivated_user_is_refused(api, make_user, login):
+    make_user("admin@bookbase.com", models.UserRole.ADMIN)
+    usuario_id = make_user("leitor@bookbase.com")
+    admin = login("admin@bookbase.com")
+    leitor = login("leitor@bookbase.com")
+
+    api.put(f"/auth/users/{usuario_id}", headers=admin, json={"is_active": False})
+
+    assert api.get("/auth/me", headers=leitor).status_code == 401
+    response = api.post("/auth/login-json", json={"email": "leitor@bookbase.com", "password": PASSWORD})
+    assert response.status_code == 400
+
+def test_tampered_token_is_401(api, make_user, login):
+    make_user("leitor@bookbase.com")
+    token = login("leitor@bookbase.com")["Authorization"]
+    assert api.get("/auth/me", headers={"Authorization": token[:-2] + "xx"}).status_code == 401
@@ -0,0 +1,101 @@
+import asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+import models
+from conftest import due_date
+
+def _disponiveis(livro_id: int) -> int:
+    from database import SessionLocal
+    with SessionLocal() as db:
+        return db.scalar(select(models.Livro.exemplares_disponiveis).where(models.Livro.id == livro_id))
+
+def _emprestar(api, headers, usuario_id: int, livro_id: int):
+    return api.post("/emprestimos/", headers=headers, json={
+        "usuario_id": usuario_id, "livro_id": livro_id, "data_devolucao_prevista": due_date()
+    })
+
+async def _with_session(func):
+    # Engine próprio: as conexões do app pertencem ao loop do TestClient
+    from database import ASYNC_DATABASE_URL
+    engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+    try:
+        return await func(async_sessionmaker(engine, expire_on_commit=False))
+    finally:
+        await engine.dispose()
+
+def _atualizar(livro_id: int, **campos):
+    """Chama a rota diretamente: o corpo dela (modelo junto com File) não é
+    montado a partir de multipart nesta versão do FastAPI."""
+    from fastapi import HTTPException
+    from routers.books import update_livro
+    from schemas import LivroUpdate
+
+    async def atualizar(sessions):
+        async with sessions() as db:
+            try:
+                await update_livro(livro_id, LivroUpdate(**campos), capa=None, current_user=None, db=db)
+            except HTTPException as e:
+                return e.status_code
+            return 200
+
+    return asyncio.run(_with_session(atualizar))
+
+def test_loan_and_return_update_availability(api, librarian, make_user, make_book):
+    livro_id = make_book("9780000000001", quantidade=2)
+    leitores = [make_user(f"leitor{i}@bookbase.com") for i in range(3)]
+
+    assert _emprestar(api, librarian, leitores[0], livro_id).status_code == 200
+    emprestimo = _emprestar(api, librarian, leitores[1], livro_id)
+    assert emprestimo.status_code == 200
+    assert _disponiveis(livro_id) == 0
+
+    response = _emprestar(api, librarian, leitores[2], livro_id)
+    assert response.status_code == 400
+
+    api.put(f"/emprestimos/{emprestimo.json()['id']}/devolver", headers=librarian)
+    assert _disponiveis(livro_id) == 1
+
+def test_resize_keeps_copies_on_loan(api, librarian, make_user, make_book):
+    livro_id = make_book("9780000000001", quantidade=3)
+    for i in range(2):
+        assert _emprestar(api, librarian, make_user(f"leitor{i}@bookbase.com"), livro_id).status_code == 200
+
+    response = _atualizar(livro_id, quantidade_exemplares=5)
+    assert response == 200
+    assert _disponiveis(livro_id) == 3
+
+    response = _atualizar(livro_id, quantidade_exemplares=2)
+    assert response == 200
+    assert _disponiveis(livro_id) == 0
+
+def test_resize_below_copies_on_loan_is_409(api, librarian, make_user, make_book):
+    livro_id = make_book("9780000000001", quantidade=2)
+    for i in range(2):
+        _emprestar(api, librarian, make_user(f"leitor{i}@bookbase.com"), livro_id)
+
+    response = _atualizar(livro_id, quantidade_exemplares=1, titulo="Novo título")
+    assert response == 409
+
+    livro = api.get(f"/livros/{livro_id}").json()
+    assert livro["quantidade_exemplares"] == 2
+    assert livro["titulo"] != "Novo título"
+    assert _disponiveis(livro_id) == 0
+
+def test_concurrent_reservations_take_the_last_copy_once(api, make_book):
+    from availability import reserve_copy
+
+    livro_id = make_book("9780000000001", quantidade=1)
+
+    async def disputar(sessions):
+        async def reservar():
+            async with sessions() as db:
+                reservado = await reserve_copy(db, livro_id)
+                await db.commit()
+                return reservado
+        return await asyncio.gather(*(reservar() for _ in range(5)))
+
+    resultados = asyncio.run(_with_session(disputar))
+
+    assert resultados.count(True) == 1
+    assert _disponiveis(livro_id) == 0
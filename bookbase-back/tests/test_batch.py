@@ -0,0 +1,125 @@
+import pytest
+from sqlalchemy import select, func
+import models
+from conftest import due_date
+from database import SessionLocal
+
+def _disponiveis(livro_id: int) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(models.Livro.exemplares_disponiveis).where(models.Livro.id == livro_id))
+
+def _total_emprestimos() -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(models.Emprestimo))
+
+def _item(usuario_id: int, livro_id: int) -> dict:
+    return {"usuario_id": usuario_id, "livro_id": livro_id, "data_devolucao_prevista": due_date()}
+
+def _erros(resultado: dict) -> dict:
+    return {item["indice"]: item.get("erro") for item in resultado["itens"]}
+
+def test_create_batch_reports_each_item(api, librarian, make_user, make_book):
+    leitores = [make_user(f"leitor{i}@bookbase.com") for i in range(3)]
+    livro = make_book("9780000000001", quantidade=5)
+    ultimo_exemplar = make_book("9780000000002", quantidade=1)
+    ja_emprestado = make_book("9780000000003", quantidade=5)
+    response = api.post("/emprestimos/", headers=librarian, json=_item(leitores[0], ja_emprestado))
+    assert response.status_code == 200
+
+    response = api.post("/emprestimos/batch", headers=librarian, json={"itens": [
+        _item(leitores[0], livro),
+        _item(leitores[0], livro),              # repetido no próprio lote
+        _item(9999, livro),
+        _item(leitores[1], 9999),
+        _item(leitores[0], ja_emprestado),
+        _item(leitores[1], ultimo_exemplar),
+        _item(leitores[2], ultimo_exemplar),    # o exemplar já foi para o item anterior
+    ]})
+
+    assert response.status_code == 200
+    resultado = response.json()
+    assert (resultado["sucesso"], resultado["falhas"]) == (2, 5)
+    assert _erros(resultado) == {
+        0: None,
+        1: "Usuário já possui este livro emprestado",
+        2: "Usuário não encontrado",
+        3: "Livro não encontrado",
+        4: "Usuário já possui este livro emprestado",
+        5: None,
+        6: "Não há exemplares disponíveis",
+    }
+    assert _disponiveis(livro) == 4
+    assert _disponiveis(ultimo_exemplar) == 0
+
+    # Os ids devolvidos são dos empréstimos criados para cada item
+    with SessionLocal() as db:
+        for indice, (usuario_id, livro_id) in ((0, (leitores[0], livro)), (5, (leitores[1], ultimo_exemplar))):
+            emprestimo = db.get(models.Emprestimo, resultado["itens"][indice]["emprestimo_id"])
+            assert (emprestimo.usuario_id, emprestimo.livro_id) == (usuario_id, livro_id)
+
+def test_create_batch_with_no_valid_item_writes_nothing(api, librarian, make_book):
+    livro = make_book("9780000000001")
+
+    response = api.post("/emprestimos/batch", headers=librarian, json={"itens": [_item(9999, livro)]})
+
+    assert response.json()["falhas"] == 1
+    assert _total_emprestimos() == 0
+    assert _disponiveis(livro) == 1
+
+@pytest.mark.parametrize("quantidade", [0, 201])
+def test_create_batch_size_is_validated(api, librarian, quantidade):
+    response = api.post("/emprestimos/batch", headers=librarian, json={"itens": [_item(1, 1)] * quantidade})
+
+    assert response.status_code == 422
+
+def _emprestimos(api, librarian, make_user, make_book, quantidade: int) -> tuple[int, list[int]]:
+    livro = make_book("9780000000001", quantidade=quantidade)
+    itens = [_item(make_user(f"leitor{i}@bookbase.com"), livro) for i in range(quantidade)]
+    resultado = api.post("/emprestimos/batch", headers=librarian, json={"itens": itens}).json()
+    return livro, [item["emprestimo_id"] for item in resultado["itens"]]
+
+def test_return_batch_with_duplicates_and_returned_loans(api, librarian, make_user, make_book):
+    livro, (primeiro, segundo, terceiro) = _emprestimos(api, librarian, make_user, make_book, 3)
+    response = api.put(f"/emprestimos/{terceiro}/devolver", headers=librarian)
+    assert response.status_code == 200
+    assert _disponiveis(livro) == 1
+
+    response = api.post("/emprestimos/devolver-batch", headers=librarian, json={
+        "emprestimo_ids": [primeiro, primeiro, terceiro, 9999, segundo]
+    })
+
+    assert response.status_code == 200
+    resultado = response.json()
+    assert (resultado["sucesso"], resultado["falhas"]) == (2, 3)
+    assert _erros(resultado) == {
+        0: None,
+        1: "Este livro já foi devolvido",
+        2: "Este livro já foi devolvido",
+        3: "Empréstimo não encontrado",
+        4: None,
+    }
+    assert [item["emprestimo_id"] for item in resultado["itens"]] == [primeiro, primeiro, terceiro, 9999, segundo]
+    # Cada empréstimo devolve o exemplar uma única vez
+    assert _disponiveis(livro) == 3
+
+    with SessionLocal() as db:
+        assert db.get(models.Emprestimo, primeiro).status == "devolvido"
+        assert db.get(models.Emprestimo, primeiro).data_devolucao_real is not None
+
+def test_return_batch_twice_is_all_failures(api, librarian, make_user, make_book):
+    livro, ids = _emprestimos(api, librarian, make_user, make_book, 2)
+    api.post("/emprestimos/devolver-batch", headers=librarian, json={"emprestimo_ids": ids})
+
+    resultado = api.post("/emprestimos/devolver-batch", headers=librarian, json={"emprestimo_ids": ids}).json()
+
+    assert (resultado["sucesso"], resultado["falhas"]) == (0, 2)
+    assert _disponiveis(livro) == 2
+
+@pytest.mark.parametrize("url, corpo", [
+    ("/emprestimos/batch", {"itens": [_item(1, 1)]}),
+    ("/emprestimos/devolver-batch", {"emprestimo_ids": [1]}),
+])
+def test_batches_are_staff_only(api, make_user, login, url, corpo):
+    make_user("leitor@bookbase.com")
+
+    assert api.post(url, headers=login("leitor@bookbase.com"), json=corpo).status_code == 403
@@ -0,0 +1,89 @@
+import io
+import os
+import pytest
+from sqlalchemy import create_engine, delete, insert, select
+import models
+import catalog_import
+from catalog_import import import_catalog
+
+CSV_HEADER = "titulo,autor,isbn,ano,quantidade_exemplares,categoria,paginas,descricao\n"
+
+def _csv(*isbns: str) -> str:
+    return CSV_HEADER + "".join(f"Livro {isbn},Autor,{isbn},2000,2,Romance,100,Descrição\n" for isbn in isbns)
+
+def _upload(api, headers, conteudo: str):
+    return api.post(
+        "/livros/import", headers=headers,
+        files={"arquivo": ("livros.csv", conteudo.encode(), "text/csv")},
+    )
+
+def _livro(isbn: str) -> dict:
+    return {
+        "titulo": f"Livro {isbn}", "autor": "Autor", "isbn": isbn, "ano": 2000, "quantidade_exemplares": 1,
+        "exemplares_disponiveis": 1, "categoria": "Romance", "paginas": 100, "descricao": "Descrição",
+    }
+
+def test_import_reports_existing_isbn(api, librarian, make_book):
+    make_book("9780000000002")
+
+    response = _upload(api, librarian, _csv("9780000000001", "9780000000002", "9780000000003", "9780000000001"))
+    assert response.status_code == 200, response.text
+    relatorio = response.json()
+
+    assert relatorio["total"] == 4
+    assert relatorio["importados"] == 2
+    assert [(erro["linha"], erro["erros"]) for erro in relatorio["erros"]] == [
+        (3, ["ISBN já cadastrado"]), (5, ["ISBN repetido no arquivo"])
+    ]
+    livro = api.get("/livros/", params={"limit": 10}).json()["livros"]
+    assert sorted(item["isbn"] for item in livro) == ["9780000000001", "9780000000002", "9780000000003"]
+
+def test_concurrent_insert_falls_back_to_row_by_row(api, monkeypatch):
+    from database import engine
+
+    insert_rows = catalog_import._insert_rows
+
+    def insert_with_concurrent_writer(conn, rows):
+        # Outra importação grava o mesmo ISBN entre a conferência e o lote
+        with engine.begin() as outra:
+            outra.execute(insert(models.Livro.__table__), [_livro("9780000000002")])
+        insert_rows(conn, rows)
+
+    monkeypatch.setattr(catalog_import, "_insert_rows", insert_with_concurrent_writer)
+    relatorio = import_catalog(engine, io.StringIO(_csv("9780000000001", "9780000000002", "9780000000003")), "csv")
+
+    assert relatorio["importados"] == 2
+    assert relatorio["erros"] == [{"linha": 3, "isbn": "9780000000002", "erros": ["ISBN já cadastrado"]}]
+
+@pytest.mark.skipif(not os.getenv("POSTGRES_TEST_URL"), reason="POSTGRES_TEST_URL não definido")
+def test_copy_conflict_falls_back_on_postgres():
+    """COPY pelo psycopg2 com um ISBN gravado depois da conferência."""
+    from migrate import run_migrations
+
+    engine = create_engine(os.environ["POSTGRES_TEST_URL"])
+    run_migrations(engine)
+    isbns = ["9789990000001", "9789990000002", "9789990000003"]
+    limpar = delete(models.Livro).where(models.Livro.isbn.in_(isbns))
+
+    with engine.begin() as conn:
+        conn.execute(limpar)
+    copy_rows = catalog_import._copy_rows
+
+    def copy_with_concurrent_writer(conn, rows):
+        with engine.begin() as outra:
+            outra.execute(insert(models.Livro.__table__), [_livro(isbns[1])])
+        copy_rows(conn, rows)
+
+    try:
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(catalog_import, "_copy_rows", copy_with_concurrent_writer)
+            relatorio = import_catalog(engine, io.StringIO(_csv(*isbns)), "csv")
+
+        assert relatorio["importados"] == 2
+        assert [erro["isbn"] for erro in relatorio["erros"]] == [isbns[1]]
+        with engine.connect() as conn:
+            assert sorted(conn.scalars(select(models.Livro.isbn).where(models.Livro.isbn.in_(isbns)))) == isbns
+    finally:
+        with engine.begin() as conn:
+            conn.execute(limpar)
+        engine.dispose()
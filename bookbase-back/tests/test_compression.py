@@ -0,0 +1,71 @@
+import uuid
+import pytest
+from config import UPLOAD_DIR
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+@pytest.fixture
+def upload():
+    """Arquivo qualquer servido por /uploads, com a extensão pedida."""
+    criados = []
+
+    def upload(extension: str, content: bytes) -> str:
+        path = UPLOAD_DIR / f"{uuid.uuid4()}.{extension}"
+        path.write_bytes(content)
+        criados.append(path)
+        return path.name
+
+    yield upload
+    for path in criados:
+        path.unlink(missing_ok=True)
+
+def test_large_json_is_gzipped(api, make_book):
+    for i in range(20):
+        make_book(f"97800000000{i:02d}")
+
+    response = api.get("/livros/", params={"limit": 20}, headers=GZIP)
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    # O httpx descomprime: o corpo continua sendo o JSON completo
+    assert len(response.json()["livros"]) == 20
+
+def test_small_json_is_not_gzipped(api):
+    response = api.get("/api/health", headers=GZIP)
+
+    assert "Content-Encoding" not in response.headers
+
+def test_no_gzip_without_accept_encoding(api, make_book):
+    for i in range(20):
+        make_book(f"97800000000{i:02d}")
+
+    response = api.get("/livros/", params={"limit": 20}, headers={"Accept-Encoding": "identity"})
+
+    assert "Content-Encoding" not in response.headers
+
+def test_text_files_are_gzipped(api, upload):
+    nome = upload("txt", b"texto " * 1000)
+
+    response = api.get(f"/uploads/{nome}", headers=GZIP)
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.content == b"texto " * 1000
+
+def test_images_are_not_gzipped(api, upload):
+    nome = upload("jpg", b"\xff\xd8\xff" + b"\0" * 5000)
+
+    response = api.get(f"/livros/capas/{nome}", headers=GZIP)
+
+    assert response.headers["Content-Type"] == "image/jpeg"
+    assert "Content-Encoding" not in response.headers
+
+def test_partial_responses_are_not_gzipped(api, upload):
+    conteudo = b"0123456789" * 500
+    nome = upload("txt", conteudo)
+
+    response = api.get(f"/uploads/{nome}", headers={**GZIP, "Range": "bytes=100-2099"})
+
+    assert response.status_code == 206
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Content-Length"] == "2000"
+    assert response.content == conteudo[100:2100]
@@ -0,0 +1,121 @@
+import io
+import csv
+import json
+import asyncio
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+import models
+from conftest import due_date
+from database import ASYNC_DATABASE_URL
+from exports import export_response
+
+def _loan(api, headers, usuario_id, livro_id):
+    response = api.post("/emprestimos/", headers=headers, json={
+        "usuario_id": usuario_id, "livro_id": livro_id, "data_devolucao_prevista": due_date()
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def test_livros_csv_export(api, librarian, make_book):
+    ids = [make_book(f"97800000000{i:02d}", titulo=f"Título, com vírgula {i}") for i in range(3)]
+
+    response = api.get("/livros/export", params={"formato": "csv"}, headers=librarian)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/csv")
+    assert response.headers["Content-Disposition"] == 'attachment; filename="livros.csv"'
+    linhas = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(linha["id"]) for linha in linhas] == ids
+    assert linhas[0]["titulo"] == "Título, com vírgula 0"
+    assert set(linhas[0]) >= {"isbn", "quantidade_exemplares", "exemplares_disponiveis", "created_at"}
+
+def test_empty_csv_export_has_only_the_header(api, librarian):
+    response = api.get("/livros/export", headers=librarian)
+
+    assert response.status_code == 200
+    assert response.text.strip().split(",")[0] == "id"
+    assert len(response.text.strip().splitlines()) == 1
+
+def test_emprestimos_jsonl_export(api, librarian, make_user, make_book):
+    usuario_id = make_user("leitor@bookbase.com", nome="Leitora")
+    livros = [make_book("9780000000001", titulo="Iracema"), make_book("9780000000002")]
+    ids = [_loan(api, librarian, usuario_id, livro_id) for livro_id in livros]
+
+    response = api.get("/emprestimos/export", params={"formato": "jsonl"}, headers=librarian)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("application/x-ndjson")
+    assert response.headers["Content-Disposition"] == 'attachment; filename="emprestimos.jsonl"'
+    registros = [json.loads(linha) for linha in response.text.splitlines()]
+    assert [registro["id"] for registro in registros] == ids
+    assert registros[0]["usuario_nome"] == "Leitora"
+    assert registros[0]["livro_titulo"] == "Iracema"
+    assert registros[0]["status"] == "emprestado"
+
+def test_emprestimos_export_filters(api, librarian, make_user, make_book):
+    leitor = make_user("leitor@bookbase.com")
+    outro = make_user("outro@bookbase.com")
+    livro_id = make_book("9780000000001", quantidade=3)
+    do_leitor = _loan(api, librarian, leitor, livro_id)
+    _loan(api, librarian, outro, livro_id)
+
+    response = api.get("/emprestimos/export", params={"formato": "jsonl", "usuario_id": leitor}, headers=librarian)
+    assert [json.loads(linha)["id"] for linha in response.text.splitlines()] == [do_leitor]
+
+    response = api.get("/emprestimos/export", params={"formato": "jsonl", "status": "devolvido"}, headers=librarian)
+    assert response.text == ""
+
+@pytest.mark.parametrize("url", ["/livros/export", "/emprestimos/export"])
+def test_export_is_staff_only(api, make_user, login, url):
+    make_user("leitor@bookbase.com")
+
+    assert api.get(url).status_code == 403
+    assert api.get(url, headers=login("leitor@bookbase.com")).status_code == 403
+
+@pytest.mark.parametrize("url", ["/livros/export", "/emprestimos/export"])
+def test_unknown_format_is_400(api, librarian, url):
+    response = api.get(url, params={"formato": "xlsx"}, headers=librarian)
+
+    assert response.status_code == 400
+
+def test_parquet_without_pyarrow_is_400(api, librarian):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        pytest.skip("pyarrow instalado")
+
+    response = api.get("/livros/export", params={"formato": "parquet"}, headers=librarian)
+
+    assert response.status_code == 400
+    assert "pyarrow" in response.json()["detail"]
+
+def test_parquet_export_round_trips(api, librarian, make_book):
+    pq = pytest.importorskip("pyarrow.parquet")
+    ids = [make_book(f"97800000000{i:02d}") for i in range(3)]
+
+    response = api.get("/livros/export", params={"formato": "parquet"}, headers=librarian)
+
+    assert response.status_code == 200
+    tabela = pq.read_table(io.BytesIO(response.content))
+    assert tabela.column("id").to_pylist() == ids
+
+def test_export_streams_one_chunk_per_batch(api, make_book):
+    for i in range(5):
+        make_book(f"97800000000{i:02d}")
+
+    async def run():
+        engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+        try:
+            stmt = select(*models.Livro.__table__.columns).order_by(models.Livro.id)
+            response = export_response(AsyncSession(engine), stmt, "jsonl", "livros", batch_size=2)
+            return [chunk async for chunk in response.body_iterator]
+        finally:
+            await engine.dispose()
+
+    chunks = asyncio.run(run())
+
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
@@ -0,0 +1,132 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+import pytest
+from conftest import due_date
+from config import UPLOAD_DIR
+from http_cache import parse_range
+
+CONTEUDO = bytes(range(256)) * 4
+
+@pytest.fixture
+def cover_file():
+    path = UPLOAD_DIR / f"{uuid.uuid4()}.jpg"
+    path.write_bytes(CONTEUDO)
+    yield path.name
+    path.unlink(missing_ok=True)
+
+def test_livro_has_validators_and_revalidates(api, make_book):
+    livro_id = make_book("9780000000001")
+
+    response = api.get(f"/livros/{livro_id}")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+    etag = response.headers["ETag"]
+    assert etag.startswith('"') and response.headers["Last-Modified"]
+
+    revalidado = api.get(f"/livros/{livro_id}", headers={"If-None-Match": etag})
+    assert revalidado.status_code == 304
+    assert revalidado.content == b""
+    assert revalidado.headers["ETag"] == etag
+
+    assert api.get(f"/livros/{livro_id}", headers={"If-None-Match": '"outra"'}).status_code == 200
+    assert api.get(f"/livros/{livro_id}", headers={"If-None-Match": f'W/{etag}, "outra"'}).status_code == 304
+
+def test_livro_if_modified_since(api, make_book):
+    livro_id = make_book("9780000000001")
+    last_modified = parsedate_to_datetime(api.get(f"/livros/{livro_id}").headers["Last-Modified"])
+
+    depois = formatdate((last_modified + timedelta(hours=1)).timestamp(), usegmt=True)
+    antes = formatdate((last_modified - timedelta(hours=1)).timestamp(), usegmt=True)
+
+    assert api.get(f"/livros/{livro_id}", headers={"If-Modified-Since": depois}).status_code == 304
+    assert api.get(f"/livros/{livro_id}", headers={"If-Modified-Since": antes}).status_code == 200
+    assert api.get(f"/livros/{livro_id}", headers={"If-Modified-Since": "ontem"}).status_code == 200
+
+def test_if_none_match_wins_over_if_modified_since(api, make_book):
+    livro_id = make_book("9780000000001")
+    futuro = formatdate((datetime.now(timezone.utc) + timedelta(days=1)).timestamp(), usegmt=True)
+
+    response = api.get(f"/livros/{livro_id}", headers={"If-None-Match": '"outra"', "If-Modified-Since": futuro})
+    assert response.status_code == 200
+
+def test_partial_representation_has_its_own_etag(api, make_book):
+    livro_id = make_book("9780000000001")
+    completo = api.get(f"/livros/{livro_id}").headers["ETag"]
+    parcial = api.get(f"/livros/{livro_id}", params={"fields": "titulo"})
+
+    assert parcial.headers["ETag"] != completo
+    # A ETag da representação completa não valida a parcial, e vice-versa
+    assert api.get(f"/livros/{livro_id}", params={"fields": "titulo"}, headers={"If-None-Match": completo}).status_code == 200
+    assert api.get(f"/livros/{livro_id}", params={"fields": "titulo"}, headers={"If-None-Match": parcial.headers["ETag"]}).status_code == 304
+
+def test_etag_changes_when_the_book_changes(api, make_book, make_user, librarian):
+    livro_id = make_book("9780000000001", quantidade=2)
+    usuario_id = make_user("leitor@bookbase.com")
+    antes = api.get(f"/livros/{livro_id}").headers["ETag"]
+
+    response = api.post("/emprestimos/", headers=librarian, json={
+        "usuario_id": usuario_id, "livro_id": livro_id, "data_devolucao_prevista": due_date()
+    })
+    assert response.status_code == 200
+
+    depois = api.get(f"/livros/{livro_id}", headers={"If-None-Match": antes})
+    assert depois.status_code == 200
+    assert depois.headers["ETag"] != antes
+
+@pytest.mark.parametrize("prefixo", ["/livros/capas", "/uploads"])
+def test_cover_is_immutable_and_revalidates(api, cover_file, prefixo):
+    response = api.get(f"{prefixo}/{cover_file}")
+    assert response.status_code == 200
+    assert response.content == CONTEUDO
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+    etag = response.headers["ETag"]
+    assert api.get(f"{prefixo}/{cover_file}", headers={"If-None-Match": etag}).status_code == 304
+    last_modified = response.headers["Last-Modified"]
+    assert api.get(f"{prefixo}/{cover_file}", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+@pytest.mark.parametrize("prefixo", ["/livros/capas", "/uploads"])
+@pytest.mark.parametrize("intervalo, inicio, fim", [
+    ("bytes=0-9", 0, 9),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=-24", 1000, 1023),
+    ("bytes=1000-5000", 1000, 1023),
+])
+def test_cover_range_is_206(api, cover_file, prefixo, intervalo, inicio, fim):
+    response = api.get(f"{prefixo}/{cover_file}", headers={"Range": intervalo})
+
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes {inicio}-{fim}/{len(CONTEUDO)}"
+    assert response.headers["Content-Length"] == str(fim - inicio + 1)
+    assert response.content == CONTEUDO[inicio:fim + 1]
+
+@pytest.mark.parametrize("intervalo", ["bytes=5000-", "bytes=20-10", "bytes=-0"])
+def test_unsatisfiable_range_is_416(api, cover_file, intervalo):
+    response = api.get(f"/livros/capas/{cover_file}", headers={"Range": intervalo})
+
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(CONTEUDO)}"
+
+def test_range_is_ignored_when_if_range_does_not_match(api, cover_file):
+    etag = api.get(f"/livros/capas/{cover_file}").headers["ETag"]
+
+    igual = api.get(f"/livros/capas/{cover_file}", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert igual.status_code == 206
+
+    diferente = api.get(f"/livros/capas/{cover_file}", headers={"Range": "bytes=0-9", "If-Range": '"antiga"'})
+    assert diferente.status_code == 200
+    assert diferente.content == CONTEUDO
+
+@pytest.mark.parametrize("cabecalho, esperado", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=0-9,20-29", None),
+    ("linhas=0-9", None),
+    ("bytes=a-b", None),
+    ("bytes=100-", False),
+])
+def test_parse_range(cabecalho, esperado):
+    assert parse_range(cabecalho, 100) == esperado
@@ -0,0 +1,56 @@
+import os
+import sys
+import subprocess
+from pathlib import Path
+import pytest
+import dependencies
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+WORKER = """
+import metrics
+metrics.HTTP_REQUESTS.labels("GET", "/livros/", "200").inc()
+"""
+
+SCRAPE = """
+from fastapi.testclient import TestClient
+from main import app
+response = TestClient(app).get("/metrics")
+assert response.status_code == 200, response.status_code
+print(response.text)
+"""
+
+def _run(code: str, env: dict) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=SRC_DIR, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+def test_metrics_sum_every_worker(tmp_path):
+    """Dois processos gravam no diretório compartilhado e o /metrics de um
+    terceiro devolve a soma."""
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for _ in range(2):
+        _run(WORKER, env)
+
+    saida = _run(SCRAPE, env)
+
+    assert 'bookbase_http_requests_total{method="GET",rota="/livros/",status="200"} 2.0' in saida
+
+@pytest.mark.parametrize("headers, status", [
+    ({}, 401),
+    ({"Authorization": "Bearer errado"}, 401),
+    ({"Authorization": "Bearer segredo-do-scraper"}, 200),
+])
+def test_metrics_token_is_required_when_configured(client, monkeypatch, headers, status):
+    monkeypatch.setattr(dependencies, "METRICS_TOKEN", "segredo-do-scraper")
+
+    assert client.get("/metrics", headers=headers).status_code == status
+
+def test_metrics_open_without_token(client, monkeypatch):
+    monkeypatch.setattr(dependencies, "METRICS_TOKEN", "")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "bookbase_http_requests_total" in response.text
@@ -0,0 +1,56 @@
+from sqlalchemy import create_engine, inspect, text
+from alembic import command
+from migrate import run_migrations, get_alembic_config
+
+def _baseline_database(tmp_path, name: str):
+    """Banco no formato do create_all original (revisão 0001), com dados e
+    sem a tabela alembic_version."""
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    with engine.begin() as conn:
+        command.upgrade(get_alembic_config(conn), "0001")
+        conn.execute(text("DROP TABLE alembic_version"))
+        conn.execute(text(
+            "INSERT INTO usuarios (id, nome, email, senha, role, is_active) "
+            "VALUES (1, 'Leitor', 'leitor@bookbase.com', 'x', 'USUARIO', 1)"
+        ))
+        conn.execute(text(
+            "INSERT INTO livros (id, titulo, autor, isbn, ano, quantidade_exemplares, categoria, paginas, descricao) "
+            "VALUES (1, 'Livro', 'Autor', '9780000000001', 2000, 3, 'Romance', 100, 'd')"
+        ))
+        conn.execute(text(
+            "INSERT INTO emprestimos (usuario_id, livro_id, data_devolucao_prevista, status) "
+            "VALUES (1, 1, '2030-01-01', 'emprestado'), (1, 1, '2020-01-01', 'devolvido')"
+        ))
+    return engine
+
+def _columns(conn, table):
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+def test_baseline_database_gets_token_version(tmp_path):
+    engine = _baseline_database(tmp_path, "base.db")
+    run_migrations(engine)
+
+    with engine.connect() as conn:
+        assert "token_version" in _columns(conn, "usuarios")
+        assert conn.scalar(text("SELECT token_version FROM usuarios WHERE id = 1")) == 0
+
+def test_database_created_at_token_version_commit_upgrades(tmp_path):
+    # create_all com o models.py da época já criava token_version
+    engine = _baseline_database(tmp_path, "token.db")
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE usuarios ADD COLUMN token_version INTEGER NOT NULL DEFAULT 3"))
+
+    run_migrations(engine)
+
+    with engine.connect() as conn:
+        assert conn.scalar(text("SELECT token_version FROM usuarios WHERE id = 1")) == 3
+        assert conn.scalar(text("SELECT version_num FROM alembic_version")) is not None
+
+def test_baseline_database_gets_available_copies(tmp_path):
+    engine = _baseline_database(tmp_path, "exemplares.db")
+    run_migrations(engine)
+
+    with engine.connect() as conn:
+        assert "exemplares_disponiveis" in _columns(conn, "livros")
+        # 3 exemplares, um empréstimo em aberto e um devolvido
+        assert conn.scalar(text("SELECT exemplares_disponiveis FROM livros WHERE id = 1")) == 2
@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime, timedelta
+from conftest import due_date
+
+def _emprestar(api, headers, usuario_id: int, livro_id: int, dias: int = 14) -> dict:
+    response = api.post("/emprestimos/", headers=headers, json={
+        "usuario_id": usuario_id, "livro_id": livro_id, "data_devolucao_prevista": due_date(dias)
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def _atrasados(api, headers) -> list[int]:
+    return [emprestimo["id"] for emprestimo in api.get("/emprestimos/atrasados/", headers=headers).json()]
+
+def test_sweep_marks_due_loans(api, librarian, make_user, make_book):
+    from overdue import sweep_overdue
+
+    usuario_id = make_user("leitor@bookbase.com")
+    vencido = _emprestar(api, librarian, usuario_id, make_book("9780000000001"), dias=-3)
+    em_dia = _emprestar(api, librarian, usuario_id, make_book("9780000000002"))
+
+    assert asyncio.run(sweep_overdue()) == 1
+
+    assert _atrasados(api, librarian) == [vencido["id"]]
+    assert api.get(f"/emprestimos/{em_dia['id']}", headers=librarian).json()["status"] == "emprestado"
+
+def test_extending_due_date_clears_overdue(api, librarian, make_user, make_book):
+    from overdue import sweep_overdue
+
+    livro_id = make_book("9780000000001", quantidade=2)
+    emprestimo = _emprestar(api, librarian, make_user("leitor@bookbase.com"), livro_id, dias=-3)
+    asyncio.run(sweep_overdue())
+
+    response = api.put(f"/emprestimos/{emprestimo['id']}", headers=librarian, json={
+        "data_devolucao_prevista": due_date(7)
+    })
+    assert response.status_code == 200
+    assert response.json()["status"] == "emprestado"
+    assert _atrasados(api, librarian) == []
+    # Continua ocupando o exemplar
+    assert api.get(f"/livros/{livro_id}").json()["exemplares_disponiveis"] == 1
+
+def test_moving_due_date_to_the_past_marks_overdue(api, librarian, make_user, make_book):
+    emprestimo = _emprestar(api, librarian, make_user("leitor@bookbase.com"), make_book("9780000000001"))
+
+    ontem = (datetime.now() - timedelta(days=1)).isoformat()
+    response = api.put(f"/emprestimos/{emprestimo['id']}", headers=librarian, json={
+        "data_devolucao_prevista": ontem
+    })
+    assert response.json()["status"] == "atrasado"
+
+def test_returned_loan_keeps_status_when_due_date_changes(api, librarian, make_user, make_book):
+    emprestimo = _emprestar(api, librarian, make_user("leitor@bookbase.com"), make_book("9780000000001"), dias=-3)
+    api.put(f"/emprestimos/{emprestimo['id']}/devolver", headers=librarian)
+
+    response = api.put(f"/emprestimos/{emprestimo['id']}", headers=librarian, json={
+        "data_devolucao_prevista": due_date(7)
+    })
+    assert response.json()["status"] == "devolvido"
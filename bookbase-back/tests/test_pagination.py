@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+import models
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from database import SessionLocal, ASYNC_DATABASE_URL
+from pagination import encode_cursor, decode_cursor
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42
+
+def test_invalid_cursor_is_400():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("nao-e-um-cursor")
+    assert error.value.status_code == 400
+
+def test_livros_keyset_pages_cover_catalog_once(api, make_book):
+    ids = [make_book(f"97800000000{i:02d}") for i in range(25)]
+
+    vistos = []
+    response = api.get("/livros/", params={"limit": 10})
+    while True:
+        assert response.status_code == 200
+        pagina = response.json()
+        vistos += [livro["id"] for livro in pagina["livros"]]
+        if not pagina["next_cursor"]:
+            break
+        response = api.get("/livros/", params={"limit": 10, "after": pagina["next_cursor"]})
+
+    assert vistos == ids
+
+def test_cursor_is_stable_when_rows_are_inserted_before_it(api, make_book):
+    for i in range(5):
+        make_book(f"97800000001{i:02d}")
+    primeira = api.get("/livros/", params={"limit": 2}).json()
+
+    make_book("9780000000999")
+    segunda = api.get("/livros/", params={"limit": 2, "after": primeira["next_cursor"]}).json()
+
+    assert segunda["livros"][0]["id"] == primeira["livros"][-1]["id"] + 1
+
+def test_emprestimos_cursor_in_header(api, make_user, make_book, librarian):
+    usuario_id = make_user("leitor@bookbase.com")
+    livro_id = make_book("9780000000500", quantidade=10)
+    with SessionLocal() as db:
+        for _ in range(3):
+            db.add(models.Emprestimo(
+                usuario_id=usuario_id, livro_id=livro_id, status="devolvido",
+                data_devolucao_prevista=datetime.now() + timedelta(days=14)
+            ))
+        db.commit()
+
+    response = api.get("/emprestimos/", params={"limit": 2}, headers=librarian)
+    assert len(response.json()) == 2
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = api.get("/emprestimos/", params={"limit": 2, "after": cursor}, headers=librarian)
+    assert len(response.json()) == 1
+    assert "X-Next-Cursor" not in response.headers
+
+@pytest.mark.parametrize("url", ["/livros/", "/livros/search?q=livro", "/emprestimos/", "/emprestimos/atrasados/", "/auth/users"])
+@pytest.mark.parametrize("limit", [0, -1, 101])
+def test_out_of_range_limit_is_422(api, make_user, login, url, limit):
+    make_user("admin@bookbase.com", models.UserRole.ADMIN)
+    headers = login("admin@bookbase.com")
+    separador = "&" if "?" in url else "?"
+    assert api.get(f"{url}{separador}limit={limit}", headers=headers).status_code == 422
+
+def test_negative_skip_is_422(api, make_book):
+    assert api.get("/livros/", params={"skip": -1}).status_code == 422
+
+def test_zero_limit_page_has_no_cursor(api, make_book):
+    from pagination import paginate
+
+    make_book("9780000000001")
+    make_book("9780000000002")
+
+    async def run():
+        engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+        try:
+            async with AsyncSession(engine) as db:
+                return await paginate(db, select(models.Livro), models.Livro.id, 0, None, 0)
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(run()) == ([], None)
@@ -0,0 +1,85 @@
+"""Número de comandos SQL das rotas mais usadas. Cada teste cria várias
+linhas: uma consulta por linha (N+1) estoura o orçamento."""
+import pytest
+from datetime import datetime, timedelta
+import models
+from conftest import due_date
+from query_budget import query_budget
+
+LINHAS = 5
+
+@pytest.fixture
+def engine():
+    from database import async_engine
+    return async_engine
+
+@pytest.fixture
+def loans(api, make_user, make_book):
+    """LINHAS empréstimos atrasados de um leitor, cada um de um livro."""
+    from database import SessionLocal
+
+    usuario_id = make_user("leitor@bookbase.com")
+    livros = [make_book(f"97800000000{i:02d}", quantidade=3) for i in range(LINHAS)]
+    with SessionLocal() as db:
+        db.add_all(
+            models.Emprestimo(
+                usuario_id=usuario_id, livro_id=livro_id, status="atrasado",
+                data_devolucao_prevista=datetime.now() - timedelta(days=3)
+            )
+            for livro_id in livros
+        )
+        db.commit()
+    return usuario_id, livros
+
+@pytest.fixture
+def staff(api, librarian):
+    """Cabeçalhos do bibliotecário com o usuário do token já em cache, para o
+    orçamento contar só a rota."""
+    assert api.get("/auth/me", headers=librarian).status_code == 200
+    return librarian
+
+def test_list_livros(api, engine, loans):
+    with query_budget(engine, 2):
+        response = api.get("/livros/")
+    assert len(response.json()["livros"]) == LINHAS
+
+    # Segunda leitura sai do cache
+    with query_budget(engine, 0):
+        api.get("/livros/")
+
+def test_get_livro(api, engine, loans):
+    _, livros = loans
+    with query_budget(engine, 1):
+        assert api.get(f"/livros/{livros[0]}").status_code == 200
+    with query_budget(engine, 0):
+        assert api.get(f"/livros/{livros[0]}").status_code == 200
+
+def test_list_emprestimos(api, engine, staff, loans):
+    with query_budget(engine, 1):
+        response = api.get("/emprestimos/", headers=staff)
+    assert len(response.json()) == LINHAS
+
+def test_emprestimos_usuario(api, engine, staff, loans):
+    usuario_id, _ = loans
+    with query_budget(engine, 1):
+        response = api.get(f"/emprestimos/usuario/{usuario_id}", headers=staff)
+    assert len(response.json()) == LINHAS
+
+def test_atrasados(api, engine, staff, loans):
+    # Paginado (1) mais a data da última varredura (1)
+    with query_budget(engine, 2):
+        response = api.get("/emprestimos/atrasados/", headers=staff)
+    assert len(response.json()) == LINHAS
+
+def test_create_batch(api, engine, staff, make_user, make_book):
+    usuario_id = make_user("leitor@bookbase.com")
+    livros = [make_book(f"97800000001{i:02d}") for i in range(LINHAS)]
+    itens = [
+        {"usuario_id": usuario_id, "livro_id": livro_id, "data_devolucao_prevista": due_date()}
+        for livro_id in livros
+    ]
+
+    # Usuários, livros, duplicados, UPDATE dos exemplares e INSERT em lote
+    with query_budget(engine, 5):
+        response = api.post("/emprestimos/batch", headers=staff, json={"itens": itens})
+    assert response.json()["sucesso"] == LINHAS
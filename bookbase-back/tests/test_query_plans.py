@@ -0,0 +1,72 @@
+"""Planos das consultas quentes num banco populado por benchmarks.dataset.
+
+As consultas são montadas pelas mesmas funções que as rotas usam. Por
+padrão roda num SQLite temporário; com PLANS_DATABASE_URL apontando para um
+Postgres descartável, confere os planos dele.
+"""
+import os
+import pytest
+from sqlalchemy import create_engine, select, func
+import models
+from benchmarks.dataset import seed
+from migrate import run_migrations
+from overdue import due_loans_statement, overdue_cutoff
+from pagination import encode_cursor, page_statement
+from query_plans import sequential_scans
+from routers.books import _select_livros
+from routers.loans import _select_emprestimos_lista, _select_atrasados
+from schemas import CurrentUser
+from search import search_statement
+
+USUARIOS, LIVROS, EMPRESTIMOS = 2_000, 10_000, 50_000
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    url = os.getenv("PLANS_DATABASE_URL") or f"sqlite:///{tmp_path_factory.mktemp('planos')}/planos.db"
+    engine = create_engine(url)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        if not conn.scalar(select(func.count()).select_from(models.Livro)):
+            seed(conn, USUARIOS, LIVROS, EMPRESTIMOS)
+
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+def _usuario(conn, role=models.UserRole.USUARIO) -> CurrentUser:
+    usuario = conn.execute(
+        select(models.Usuario).where(models.Usuario.role == role).order_by(models.Usuario.id).limit(1)
+    ).first()
+    return CurrentUser.model_validate(usuario, from_attributes=True)
+
+def _pagina(stmt, id_column, after: int = None):
+    return page_statement(stmt, id_column, 0, encode_cursor(after) if after else None, 10)
+
+@pytest.mark.parametrize("nomes", [None, ["id", "titulo", "autor", "capa"]])
+def test_list_livros_cursor_page(conn, nomes):
+    stmt = _pagina(_select_livros(nomes), models.Livro.id, after=LIVROS // 2)
+    assert sequential_scans(conn, stmt) == []
+
+def test_list_emprestimos_for_reader(conn):
+    usuario = _usuario(conn)
+    stmt = _pagina(_select_emprestimos_lista(usuario, None, None), models.Emprestimo.id)
+    assert "emprestimos" not in sequential_scans(conn, stmt)
+
+def test_list_emprestimos_for_librarian_by_user(conn):
+    bibliotecario = _usuario(conn, models.UserRole.BIBLIOTECARIO)
+    usuario_id = _usuario(conn).id
+    stmt = _pagina(_select_emprestimos_lista(bibliotecario, usuario_id, "emprestado"), models.Emprestimo.id)
+    assert "emprestimos" not in sequential_scans(conn, stmt)
+
+@pytest.mark.parametrize("after", [None, EMPRESTIMOS // 2])
+def test_atrasados(conn, after):
+    stmt = _pagina(_select_atrasados(), models.Emprestimo.id, after=after)
+    assert "emprestimos" not in sequential_scans(conn, stmt)
+
+def test_search_livros(conn):
+    stmt = search_statement(conn.dialect.name, "jardim sombra").offset(0).limit(10)
+    assert "livros" not in sequential_scans(conn, stmt)
+
+def test_overdue_sweep(conn):
+    stmt = due_loans_statement(overdue_cutoff(), 1000)
+    assert sequential_scans(conn, stmt) == []
@@ -0,0 +1,118 @@
+import time
+import asyncio
+import pytest
+from query_budget import query_budget
+from conftest import PASSWORD, RespServer
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """Limitador ligado, com estado novo e limites pequenos."""
+    import rate_limit
+    from rate_limit import TokenBucket, MemoryBackend, rate_limiter
+
+    for operacao in ("login", "change_password"):
+        monkeypatch.setitem(rate_limit.LIMITS, operacao, (
+            TokenBucket(f"{operacao}_ip", "LIMITE_INEXISTENTE", "100/60"),
+            TokenBucket(f"{operacao}_email", "LIMITE_INEXISTENTE", "2/60"),
+        ))
+    monkeypatch.setattr(rate_limiter, "backend", MemoryBackend(1000))
+    monkeypatch.setattr(rate_limiter, "enabled", True)
+    return rate_limiter
+
+def test_login_is_limited_per_email_before_bcrypt(api, limiter, make_user, monkeypatch):
+    import routers.auth
+
+    make_user("leitor@bookbase.com")
+    chamadas = []
+    authenticate = routers.auth._authenticate
+
+    async def counting_authenticate(*args):
+        chamadas.append(args)
+        return await authenticate(*args)
+
+    monkeypatch.setattr(routers.auth, "_authenticate", counting_authenticate)
+    dados = {"email": "leitor@bookbase.com", "password": "errada"}
+
+    assert [api.post("/auth/login-json", json=dados).status_code for _ in range(2)] == [401, 401]
+    response = api.post("/auth/login-json", json=dados)
+
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 30
+    assert len(chamadas) == 2
+    # Outro email no mesmo IP ainda passa
+    outro = api.post("/auth/login-json", json={"email": "outro@bookbase.com", "password": "x"})
+    assert outro.status_code == 401
+
+def test_change_password_is_limited_before_loading_the_user(api, limiter, make_user, login):
+    from database import async_engine
+
+    make_user("leitor@bookbase.com")
+    headers = login("leitor@bookbase.com")
+    dados = {"current_password": "errada", "new_password": "nova-senha-1"}
+    for _ in range(2):
+        assert api.put("/auth/change-password", headers=headers, json=dados).status_code == 400
+
+    # O usuário do token está em cache: a recusa não executa nenhum SQL
+    with query_budget(async_engine, 0):
+        response = api.put("/auth/change-password", headers=headers, json=dados)
+    assert response.status_code == 429
+
+class FailingBackend:
+    async def take(self, key, bucket):
+        raise ConnectionError("Redis fora do ar")
+
+def test_backend_errors_fail_open_or_closed(api, limiter, make_user, monkeypatch):
+    from metrics import RATE_LIMIT_BACKEND_ERRORS
+
+    make_user("leitor@bookbase.com")
+    monkeypatch.setattr(limiter, "backend", FailingBackend())
+    erros = RATE_LIMIT_BACKEND_ERRORS.labels("login_ip")
+    antes = erros._value.get()
+    dados = {"email": "leitor@bookbase.com", "password": PASSWORD}
+
+    assert api.post("/auth/login-json", json=dados).status_code == 200
+
+    monkeypatch.setattr(limiter, "fail_open", False)
+    assert api.post("/auth/login-json", json=dados).status_code == 503
+    assert erros._value.get() == antes + 2
+
+def test_redis_backend_uses_fixed_windows(resp_server):
+    from rate_limit import RedisBackend, TokenBucket
+
+    backend = RedisBackend(f"redis://127.0.0.1:{resp_server.port}/0")
+    bucket = TokenBucket("teste", "LIMITE_INEXISTENTE", "3/3600")
+
+    async def take_all():
+        return [await backend.take("bookbase:limite:teste:1", bucket) for _ in range(4)]
+
+    esperas = asyncio.run(take_all())
+
+    assert esperas[:3] == [0.0, 0.0, 0.0]
+    assert 0 < esperas[3] <= 3600
+    assert set(resp_server.commands) == {"INCR", "PEXPIRE"}
+    # Uma chave por janela, expirando no fim dela
+    [(chave, ttl)] = resp_server.ttls.items()
+    assert chave == f"bookbase:limite:teste:1:{int(time.time() // 3600)}"
+    assert 1000 < ttl <= 3_601_000
+
+def test_stalled_redis_counts_as_backend_error(api, limiter, make_user, stalled_resp_server, monkeypatch):
+    from metrics import RATE_LIMIT_BACKEND_ERRORS
+    from rate_limit import RedisBackend
+    from redis_client import RedisClient
+
+    make_user("leitor@bookbase.com")
+    url = f"redis://127.0.0.1:{stalled_resp_server.port}/0"
+    backend = RedisBackend(url)
+    backend.client = RedisClient(url, timeout=0.2)
+    monkeypatch.setattr(limiter, "backend", backend)
+    erros = RATE_LIMIT_BACKEND_ERRORS.labels("login_ip")
+    antes = erros._value.get()
+    dados = {"email": "leitor@bookbase.com", "password": PASSWORD}
+
+    inicio = time.monotonic()
+    assert api.post("/auth/login-json", json=dados).status_code == 200
+    assert time.monotonic() - inicio < 3
+    assert erros._value.get() == antes + 1
+
+    monkeypatch.setattr(limiter, "fail_open", False)
+    assert api.post("/auth/login-json", json=dados).status_code == 503
@@ -0,0 +1,54 @@
+import asyncio
+import models
+import database
+from conftest import due_date
+from database import MemoryWriterMarks, RedisWriterMarks
+from redis_client import RedisClient
+
+def _create_loan(api, headers, usuario_id, livro_id):
+    response = api.post("/emprestimos/", headers=headers, json={
+        "usuario_id": usuario_id, "livro_id": livro_id, "data_devolucao_prevista": due_date()
+    })
+    assert response.status_code == 200, response.text
+
+def test_reads_use_the_replica_until_the_client_writes(api, replica, librarian, make_user, make_book, login):
+    usuario_id = make_user("leitor@bookbase.com")
+    livro_id = make_book("9780000000001", quantidade=2)
+    make_user("outra@bookbase.com", models.UserRole.BIBLIOTECARIO)
+    outra = login("outra@bookbase.com")
+
+    # A réplica ainda não tem nada
+    assert api.get("/emprestimos/", headers=librarian).json() == []
+
+    _create_loan(api, librarian, usuario_id, livro_id)
+
+    # Quem gravou lê do primário; os demais clientes seguem na réplica
+    assert len(api.get("/emprestimos/", headers=librarian).json()) == 1
+    assert api.get("/emprestimos/", headers=outra).json() == []
+
+def test_write_marker_reaches_other_workers(api, replica, librarian, make_user, make_book, resp_server, monkeypatch):
+    url = f"redis://127.0.0.1:{resp_server.port}/0"
+    monkeypatch.setattr(database, "recent_writers", RedisWriterMarks(url, ttl=5))
+    usuario_id = make_user("leitor@bookbase.com")
+    livro_id = make_book("9780000000001", quantidade=2)
+
+    _create_loan(api, librarian, usuario_id, livro_id)
+    # A próxima leitura cai em outro worker, que não tem a marca local
+    database.recent_writers.clear()
+
+    assert len(api.get("/emprestimos/", headers=librarian).json()) == 1
+    assert "SET" in resp_server.commands and "GET" in resp_server.commands
+
+def test_memory_marks_are_per_client():
+    async def run():
+        marks = MemoryWriterMarks(ttl=5)
+        await marks.mark("token:a")
+        return await marks.is_marked("token:a"), await marks.is_marked("token:b")
+
+    assert asyncio.run(run()) == (True, False)
+
+def test_stalled_redis_sends_reads_to_the_primary(stalled_resp_server):
+    marks = RedisWriterMarks(f"redis://127.0.0.1:{stalled_resp_server.port}/0", ttl=5)
+    marks.client = RedisClient(f"redis://127.0.0.1:{stalled_resp_server.port}/0", timeout=0.2)
+
+    assert asyncio.run(marks.is_marked("token:a")) is True
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from conftest import due_date
+
+def test_loan_invalidates_cached_book(api, librarian, make_user, make_book):
+    livro_id = make_book("9780000000001", quantidade=2)
+    assert api.get(f"/livros/{livro_id}").json()["exemplares_disponiveis"] == 2
+    assert api.get("/livros/").json()["livros"][0]["exemplares_disponiveis"] == 2
+
+    response = api.post("/emprestimos/", headers=librarian, json={
+        "usuario_id": make_user("leitor@bookbase.com"), "livro_id": livro_id,
+        "data_devolucao_prevista": due_date()
+    })
+    assert response.status_code == 200
+
+    assert api.get(f"/livros/{livro_id}").json()["exemplares_disponiveis"] == 1
+    assert api.get("/livros/").json()["livros"][0]["exemplares_disponiveis"] == 1
+
+def test_delete_invalidates_cached_list(api, librarian, make_book):
+    livro_id = make_book("9780000000001")
+    make_book("9780000000002")
+    assert api.get("/livros/").json()["total"] == 2
+
+    assert api.delete(f"/livros/{livro_id}", headers=librarian).status_code == 200
+
+    assert api.get("/livros/").json()["total"] == 1
+    assert api.get(f"/livros/{livro_id}").status_code == 404
+
+def test_cache_without_backend_always_loads():
+    from response_cache import ResponseCache, create_backend
+
+    cache = ResponseCache(create_backend("none://"))
+    chamadas = []
+
+    async def load():
+        chamadas.append(1)
+        return b"{}"
+
+    async def run():
+        key = await cache.catalog_key("livro", 1)
+        await cache.get_or_load(key, load)
+        await cache.invalidate_catalog()
+        await cache.get_or_load(await cache.catalog_key("livro", 1), load)
+        return key
+
+    assert asyncio.run(run()) is None
+    assert len(chamadas) == 2
+
+@pytest.mark.parametrize("url, workers, esperado", [
+    ("memory://", 4, "none://"),
+    ("memory://", 1, "memory://"),
+    ("redis://localhost:6379/0", 4, "redis://localhost:6379/0"),
+])
+def test_serve_disables_process_cache_with_several_workers(monkeypatch, url, workers, esperado):
+    import serve
+
+    monkeypatch.setenv("CACHE_URL", url)
+    serve._prepare_cache(workers)
+    assert serve.os.environ["CACHE_URL"] == esperado
+
+def test_cache_is_filled_from_the_primary(api, replica, librarian, make_user, make_book):
+    import models
+    from sqlalchemy import insert
+
+    livro_id = make_book("9780000000001", quantidade=2)
+    # A réplica ainda tem a versão anterior do livro
+    with replica.begin() as conn:
+        conn.execute(insert(models.Livro.__table__), [{
+            "id": livro_id, "titulo": "Título antigo", "autor": "Autor", "isbn": "9780000000001", "ano": 2000,
+            "quantidade_exemplares": 2, "exemplares_disponiveis": 2, "categoria": "Romance",
+            "paginas": 100, "descricao": "Descrição",
+        }])
+
+    api.post("/emprestimos/", headers=librarian, json={
+        "usuario_id": make_user("leitor@bookbase.com"), "livro_id": livro_id,
+        "data_devolucao_prevista": due_date()
+    })
+
+    # Um cliente anônimo, que leria da réplica, também recebe o valor novo
+    livro = api.get(f"/livros/{livro_id}").json()
+    assert (livro["titulo"], livro["exemplares_disponiveis"]) == ("Livro 9780000000001", 1)
+    assert api.get("/livros/").json()["livros"][0]["exemplares_disponiveis"] == 1
+    # E quem gravou também, agora saindo do cache
+    assert api.get(f"/livros/{livro_id}", headers=librarian).json()["exemplares_disponiveis"] == 1
+
+def test_stalled_redis_falls_back_to_the_database(api, make_book, stalled_resp_server, monkeypatch):
+    import time
+    from redis_client import RedisClient
+    from response_cache import RedisBackend, response_cache
+
+    livro_id = make_book("9780000000001")
+    backend = RedisBackend(f"redis://127.0.0.1:{stalled_resp_server.port}/0")
+    backend.client = RedisClient(f"redis://127.0.0.1:{stalled_resp_server.port}/0", timeout=0.2)
+    monkeypatch.setattr(response_cache, "backend", backend)
+
+    inicio = time.monotonic()
+    assert api.get(f"/livros/{livro_id}").status_code == 200
+    assert api.get("/livros/").json()["total"] == 1
+    assert time.monotonic() - inicio < 3
+    assert stalled_resp_server.commands
+
+def test_redis_client_drops_connection_after_timeout(stalled_resp_server):
+    from redis_client import RedisClient
+
+    client = RedisClient(f"redis://127.0.0.1:{stalled_resp_server.port}/0", timeout=0.1)
+
+    async def run():
+        with pytest.raises(TimeoutError):
+            await client.execute("GET", "chave")
+        return client._idle
+
+    assert asyncio.run(run()) == []
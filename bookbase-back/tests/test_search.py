@@ -0,0 +1,71 @@
+from sqlalchemy import text, update, delete
+import models
+from database import SessionLocal, engine
+
+def _add_book(isbn: str, titulo: str, autor: str = "Autor", descricao: str = "Descrição", categoria: str = "Romance") -> int:
+    with SessionLocal() as db:
+        livro = models.Livro(
+            titulo=titulo, autor=autor, isbn=isbn, ano=2000, quantidade_exemplares=1,
+            categoria=categoria, paginas=100, descricao=descricao
+        )
+        db.add(livro)
+        db.commit()
+        return livro.id
+
+def _search(api, q: str) -> list[int]:
+    response = api.get("/livros/search", params={"q": q})
+    assert response.status_code == 200
+    return [livro["id"] for livro in response.json()["livros"]]
+
+def _assert_index_in_sync():
+    # Com rank = 1 o FTS5 compara o índice com a tabela livros e levanta erro
+    # ("database disk image is malformed") se divergirem
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO livros_fts(livros_fts, rank) VALUES ('integrity-check', 1)"))
+
+def test_insert_is_indexed(api):
+    livro_id = _add_book("9780000000001", "Memórias Póstumas de Brás Cubas", autor="Machado de Assis")
+
+    # Sem acentos e por prefixo
+    assert _search(api, "memorias") == [livro_id]
+    assert _search(api, "postu cubas") == [livro_id]
+    assert _search(api, "machado") == [livro_id]
+    _assert_index_in_sync()
+
+def test_update_replaces_indexed_terms(api):
+    livro_id = _add_book("9780000000001", "Iracema")
+
+    with SessionLocal() as db:
+        db.execute(update(models.Livro).where(models.Livro.id == livro_id).values(titulo="Senhora"))
+        db.commit()
+
+    assert _search(api, "iracema") == []
+    assert _search(api, "senhora") == [livro_id]
+    _assert_index_in_sync()
+
+def test_delete_removes_from_index(api):
+    livro_id = _add_book("9780000000001", "Dom Casmurro")
+    outro_id = _add_book("9780000000002", "Dom Quixote")
+
+    with SessionLocal() as db:
+        db.execute(delete(models.Livro).where(models.Livro.id == livro_id))
+        db.commit()
+
+    assert _search(api, "dom") == [outro_id]
+    assert _search(api, "casmurro") == []
+    _assert_index_in_sync()
+
+def test_title_matches_rank_above_description_matches(api):
+    na_descricao = _add_book("9780000000001", "Contos", descricao="Histórias passadas no sertão")
+    na_categoria = _add_book("9780000000002", "Crônicas", categoria="Sertão")
+    no_titulo = _add_book("9780000000003", "Grande Sertão: Veredas")
+
+    assert _search(api, "sertao") == [no_titulo, na_categoria, na_descricao]
+
+def test_query_without_terms_returns_nothing(api):
+    _add_book("9780000000001", "O Cortiço")
+
+    assert _search(api, "!!! ---") == []
+    # Aspas e operadores do FTS5 viram texto, sem erro de sintaxe
+    assert _search(api, 'cortiço" OR "x') == []
+    assert len(_search(api, '"cortiço"')) == 1
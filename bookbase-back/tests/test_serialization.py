@@ -0,0 +1,74 @@
+import pytest
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+import routers.loans
+from schemas import Livro
+from serialization import parse_fields
+
+LinhaEmprestimo = namedtuple("LinhaEmprestimo", [
+    "id", "usuario_id", "livro_id", "data_emprestimo", "data_devolucao_prevista",
+    "data_devolucao_real", "status", "usuario_nome", "livro_titulo",
+])
+
+@pytest.fixture
+def tz_aware_page(monkeypatch):
+    # O SQLite devolve datas sem fuso; no Postgres (timestamptz) elas vêm em UTC
+    inicio = datetime(2026, 10, 18, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    linhas = [
+        LinhaEmprestimo(1, 2, 3, inicio, inicio + timedelta(days=14), None, "ativo", "Leitora", "Dom Casmurro"),
+        LinhaEmprestimo(2, 2, 4, inicio, inicio + timedelta(days=14), inicio + timedelta(days=3), "devolvido", "Leitora", "Iracema"),
+    ]
+
+    async def fake_paginate(db, query, id_column, skip, after, limit):
+        return linhas, None
+
+    monkeypatch.setattr(routers.loans, "paginate", fake_paginate)
+
+def test_list_emprestimos_paths_encode_the_same(api, librarian, tz_aware_page, monkeypatch):
+    monkeypatch.setattr(routers.loans, "FAST_JSON", False)
+    padrao = api.get("/emprestimos/", headers=librarian)
+    monkeypatch.setattr(routers.loans, "FAST_JSON", True)
+    rapido = api.get("/emprestimos/", headers=librarian)
+
+    assert padrao.status_code == rapido.status_code == 200
+    assert padrao.content == rapido.content
+    assert padrao.json()[0]["data_emprestimo"] == "2026-10-18T12:30:15.123456Z"
+
+def test_fields_trims_the_list(api, make_book):
+    for i in range(3):
+        make_book(f"97800000000{i:02d}")
+
+    completo = api.get("/livros/")
+    parcial = api.get("/livros/", params={"fields": "titulo, autor"})
+
+    assert parcial.status_code == 200
+    assert [set(livro) for livro in parcial.json()["livros"]] == [{"id", "titulo", "autor"}] * 3
+    assert [livro["titulo"] for livro in parcial.json()["livros"]] == [livro["titulo"] for livro in completo.json()["livros"]]
+    assert len(parcial.content) < len(completo.content) / 2
+    # Paginação continua igual
+    assert parcial.json()["total"] == 3
+
+def test_fields_trims_a_single_book(api, make_book):
+    livro_id = make_book("9780000000001")
+
+    response = api.get(f"/livros/{livro_id}", params={"fields": "isbn,capa"})
+
+    assert response.status_code == 200
+    assert response.json() == {"id": livro_id, "isbn": "9780000000001", "capa": None}
+
+@pytest.mark.parametrize("url", ["/livros/", "/livros/1"])
+def test_unknown_field_is_400(api, make_book, url):
+    make_book("9780000000001")
+
+    response = api.get(url, params={"fields": "titulo,senha,__class__"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Campos inválidos: __class__, senha"
+
+def test_parse_fields_keeps_schema_order():
+    assert parse_fields(Livro, None) is None
+    # Ordem do schema, sem repetição, sempre com o id
+    assert parse_fields(Livro, "autor,titulo,autor") == ["titulo", "autor", "id"]
+    with pytest.raises(HTTPException):
+        parse_fields(Livro, "nada")
@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import signal
+import socket
+import asyncio
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import httpx
+from process_pool import shutdown_process_pool
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+def test_shutdown_terminates_busy_pool():
+    pool = ProcessPoolExecutor(max_workers=1)
+    pool.submit(time.sleep, 60)
+    pool.submit(time.sleep, 60)
+    # Espera o primeiro processo subir e pegar a tarefa
+    while not pool._processes:
+        time.sleep(0.01)
+    processes = list(pool._processes.values())
+
+    inicio = time.monotonic()
+    asyncio.run(shutdown_process_pool(pool, "teste", timeout=0.5))
+
+    assert time.monotonic() - inicio < 5
+    assert not any(process.is_alive() for process in processes)
+
+def _children(pid: int) -> set[int]:
+    """Descendentes de pid, pelo /proc (Linux)."""
+    parents = {}
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            campos = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        parents.setdefault(int(campos[1]), []).append(int(stat.parent.name))
+
+    descendentes, pendentes = set(), [pid]
+    while pendentes:
+        for filho in parents.get(pendentes.pop(), []):
+            descendentes.add(filho)
+            pendentes.append(filho)
+    return descendentes
+
+def _alive(pid: int) -> bool:
+    try:
+        return Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return False
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_serve_exits_on_sigterm_with_busy_bcrypt(tmp_path):
+    """Com um bcrypt longo em andamento, o SIGTERM encerra o servidor dentro
+    do prazo e não deixa processos do pool órfãos."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path}/serve.db",
+        # Custo alto: o hash do cadastro leva bem mais que os prazos abaixo
+        "BCRYPT_ROUNDS": "20",
+        "PASSWORD_WORKERS": "1",
+        "IMAGE_WORKERS": "1",
+        "POOL_SHUTDOWN_TIMEOUT": "1",
+        "PROMETHEUS_MULTIPROC_DIR": str(tmp_path / "metrics"),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "2", "--graceful-timeout", "1"],
+        cwd=SRC_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 60
+        while True:
+            assert server.poll() is None, server.stderr.read().decode()
+            assert time.monotonic() < deadline, "servidor não ficou pronto"
+            try:
+                if httpx.get(f"{base_url}/api/ready", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+
+        def register():
+            try:
+                httpx.post(f"{base_url}/auth/register", timeout=30, json={
+                    "nome": "Leitor", "email": "leitor@bookbase.com", "senha": "senha123"
+                })
+            except httpx.HTTPError:
+                pass
+
+        threading.Thread(target=register, daemon=True).start()
+        time.sleep(1)
+        descendentes = _children(server.pid)
+
+        inicio = time.monotonic()
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+        assert time.monotonic() - inicio < 20
+        time.sleep(0.5)
+        assert [pid for pid in descendentes if _alive(pid)] == []
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
@@ -0,0 +1,46 @@
+import re
+import logging
+import pytest
+import models
+import sql_timing
+
+def test_server_timing_counts_request_queries(api, make_book):
+    make_book("9780000000001")
+
+    response = api.get("/livros/")
+
+    assert response.status_code == 200
+    timing = re.fullmatch(r'db;dur=([\d.]+);desc="(\d+) consultas"', response.headers["Server-Timing"])
+    assert timing and int(timing.group(2)) >= 1
+
+@pytest.mark.parametrize("role, status", [
+    # Sem token o HTTPBearer já recusa com 403
+    (None, 403),
+    (models.UserRole.USUARIO, 403),
+    (models.UserRole.BIBLIOTECARIO, 403),
+    (models.UserRole.ADMIN, 200),
+])
+def test_debug_sql_is_admin_only(api, make_user, login, role, status):
+    headers = {}
+    if role:
+        make_user("conta@bookbase.com", role)
+        headers = login("conta@bookbase.com")
+
+    response = api.get("/debug/sql", headers=headers)
+
+    assert response.status_code == status
+    if status == 200:
+        corpo = response.json()
+        assert corpo["comandos"] and {"sql", "execucoes", "total_ms"} <= set(corpo["comandos"][0])
+
+@pytest.mark.parametrize("log_params", [False, True])
+def test_slow_query_log_hides_parameters_by_default(api, make_user, login, caplog, monkeypatch, log_params):
+    make_user("segredo@bookbase.com")
+    monkeypatch.setattr(sql_timing, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(sql_timing, "SLOW_QUERY_LOG_PARAMS", log_params)
+
+    with caplog.at_level(logging.WARNING, logger="sql_timing"):
+        login("segredo@bookbase.com")
+
+    assert "Consulta lenta" in caplog.text
+    assert ("segredo@bookbase.com" in caplog.text) == log_params
@@ -0,0 +1,156 @@
+import time
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from concurrent.futures import Future
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import main
+from startup_gate import StartupGateMiddleware
+
+@pytest.fixture
+def startup_state(client, monkeypatch):
+    """Troca a tarefa de inicialização do app por um Future controlado pelo teste."""
+    def set_state(estado: str):
+        futuro = Future()
+        if estado == "falhou":
+            futuro.set_exception(RuntimeError("banco fora do ar"))
+        elif estado == "pronto":
+            futuro.set_result(None)
+        monkeypatch.setattr(client.app.state, "startup", futuro)
+    return set_state
+
+@pytest.mark.parametrize("estado, health, ready", [
+    ("iniciando", 200, 503),
+    ("falhou", 503, 503),
+    ("pronto", 200, 200),
+])
+def test_health_and_ready_follow_startup(client, startup_state, estado, health, ready):
+    startup_state(estado)
+
+    assert client.get("/api/health").status_code == health
+    response = client.get("/api/ready")
+    assert response.status_code == ready
+    if ready == 503:
+        assert response.json()["status"] == ("erro" if estado == "falhou" else "iniciando")
+
+@pytest.fixture
+def flaky_database(monkeypatch):
+    """Banco que falha nas primeiras chamadas; o resto da preparação não faz nada."""
+    chamadas = []
+    falhas = {"restantes": 0}
+
+    async def wait_for_database():
+        chamadas.append(1)
+        if falhas["restantes"]:
+            falhas["restantes"] -= 1
+            raise ConnectionError("banco fora do ar")
+
+    async def noop():
+        pass
+
+    monkeypatch.setattr(main, "STARTUP_RETRY_DELAY", 0)
+    monkeypatch.setattr(main, "RUN_MIGRATIONS", False)
+    monkeypatch.setattr(main, "wait_for_database", wait_for_database)
+    for nome in ("warm_pool", "warm_password_pool", "warm_image_pool"):
+        monkeypatch.setattr(main, nome, noop)
+    monkeypatch.setattr(main, "start_overdue_sweeper", lambda: "sweeper")
+
+    def falhar(vezes: int):
+        falhas["restantes"] = vezes
+        return chamadas
+    return falhar
+
+def test_prepare_retries_transient_failures(flaky_database):
+    chamadas = flaky_database(main.STARTUP_ATTEMPTS - 1)
+    app = SimpleNamespace(state=SimpleNamespace(overdue_sweeper=None))
+
+    asyncio.run(main.prepare(app))
+
+    assert len(chamadas) == main.STARTUP_ATTEMPTS
+    assert app.state.overdue_sweeper == "sweeper"
+
+def test_prepare_gives_up_after_all_attempts(flaky_database):
+    chamadas = flaky_database(main.STARTUP_ATTEMPTS)
+    app = SimpleNamespace(state=SimpleNamespace(overdue_sweeper=None))
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(main.prepare(app))
+    assert len(chamadas) == main.STARTUP_ATTEMPTS
+    assert app.state.overdue_sweeper is None
+
+def _gated_app(prepare) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.startup = asyncio.create_task(prepare())
+        yield
+        app.state.startup.cancel()
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(StartupGateMiddleware, exempt=("/api/health",), timeout=0.3)
+
+    @app.get("/api/health")
+    def health():
+        return {"status": "ok"}
+
+    @app.get("/livros/")
+    def livros():
+        return []
+
+    return app
+
+def test_gate_holds_requests_until_startup_finishes():
+    async def prepare():
+        await asyncio.sleep(0.1)
+
+    with TestClient(_gated_app(prepare)) as client:
+        assert client.get("/livros/").status_code == 200
+
+def test_gate_answers_503_while_startup_is_slow():
+    async def prepare():
+        await asyncio.sleep(30)
+
+    with TestClient(_gated_app(prepare)) as client:
+        inicio = time.monotonic()
+        response = client.get("/livros/")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert time.monotonic() - inicio < 5
+        # As sondas não esperam a inicialização
+        assert client.get("/api/health").status_code == 200
+
+def test_gate_answers_503_when_startup_failed():
+    async def prepare():
+        raise RuntimeError("banco fora do ar")
+
+    with TestClient(_gated_app(prepare)) as client:
+        assert client.get("/livros/").status_code == 503
+
+@pytest.mark.parametrize("cpus, workers, senha, imagens", [
+    (16, 4, "2", "2"),
+    (16, 1, "8", "2"),
+    (4, 4, "1", "1"),
+    (None, 2, "1", "1"),
+])
+def test_serve_splits_process_pools_between_workers(monkeypatch, cpus, workers, senha, imagens):
+    import serve
+
+    monkeypatch.setattr(serve.os, "cpu_count", lambda: cpus)
+    monkeypatch.delenv("PASSWORD_WORKERS", raising=False)
+    monkeypatch.delenv("IMAGE_WORKERS", raising=False)
+    serve._prepare_process_pools(workers)
+
+    assert serve.os.environ["PASSWORD_WORKERS"] == senha
+    assert serve.os.environ["IMAGE_WORKERS"] == imagens
+
+def test_serve_keeps_explicit_pool_sizes(monkeypatch):
+    import serve
+
+    monkeypatch.setattr(serve.os, "cpu_count", lambda: 16)
+    monkeypatch.setenv("PASSWORD_WORKERS", "3")
+    monkeypatch.setenv("IMAGE_WORKERS", "1")
+    serve._prepare_process_pools(4)
+
+    assert serve.os.environ["PASSWORD_WORKERS"] == "3"
+    assert serve.os.environ["IMAGE_WORKERS"] == "1"
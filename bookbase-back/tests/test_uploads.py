@@ -0,0 +1,122 @@
+import io
+import pytest
+from PIL import Image
+from config import MAX_UPLOAD_REQUEST_SIZE, MAX_FILE_SIZE, COVER_SIZES, COVER_FORMATS, UPLOAD_DIR, get_derivative_path
+
+FORM = {
+    "titulo": "Capa", "autor": "Autor", "isbn": "9780000000101", "ano": "2000",
+    "quantidade_exemplares": "1", "categoria": "Romance", "paginas": "100", "descricao": "d",
+}
+
+def _png(size: tuple[int, int] = (40, 60)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+def test_upload_within_limit_is_saved(api, librarian):
+    response = api.post("/livros/", headers=librarian, data=FORM, files={"capa": ("c.png", _png(), "image/png")})
+    assert response.status_code == 200, response.text
+    assert response.json()["capa"].endswith(".png")
+
+def test_oversized_content_length_is_refused_before_parsing(api, librarian):
+    headers = {
+        **librarian,
+        "Content-Type": "multipart/form-data; boundary=x",
+        "Content-Length": str(MAX_UPLOAD_REQUEST_SIZE + 1),
+    }
+    # Só o cabeçalho já basta: o corpo nem chega a ser lido
+    response = api.post("/livros/", headers=headers, content=b"--x--\r\n")
+    assert response.status_code == 413
+
+def test_chunked_body_is_cut_at_the_limit(api, librarian):
+    def body():
+        yield b'--x\r\nContent-Disposition: form-data; name="capa"; filename="c.png"\r\n\r\n'
+        for _ in range(MAX_UPLOAD_REQUEST_SIZE // (64 * 1024) + 10):
+            yield b"\0" * (64 * 1024)
+
+    headers = {**librarian, "Content-Type": "multipart/form-data; boundary=x"}
+    response = api.post("/livros/", headers=headers, content=body())
+    assert response.status_code == 413
+
+def test_file_over_max_size_is_rejected(api, librarian):
+    grande = _png() + b"\0" * (MAX_FILE_SIZE + 1)
+    response = api.post("/livros/", headers=librarian, data=FORM, files={"capa": ("c.png", grande, "image/png")})
+    assert response.status_code == 400
+
+@pytest.fixture
+def cover(api, librarian):
+    """Capa de 1000x1500 enviada pela API, com as versões reduzidas geradas."""
+    response = api.post(
+        "/livros/", headers=librarian, data=FORM, files={"capa": ("c.png", _png((1000, 1500)), "image/png")}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["capa"]
+
+def test_upload_renders_every_size_and_format(cover):
+    for size, (largura, altura) in COVER_SIZES.items():
+        for extension, image_format in COVER_FORMATS.items():
+            with Image.open(get_derivative_path(cover, size, extension)) as image:
+                assert image.format == image_format
+                # Cabe na caixa do tamanho e mantém a proporção 2:3
+                assert image.width <= largura and image.height <= altura
+                assert abs(image.width / image.height - 2 / 3) < 0.01
+
+@pytest.mark.parametrize("accept, content_type, image_format", [
+    ("image/avif,image/webp,*/*", "image/webp", "WEBP"),
+    ("image/jpeg,*/*", "image/jpeg", "JPEG"),
+    (None, "image/jpeg", "JPEG"),
+])
+def test_cover_size_follows_accept(api, cover, accept, content_type, image_format):
+    headers = {"Accept": accept} if accept else {}
+    response = api.get(f"/livros/capas/{cover}", params={"size": "thumb"}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == content_type
+    assert response.headers["Vary"] == "Accept"
+    with Image.open(io.BytesIO(response.content)) as image:
+        assert image.format == image_format
+        assert image.size == (160, 240)
+
+def test_webp_and_jpeg_have_different_etags(api, cover):
+    webp = api.get(f"/livros/capas/{cover}", params={"size": "card"}, headers={"Accept": "image/webp"})
+    jpeg = api.get(f"/livros/capas/{cover}", params={"size": "card"}, headers={"Accept": "image/jpeg"})
+
+    assert webp.headers["ETag"] != jpeg.headers["ETag"]
+
+def test_invalid_cover_size_is_400(api, cover):
+    response = api.get(f"/livros/capas/{cover}", params={"size": "enorme"})
+
+    assert response.status_code == 400
+    assert "thumb" in response.json()["detail"]
+
+def test_missing_derivative_falls_back_to_the_original(api, cover):
+    get_derivative_path(cover, "thumb", "jpg").unlink()
+
+    response = api.get(f"/livros/capas/{cover}", params={"size": "thumb"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "image/png"
+    assert response.content == (UPLOAD_DIR / cover).read_bytes()
+
+def test_unknown_cover_is_404(api):
+    assert api.get("/livros/capas/nao-existe.png", params={"size": "thumb"}).status_code == 404
+
+def test_deleting_the_book_removes_every_version(api, librarian, cover):
+    livro_id = api.get("/livros/").json()["livros"][0]["id"]
+
+    assert api.delete(f"/livros/{livro_id}", headers=librarian).status_code == 200
+
+    assert not (UPLOAD_DIR / cover).exists()
+    for size in COVER_SIZES:
+        for extension in COVER_FORMATS:
+            assert not get_derivative_path(cover, size, extension).exists()
+
+def test_corrupted_image_is_rejected_without_leftovers(api, librarian):
+    antes = set(UPLOAD_DIR.iterdir())
+    # Assinatura de PNG válida, conteúdo ilegível
+    corrompida = _png()[:16] + b"\0" * 200
+
+    response = api.post("/livros/", headers=librarian, data=FORM, files={"capa": ("c.png", corrompida, "image/png")})
+
+    assert response.status_code == 400
+    assert set(UPLOAD_DIR.iterdir()) == antes
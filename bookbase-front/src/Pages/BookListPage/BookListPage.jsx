@@ -176,7 +176,7 @@ function BookListPage() {
                     <img
                       src={
                         book.capa
-                          ? `${API_BASE_URL}/livros/capas/${book.capa}`
+                          ? `${API_BASE_URL}/livros/capas/${book.capa}?size=card`
                           : "https://via.placeholder.com/128x200?text=Sem+Imagem"
                       }
                       alt={book.titulo || "Livro"}
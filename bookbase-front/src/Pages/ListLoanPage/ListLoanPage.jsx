@@ -185,6 +185,7 @@ function ListLoanPage() {
   };
 
   const isOverdue = (loan) => {
+    if (loan.status === "atrasado") return true;
     if (loan.status !== "emprestado") return false;
     const today = new Date();
     const dueDate = new Date(loan.data_devolucao_prevista);
@@ -254,6 +255,12 @@ function ListLoanPage() {
               >
                 Emprestados
               </button>
+              <button
+                className={`filter-btn ${statusFilter === "atrasado" ? "active" : ""}`}
+                onClick={() => handleStatusFilter("atrasado")}
+              >
+                Atrasados
+              </button>
               <button
                 className={`filter-btn ${statusFilter === "devolvido" ? "active" : ""}`}
                 onClick={() => handleStatusFilter("devolvido")}
@@ -341,7 +348,7 @@ function ListLoanPage() {
                     </div>
                   </div>
 
-                  {loan.status === "emprestado" && (
+                  {(loan.status === "emprestado" || loan.status === "atrasado") && (
                     <div className="loan-actions">
                       <button
                         className="btn-return"
@@ -61,7 +61,7 @@ function LoanBookPage() {
       if (response.ok) {
         const data = await response.json();
         const availableBooks = (data.livros || data || []).filter(
-          book => book.quantidade_exemplares > 0
+          book => book.exemplares_disponiveis > 0
         );
         setBooks(availableBooks);
       }